@@ -1,6 +1,19 @@
 """
 app_logger.py — надёжный логгер с выводом в консоль + файлы + GUI (опционально)
 Консольный вывод сохраняется всегда, даже при запуске GUI.
+Запись в файлы и консоль — в фоновом потоке пачками: log_* только ставит в очередь.
+
+Ротация по размеру (configure_rotation): сегменты logger.txt.1..N, без остановки записи.
+
+Категории (configure_logging, из .env через config.py):
+  main / both — всегда;  soft, debug — включены по умолчанию;
+  trace — по строке на файл в горячих циклах пуша, выключен по умолчанию.
+Ленивое форматирование: log_soft("[X] %s", rel) — строка собирается в worker'е
+и только если категория включена. В циклах проверка выносится наружу:
+    trace = trace_enabled()
+    for rel in ...:
+        if trace:
+            log_trace("[TREE-ADD] %s", rel)
 """
 
 import sys
@@ -8,12 +21,109 @@ import time
 import queue
 import threading
 import os
-import logging
+import atexit
+
+
+FLUSH_INTERVAL = 0.5     # сек: файлы и консоль сбрасываются не чаще
+BATCH_MAX = 1000         # записей за один проход worker'а
+QUEUE_MAX = 20000
+PUT_TIMEOUT = 1.0        # очередь полна → main/both ждут worker; soft/debug/trace отбрасываются
+
+LOG_TYPES = ("main", "soft", "debug", "both", "trace")
+
+# Какой файл/коллбек получает запись данного типа
+_DESTINATION = {"main": "main", "both": "main", "soft": "soft", "trace": "soft", "debug": "debug"}
+
+_enabled = {"main": True, "both": True, "soft": True, "debug": True, "trace": False}
+
+
+def configure_logging(soft=None, debug=None, trace=None):
+    """Включение/выключение категорий (None — не менять)"""
+    for name, value in (("soft", soft), ("debug", debug), ("trace", trace)):
+        if value is not None:
+            _enabled[name] = bool(value)
+
+
+def log_enabled(category: str) -> bool:
+    return _enabled.get(category, True)
+
+
+def trace_enabled() -> bool:
+    """Для горячих циклов: проверить один раз до цикла"""
+    return _enabled["trace"]
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# Ротация по размеру: logger.txt → logger.txt.1 → ... → logger.txt.N (старший удаляется)
+_rotation = {"segment_bytes": 1024 * 1024, "segments": 3}
+
+
+def configure_rotation(segment_bytes=None, segments=None):
+    """segment_bytes=0 — без ротации; segments — сколько старых сегментов хранить"""
+    if segment_bytes is not None:
+        _rotation["segment_bytes"] = max(0, int(segment_bytes))
+    if segments is not None:
+        _rotation["segments"] = max(0, int(segments))
+
+
+class _LogFile:
+    """
+    Файл лога, открытый на всё время работы; пишется пачками из worker'а.
+    Пишет только worker, поэтому ротация на лету не останавливает тех, кто логирует.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "ab", buffering=64 * 1024)
+        self._size = self._f.tell()
+
+    def write(self, text: str) -> None:
+        limit = _rotation["segment_bytes"]
+        if limit and self._size >= limit:
+            self._rollover()
+        data = text.encode("utf-8", "replace")
+        self._f.write(data)
+        self._size += len(data)
+
+    def _rollover(self) -> None:
+        self._f.close()
+        segments = _rotation["segments"]
+        try:
+            if segments:
+                for i in range(segments - 1, 0, -1):
+                    older = f"{self.path}.{i}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{self.path}.{i + 1}")
+                os.replace(self.path, f"{self.path}.1")
+                self._f = open(self.path, "ab", buffering=64 * 1024)
+            else:
+                self._f = open(self.path, "wb", buffering=64 * 1024)
+        except OSError as e:
+            # файл занят (Windows) — пишем дальше в текущий, следующая попытка через сегмент
+            print(f"Logger rotation error {self.path}: {e}", file=sys.__stderr__)
+            self._f = open(self.path, "ab", buffering=64 * 1024)
+        self._size = 0
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        try:
+            self._f.close()
+        except Exception:
+            pass
+
 
 class AppLogger:
+    """
+    Вызывающий поток только кладёт (время, сообщение, тип) в очередь.
+    Форматирование, запись в файлы, консоль и GUI-коллбеки — в потоке _worker,
+    пачками до BATCH_MAX записей, flush — раз в FLUSH_INTERVAL.
+    """
+
     def __init__(self):
         self.running = True
-        self.q = queue.Queue(maxsize=5000)
+        self.q = queue.Queue(maxsize=QUEUE_MAX)
 
         BASE_DIR = os.path.dirname(os.path.abspath(__file__))
         self.file_main  = os.path.join(BASE_DIR, "logger.txt")
@@ -28,93 +138,163 @@ class AppLogger:
         print("  → Debug:        ", self.file_debug)
 
 
-        # Настраиваем стандартный logging
-        self.logger = logging.getLogger('app')
-        self.logger.setLevel(logging.INFO)
-
-        formatter = logging.Formatter('[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
-        # 1. Всегда консоль (используем sys.__stdout__ — оригинальный, не перехваченный GUI)
-        console_handler = logging.StreamHandler(sys.__stdout__)
-        console_handler.setFormatter(formatter)
-        console_handler.setLevel(logging.INFO)
-        self.logger.addHandler(console_handler)
-
-        # 2. Файловые handlers
-        main_handler = logging.FileHandler(self.file_main, encoding='utf-8')
-        main_handler.setFormatter(formatter)
-        self.logger.addHandler(main_handler)
-
-        soft_handler = logging.FileHandler(self.file_soft, encoding='utf-8')
-        soft_handler.setFormatter(formatter)
-        soft_logger = logging.getLogger('soft')
-        soft_logger.setLevel(logging.INFO)
-        soft_logger.addHandler(soft_handler)
-
-        debug_handler = logging.FileHandler(self.file_debug, encoding='utf-8')
-        debug_handler.setFormatter(formatter)
-        debug_logger = logging.getLogger('debug')
-        debug_logger.setLevel(logging.DEBUG)
-        debug_logger.addHandler(debug_handler)
+        # Всегда консоль (sys.__stdout__ — оригинальный, не перехваченный GUI) + файлы
+        self.console = sys.__stdout__
+        self.files = {
+            "main": _LogFile(self.file_main),
+            "soft": _LogFile(self.file_soft),
+            "debug": _LogFile(self.file_debug),
+        }
 
         # Коллбеки для GUI (будут установлены позже)
         self.callback_main = None
         self.callback_soft = None
         self.callback_debug = None
 
-        # Поток-обработчик очереди (для GUI-коллбеков и файлов)
-        self.worker = threading.Thread(target=self._worker, daemon=True)
+        self._stamp_second = -1
+        self._stamp = ""
+
+        # отброшено при переполнении очереди (только soft/debug/trace)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+        # Поток-обработчик очереди (файлы, консоль, GUI-коллбеки)
+        self.worker = threading.Thread(target=self._worker, name="app-logger", daemon=True)
         self.worker.start()
+        atexit.register(self.stop)
+
+    # ─── worker ───
 
     def _worker(self):
+        last_flush = time.monotonic()
         while self.running or not self.q.empty():
             try:
-                msg, log_type = self.q.get(timeout=0.4)
-                line = msg.strip() + "\n"
-
-                # Вывод в GUI через коллбеки
-                if log_type in ("main", "both") and self.callback_main:
-                    try:
-                        self.callback_main(line)
-                    except Exception as e:
-                        print(f"Callback main error: {e}", file=sys.__stderr__)
-
-                if log_type in ("soft", "both") and self.callback_soft:
-                    try:
-                        self.callback_soft(line)
-                    except Exception as e:
-                        print(f"Callback soft error: {e}", file=sys.__stderr__)
-
-                if log_type == "debug" and self.callback_debug:
-                    try:
-                        self.callback_debug(line)
-                    except Exception as e:
-                        print(f"Callback debug error: {e}", file=sys.__stderr__)
-
+                batch = [self.q.get(timeout=FLUSH_INTERVAL)]
             except queue.Empty:
+                batch = []
+            while batch and len(batch) < BATCH_MAX:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"Logger worker error: {e}", file=sys.__stderr__)
+                self._report_dropped()
+
+            now = time.monotonic()
+            if now - last_flush >= FLUSH_INTERVAL:
+                self._flush()
+                last_flush = now
+
+        self._flush()
+        for f in self.files.values():
+            f.close()
+
+    def _timestamp(self, ts: float) -> str:
+        second = int(ts)
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp = time.strftime(TIME_FORMAT, time.localtime(second))
+        return self._stamp
+
+    def _write_batch(self, batch):
+        out = {"main": [], "soft": [], "debug": []}
+        gui = []
+        for ts, msg, args, log_type in batch:
+            if args:
+                try:
+                    msg = msg % args
+                except Exception:
+                    msg = f"{msg} {args!r}"
+            text = msg.strip()
+            if not text:
                 continue
+            out[_DESTINATION[log_type]].append(f"[{self._timestamp(ts)}] {msg}\n")
+            gui.append((text + "\n", log_type))
+
+        for name, lines in out.items():
+            if lines:
+                self.files[name].write("".join(lines))
+        if out["main"] and self.console is not None:
+            try:
+                self.console.write("".join(out["main"]))
+            except Exception:
+                pass
+
+        for line, log_type in gui:
+            self._dispatch(line, log_type)
+
+    def _dispatch(self, line: str, log_type: str):
+        """Вывод в GUI через коллбеки"""
+        if log_type in ("main", "both") and self.callback_main:
+            try:
+                self.callback_main(line)
             except Exception as e:
-                print(f"Logger worker error: {e}", file=sys.__stderr__)
+                print(f"Callback main error: {e}", file=sys.__stderr__)
 
-    def log(self, msg: str, log_type: str = "main"):
-        if not msg or not msg.strip():
+        if log_type in ("soft", "both", "trace") and self.callback_soft:
+            try:
+                self.callback_soft(line)
+            except Exception as e:
+                print(f"Callback soft error: {e}", file=sys.__stderr__)
+
+        if log_type == "debug" and self.callback_debug:
+            try:
+                self.callback_debug(line)
+            except Exception as e:
+                print(f"Callback debug error: {e}", file=sys.__stderr__)
+
+    def _report_dropped(self):
+        if not self._dropped:
             return
-        if log_type not in ("main", "soft", "debug", "both"):
-            log_type = "main"
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        line = f"[LOGGER FULL] Очередь переполнена — пропущено сообщений: {dropped}"
+        print(line, file=sys.__stderr__)
+        self.files["soft"].write(f"[{self._timestamp(time.time())}] {line}\n")
+
+    def _flush(self):
+        for f in self.files.values():
+            try:
+                f.flush()
+            except Exception as e:
+                print(f"Logger flush error: {e}", file=sys.__stderr__)
+        if self.console is not None:
+            try:
+                self.console.flush()
+            except Exception:
+                pass
 
-        # Основной вывод через logging (консоль + файлы)
-        if log_type == "main" or log_type == "both":
-            self.logger.info(msg)
-        elif log_type == "soft":
-            logging.getLogger('soft').info(msg)
-        elif log_type == "debug":
-            logging.getLogger('debug').debug(msg)
+    # ─── API ───
 
-        # Дополнительно кладём в очередь только для GUI-коллбеков
+    def log(self, msg: str, log_type: str = "main", args: tuple = ()):
+        if not msg:
+            return
+        if log_type not in LOG_TYPES:
+            log_type = "main"
+        if not self.running:
+            # логгер остановлен (выход из приложения) — файлы закрыты, только консоль
+            print(f"[{log_type.upper()}] {msg % args if args else msg}", file=sys.__stderr__)
+            return
+
+        item = (time.time(), msg, args, log_type)
         try:
-            self.q.put_nowait((msg, log_type))
+            self.q.put_nowait(item)
         except queue.Full:
-            print("[LOGGER FULL] Очередь переполнена, GUI не получит сообщение:", msg, file=sys.__stderr__)
+            if log_type not in ("main", "both"):
+                # подробности не стоят блокировки пуша — считаем и сообщаем одной строкой
+                with self._dropped_lock:
+                    self._dropped += 1
+                return
+            # worker не успевает — короткое ожидание вместо потери важной записи
+            try:
+                self.q.put(item, timeout=PUT_TIMEOUT)
+            except queue.Full:
+                print("[LOGGER FULL] Очередь переполнена, сообщение потеряно:", msg, file=sys.__stderr__)
 
     def set_callbacks(self, main=None, soft=None, debug=None):
         """Устанавливает коллбеки для GUI"""
@@ -123,6 +303,7 @@ class AppLogger:
         self.callback_debug = debug
 
     def stop(self):
+        """Дописывает очередь и закрывает файлы"""
         self.running = False
         try:
             self.worker.join(timeout=1.5)
@@ -151,8 +332,8 @@ def get_logger():
     global _logger_instance
     if _logger_instance is None:
         class FakeLogger:
-            def log(self, msg, log_type="main"):
-                print(f"[{log_type.upper()}] {msg}", file=sys.stderr)
+            def log(self, msg, log_type="main", args=()):
+                print(f"[{log_type.upper()}] {msg % args if args else msg}", file=sys.stderr)
             def set_callbacks(self, *args, **kwargs):
                 pass
             def stop(self):
@@ -161,17 +342,25 @@ def get_logger():
     return _logger_instance
 
 
-def log_main(msg: str):
-    get_logger().log(msg, "main")
+def log_main(msg: str, *args):
+    get_logger().log(msg, "main", args)
+
+
+def log_soft(msg: str, *args):
+    if _enabled["soft"]:
+        get_logger().log(msg, "soft", args)
 
 
-def log_soft(msg: str):
-    get_logger().log(msg, "soft")
+def log_trace(msg: str, *args):
+    """Построчные подробности (по файлу) — только при LOG_TRACE"""
+    if _enabled["trace"]:
+        get_logger().log(msg, "trace", args)
 
 
-def log_debug(msg: str):
-    get_logger().log(msg, "debug")
+def log_debug(msg: str, *args):
+    if _enabled["debug"]:
+        get_logger().log(msg, "debug", args)
 
 
-def log_both(msg: str):
-    get_logger().log(msg, "both")
+def log_both(msg: str, *args):
+    get_logger().log(msg, "both", args)
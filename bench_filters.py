@@ -0,0 +1,127 @@
+"""
+bench_filters.py
+
+Замер фильтра push-комментариев на синтетическом logger.txt (filters/corpus.py).
+
+    python bench_filters.py             # 4 MB лога
+    python bench_filters.py 16 7        # 16 MB, seed 7
+
+1) Профиль 12 эвристик (эталонная реализация) на строках, прошедших базовые
+   проверки: мкс на строку, доля срабатываний, сколько из них на near-строках
+   (ложные), «первая» — строка отброшена именно ею в исходном порядке,
+   «единств.» — больше ни одна эвристика её не ловит (вклад при удалении),
+   «в конвейере» — сколько времени она реально тратит в исходном порядке.
+2) should_skip_push_comment_line целиком: строк/сек для эталона, быстрого
+   классификатора (холодный и тёплый LRU-кэш) и пакетного API.
+"""
+
+import sys
+import time
+import warnings
+
+from filters import should_skip_push_comment_line, should_skip_push_comment_lines
+from filters.corpus import KINDS, generate_log_lines
+from filters.deep_heuristics import _classify
+from filters.deep_heuristics_reference import REFERENCE_HEURISTICS, looks_like_push_comment_line_reference
+from filters.push_comment_filter import _time_part
+
+
+PROFILE_LIMIT = 20_000   # строк-кандидатов для профиля эвристик (эталон медленный)
+
+
+def reference_should_skip(line: str) -> bool:
+    s = line.strip()
+    time_part = _time_part(s)
+    return time_part is not None and looks_like_push_comment_line_reference(s, time_part)
+
+
+def profile_heuristics(candidates):
+    """candidates: [(вид, s, time_part)] → печатает таблицу по эвристикам"""
+    n = len(candidates)
+    hits = []      # [set индексов] по эвристикам
+    times = []     # [[сек на строку]] по эвристикам
+    clock = time.perf_counter
+    for name, heuristic in REFERENCE_HEURISTICS:
+        fired, spent = set(), []
+        for i, (_, s, time_part) in enumerate(candidates):
+            started = clock()
+            hit = heuristic(s, time_part)
+            spent.append(clock() - started)
+            if hit:
+                fired.add(i)
+        hits.append(fired)
+        times.append(spent)
+
+    hit_count = [0] * n
+    for fired in hits:
+        for i in fired:
+            hit_count[i] += 1
+
+    print(f"{'эвристика':<20} {'мкс/стр':>9} {'сраб.':>7} {'near':>6} {'первая':>7} {'единств.':>9} {'в конвейере':>12}")
+    decided = set()
+    for (name, _), fired, spent in zip(REFERENCE_HEURISTICS, hits, times):
+        first = fired - decided
+        only = sum(1 for i in fired if hit_count[i] == 1)
+        near = sum(1 for i in fired if candidates[i][0] == "near")
+        pipeline = sum(t for i, t in enumerate(spent) if i not in decided)
+        print(f"{name:<20} {sum(spent) / n * 1e6:9.1f} {len(fired) / n:7.1%} {near:6} "
+              f"{len(first):7} {only:9} {pipeline:11.2f}с")
+        decided |= fired
+    print(f"Отброшено: {len(decided)} из {n} кандидатов")
+
+
+def throughput(label, run, lines, size_mb):
+    started = time.perf_counter()
+    skipped = run(lines)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {len(lines) / elapsed:12,.0f} строк/сек  {size_mb / elapsed:7.2f} MB/сек  "
+          f"({elapsed:.2f} сек, отброшено {skipped})")
+    return skipped
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4.0
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    # ast.literal_eval в эвристике 7 шумит SyntaxWarning на путях с обратными слэшами
+    warnings.simplefilter("ignore", SyntaxWarning)
+
+    tagged = generate_log_lines(int(size_mb * 2 ** 20), seed)
+    lines = [line for _, line in tagged]
+    by_kind = {kind: sum(1 for k, _ in tagged if k == kind) for kind in KINDS}
+    candidates = []
+    for kind, line in tagged:
+        s = line.strip()
+        time_part = _time_part(s)
+        if time_part is not None:
+            candidates.append((kind, s, time_part))
+    print(f"Синтетический лог: {size_mb:g} MB, {len(lines)} строк "
+          f"({', '.join(f'{k} {v}' for k, v in by_kind.items())}), "
+          f"прошли базовые проверки: {len(candidates)}\n")
+
+    sample = candidates
+    if len(candidates) > PROFILE_LIMIT:
+        step = len(candidates) / PROFILE_LIMIT
+        sample = [candidates[int(i * step)] for i in range(PROFILE_LIMIT)]
+    print(f"1) Эвристики по отдельности ({len(sample)} кандидатов, эталонная реализация)")
+    profile_heuristics(sample)
+
+    print("\n2) should_skip_push_comment_line, весь лог")
+    expected = throughput("эталон (исходные эвристики)",
+                          lambda ls: sum(map(reference_should_skip, ls)), lines, size_mb)
+    _classify.cache_clear()
+    cold = throughput("быстрый, холодный кэш",
+                      lambda ls: sum(map(should_skip_push_comment_line, ls)), lines, size_mb)
+    warm = throughput("быстрый, тёплый кэш",
+                      lambda ls: sum(map(should_skip_push_comment_line, ls)), lines, size_mb)
+    _classify.cache_clear()
+    batch = throughput("пакетный API, холодный кэш",
+                       lambda ls: sum(should_skip_push_comment_lines(ls)), lines, size_mb)
+    info = _classify.cache_info()
+    print(f"  LRU: {info.hits} попаданий, {info.misses} промахов, размер {info.currsize}/{info.maxsize}")
+    if not expected == cold == warm == batch:
+        print("ВНИМАНИЕ: число отброшенных строк расходится с эталоном — "
+              "запустите python -m filters.differential_check")
+
+
+if __name__ == "__main__":
+    main()
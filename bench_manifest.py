@@ -0,0 +1,345 @@
+"""
+bench_manifest.py
+
+Замер памяти и скорости представлений манифеста на синтетическом хранилище.
+
+    python bench_manifest.py            # 100 000 файлов
+    python bench_manifest.py 250000
+    python bench_manifest.py --syscalls # обращения к ФС за пуш, 5 000 файлов на диске
+    python bench_manifest.py --syscalls 20000
+
+Сравниваются:
+  1) старый SmartSyncCopier: dict на файл (Path, mtime, size, md5-hex) + set путей
+  2) список ManifestEntry + dict-индекс (первая версия манифеста)
+  3) компактный Manifest (колонки array + 20-байтные SHA)
+Для каждого — пик tracemalloc при построении, удержанная память
+и время сравнения двух снимков (set-разности против merge join).
+
+--syscalls: сколько обращений к файловой системе (листинги папок, stat, mkdir,
+открытия файлов) стоит один пуш движка staging при холодном кэше отпечатков:
+  старый путь — пять проходов rglob, как до общего манифеста: SmartSyncCopier
+  по источнику и по staging (is_dir + is_file + stat + md5), collect_changes,
+  индекс и tree (is_file + read_bytes каждого файла);
+  новый путь — scan_vault (один os.scandir-обход, stat из DirEntry, чтение
+  каждого файла для SHA) + копировщик по манифесту + обход deleted_files/.
+staging уже синхронизирован с хранилищем (обычный пуш); stat внутри pygit2
+index.add одинаков для обоих путей и не считается.
+"""
+
+import builtins
+import gc
+import hashlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from vault_manifest import ManifestBuilder, ManifestEntry, FingerprintCache, scan_vault
+
+
+ROOT = Path("/vault")
+WORDS = ("notes", "daily", "projects", "archive", "inbox", "people", "ideas",
+         "books", "meetings", "research", "drafts", "templates", "journal")
+
+
+def synthetic_files(count: int, seed: int = 1):
+    """[(rel_path, size, mtime_ns, inode, sha_hex)] — структура папок похожа на Obsidian"""
+    rnd = random.Random(seed)
+    dirs = [""]
+    for _ in range(max(1, count // 40)):
+        depth = rnd.randint(1, 4)
+        dirs.append("/".join(rnd.choice(WORDS) + str(rnd.randint(0, 99)) for _ in range(depth)))
+    files = {}
+    while len(files) < count:
+        d = rnd.choice(dirs)
+        name = f"{rnd.choice(WORDS)} {rnd.randint(0, 10 ** 6)}.md"
+        rel = f"{d}/{name}" if d else name
+        files[rel] = (rel, rnd.randint(10, 50_000), 1_700_000_000_000_000_000 + rnd.randint(0, 10 ** 15),
+                      rnd.randint(1, 2 ** 40), hashlib.sha1(rel.encode()).hexdigest())
+    return list(files.values())
+
+
+def build_legacy(files):
+    source_files = {}
+    for rel, size, mtime_ns, _, sha in files:
+        source_files[rel] = {
+            'mtime': mtime_ns / 1e9,
+            'size': size,
+            'hash': hashlib.md5(sha.encode()).hexdigest(),
+            'src': ROOT / rel,
+        }
+    local_rels = set(source_files)
+    return source_files, local_rels
+
+
+def build_entries(files):
+    entries = sorted((ManifestEntry(*f) for f in files), key=lambda e: e.path)
+    return entries, {e.path: e for e in entries}
+
+
+def build_compact(files):
+    builder = ManifestBuilder(ROOT)
+    for f in files:
+        builder.add(*f)
+    return builder.build()
+
+
+def fresh(files):
+    """Новые объекты строк на каждый замер — как при реальном обходе диска"""
+    for rel, size, mtime_ns, inode, sha in files:
+        yield rel.encode().decode(), size, mtime_ns, inode, sha.encode().decode()
+
+
+def measure(label, build, files):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    obj = build(fresh(files))
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} удержано {retained / 2 ** 20:8.1f} MB   пик {peak / 2 ** 20:8.1f} MB   {elapsed:6.2f} сек")
+    return obj, retained
+
+
+def diff_sets(a: dict, b: dict):
+    only_a = [p for p in a if p not in b]
+    changed = [p for p in a if p in b and a[p] != b[p]]
+    only_b = [p for p in b if p not in a]
+    return only_a, changed, only_b
+
+
+# ────────────────────────────────────────────────
+# Обращения к файловой системе за пуш
+# ────────────────────────────────────────────────
+
+class _CountedEntry:
+    """DirEntry, у которого считается первый (некэшированный) stat()"""
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stated = False
+
+    def stat(self, *args, **kwargs):
+        if not self._stated:
+            self._stated = True
+            self._counter["stat"] += 1
+        return self._entry.stat(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+
+class _CountedScandir:
+    def __init__(self, it, counter):
+        self._it = it
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        return (_CountedEntry(entry, self._counter) for entry in self._it)
+
+    def close(self):
+        self._it.close()
+
+
+class FsCounter:
+    """
+    Считает обращения к ФС из текущего потока: листинги папок (os.scandir),
+    stat (os.stat / os.lstat / DirEntry.stat), mkdir и открытия файлов.
+    Поток логгера пишет в файлы сам — его открытия не в счёт.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self._thread = threading.get_ident()
+        self._saved = {}
+
+    def _wrap(self, owner, name, kind):
+        original = getattr(owner, name)
+        self._saved[(owner, name)] = original
+
+        def counted(*args, **kwargs):
+            if threading.get_ident() == self._thread:
+                self.counts[kind] += 1
+            result = original(*args, **kwargs)
+            if kind == "scandir" and threading.get_ident() == self._thread:
+                return _CountedScandir(result, self.counts)
+            return result
+
+        setattr(owner, name, counted)
+
+    def __enter__(self):
+        self._wrap(os, "scandir", "scandir")
+        self._wrap(os, "stat", "stat")
+        self._wrap(os, "lstat", "stat")
+        self._wrap(os, "mkdir", "mkdir")
+        self._wrap(io, "open", "open")
+        self._wrap(builtins, "open", "open")
+        return self
+
+    def __exit__(self, *exc):
+        for (owner, name), original in self._saved.items():
+            setattr(owner, name, original)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+def make_vault(root: Path, count: int, seed: int = 1) -> None:
+    for rel, size, mtime_ns, _, _ in synthetic_files(count, seed):
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * (size % 4096))
+        os.utime(path, ns=(mtime_ns, mtime_ns))  # старый mtime: отпечатки попадают в кэш
+
+
+def legacy_push(vault: Path, staging: Path) -> None:
+    """Обращения к ФС пуша до общего манифеста (проходы — как в прежнем коде)"""
+    def md5(path: Path) -> str:
+        hasher = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(8192), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    # SmartSyncCopier: источник
+    source = {}
+    for src in vault.rglob("*"):
+        if src.is_dir() or not src.is_file():
+            continue
+        st = src.stat()
+        source[src.relative_to(vault).as_posix()] = (st.st_mtime, st.st_size, md5(src))
+    # SmartSyncCopier: цель
+    target = {}
+    for tgt in staging.rglob("*"):
+        if tgt.is_dir() or not tgt.is_file():
+            continue
+        st = tgt.stat()
+        target[tgt.relative_to(staging).as_posix()] = (st.st_mtime, st.st_size, md5(tgt))
+    for rel, info in source.items():
+        (staging / rel).parent.mkdir(parents=True, exist_ok=True)
+        assert target.get(rel, (0, 0, ""))[2] == info[2]  # staging синхронизирован
+    # collect_changes и индекс
+    for _ in range(2):
+        for f in staging.rglob("*"):
+            if not f.is_file():
+                continue
+    # tree: каждый файл читается целиком
+    for f in staging.rglob("*"):
+        if not f.is_file():
+            continue
+        f.read_bytes()
+
+
+def manifest_push(vault: Path, staging: Path, rules, cache: FingerprintCache) -> None:
+    """Обращения к ФС пуша с общим манифестом"""
+    from copy_item import SmartSyncCopier
+
+    manifest = scan_vault(vault, rules, cache)
+    SmartSyncCopier(vault, rules=rules).sync(staging, manifest=manifest)
+    deleted_root = staging / "deleted_files"
+    if deleted_root.is_dir():
+        for _ in rules.walk(deleted_root):
+            pass
+
+
+def bench_syscalls(count: int) -> float:
+    from ignore_rules import IgnoreRules, default_patterns
+
+    rules = IgnoreRules(default_patterns(), extensions=(".md",))
+    with tempfile.TemporaryDirectory(prefix="bench_manifest_") as tmp:
+        vault, staging = Path(tmp) / "vault", Path(tmp) / "staging"
+        make_vault(vault, count)
+        shutil.copytree(vault, staging)  # copy2: mtime_ns совпадает — staging синхронизирован
+        dirs = sum(1 for _ in vault.rglob("*")) - count
+
+        print(f"Хранилище на диске: {count} файлов, {dirs} папок\n")
+        cache = FingerprintCache(path=None, root=vault)
+        results = {}
+        for label, run in (("старый путь (5 проходов rglob)", lambda: legacy_push(vault, staging)),
+                           ("манифест, холодный кэш", lambda: manifest_push(vault, staging, rules, cache)),
+                           ("манифест, тёплый кэш", lambda: manifest_push(vault, staging, rules, cache))):
+            with FsCounter() as counter:
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+            c = counter.counts
+            results[label] = counter.total
+            print(f"{label:<32} всего {counter.total:8d}   scandir {c['scandir']:6d}   stat {c['stat']:7d}   "
+                  f"mkdir {c['mkdir']:6d}   open {c['open']:6d}   {elapsed:6.2f} сек")
+
+    legacy, cold, warm = results.values()
+    print(f"\nОбращений к ФС меньше: холодный кэш x{legacy / cold:.1f}, тёплый x{legacy / warm:.1f}")
+    return legacy / cold
+
+
+def main():
+    if "--syscalls" in sys.argv:
+        args = [a for a in sys.argv[1:] if a != "--syscalls"]
+        bench_syscalls(int(args[0]) if args else 5_000)
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Синтетическое хранилище: {count} файлов\n")
+    files = synthetic_files(count)
+
+    _, legacy = measure("1) dict на файл + set путей", build_legacy, files)
+    _, entries = measure("2) ManifestEntry + dict-индекс", build_entries, files)
+    compact, compact_size = measure("3) компактный Manifest", build_compact, files)
+
+    print(f"\nЭкономия против (1): x{legacy / compact_size:.1f}, против (2): x{entries / compact_size:.1f}")
+
+    # второй снимок: 1% изменено, 0.5% удалено, 0.5% добавлено
+    rnd = random.Random(2)
+    changed_files = []
+    for f in files:
+        roll = rnd.random()
+        if roll < 0.005:
+            continue
+        if roll < 0.015:
+            f = f[:4] + (hashlib.sha1(f[4].encode()).hexdigest(),)
+        changed_files.append(f)
+    changed_files += synthetic_files(count // 200, seed=3)
+    other = build_compact(changed_files)
+
+    started = time.perf_counter()
+    a, c, b = compact.diff(other)
+    merge_time = time.perf_counter() - started
+
+    map_a, map_b = compact.sha_map(), other.sha_map()
+    started = time.perf_counter()
+    a2, c2, b2 = diff_sets(map_a, map_b)
+    set_time = time.perf_counter() - started
+
+    assert (sorted(a), sorted(c), sorted(b)) == (sorted(a2), sorted(c2), sorted(b2))
+    print(f"\nСравнение снимков: только в первом {len(a)}, изменено {len(c)}, только во втором {len(b)}")
+    print(f"  merge join по компактным манифестам: {merge_time:.3f} сек (без промежуточных dict)")
+    print(f"  set/dict-разности по sha_map():       {set_time:.3f} сек (+ память на два dict)")
+
+    probe = files[len(files) // 2][0]
+    started = time.perf_counter()
+    for _ in range(10_000):
+        compact.index_of(probe)
+    print(f"  index_of (бинарный поиск): {(time.perf_counter() - started) / 10_000 * 1e6:.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+blob_store.py
+
+Работа с git-blob'ами на GitHub:
+
+✔ git_blob_sha — локальный SHA-1 blob'а (тот же, что вернёт GitHub)
+✔ BlobRegistry — какие blob'ы уже точно есть на remote (не загружаем повторно)
+✔ upload_blob — POST /git/blobs с регистрацией результата
+✔ upload_blob_file — потоковая загрузка больших файлов: mmap + base64 по частям
+  в тело запроса с Content-Length (в памяти — одна часть, а не весь файл ×4)
+✔ Все загрузки идут через rate_governor: паузы по лимитам и повтор вместо потери blob'а
+✔ SpeculativeUploader — фоновая загрузка blob'ов «стабильных» файлов,
+  пока debounce-таймер ещё отсчитывает (opt-in: SPECULATIVE_UPLOAD)
+
+Blob'ы адресуются содержимым, поэтому загрузка устаревшей версии файла
+безвредна — она просто не попадёт в tree.
+"""
+
+import base64
+import hashlib
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import requests
+
+from app_logger import log_main, log_soft
+from config import (
+    GITHUB_USERNAME,
+    GITHUB_REPO,
+    GITHUB_TOKEN,
+    WATCHED_FOLDER,
+    SPECULATIVE_STABLE_SECONDS,
+    STREAM_UPLOAD_THRESHOLD_KB,
+)
+from vault_manifest import file_blob_sha
+from rate_governor import governor
+
+
+STREAM_UPLOAD_THRESHOLD = STREAM_UPLOAD_THRESHOLD_KB * 1024
+STREAM_CHUNK_SIZE = 3 * 256 * 1024      # кратно 3 → части base64 склеиваются без паддинга
+STREAM_TIMEOUT = (10, 300)              # (connect, read) — большой файл идёт долго
+
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA-1 git-объекта blob: sha1(b"blob <len>\\0" + data)"""
+    hasher = hashlib.sha1(b"blob %d\0" % len(data))
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+# ────────────────────────────────────────────────
+# Реестр известных blob'ов
+# ────────────────────────────────────────────────
+
+class BlobRegistry:
+    """Потокобезопасное множество SHA blob'ов, которые уже есть на remote"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._known: set[str] = set()
+        self._speculative: set[str] = set()
+
+    def __contains__(self, sha: str) -> bool:
+        with self._lock:
+            return sha in self._known
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._known)
+
+    def add(self, sha: str, speculative: bool = False) -> None:
+        with self._lock:
+            self._known.add(sha)
+            if speculative:
+                self._speculative.add(sha)
+
+    def add_many(self, shas: Iterable[str]) -> None:
+        with self._lock:
+            self._known.update(shas)
+
+    def speculative_count(self) -> int:
+        with self._lock:
+            return len(self._speculative)
+
+    def forget_speculative(self) -> None:
+        """Сбросить спекулятивные загрузки (например, если tree их не принял)"""
+        with self._lock:
+            self._known.difference_update(self._speculative)
+            self._speculative.clear()
+
+
+registry = BlobRegistry()
+
+
+# ────────────────────────────────────────────────
+# Загрузка blob'а
+# ────────────────────────────────────────────────
+
+def _api_headers() -> dict:
+    return {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github.v3+json"}
+
+
+def upload_blob(data: bytes, timeout: int = 30, speculative: bool = False) -> str:
+    """
+    Загружает blob на GitHub и возвращает его SHA.
+    Исключения (сеть / HTTP) пробрасываются — решение принимает вызывающий.
+    """
+    b64 = base64.b64encode(data).decode('utf-8')
+    r = governor.request(
+        "POST",
+        f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/git/blobs",
+        nbytes=len(b64),
+        headers=_api_headers(),
+        json={"content": b64, "encoding": "base64"},
+        timeout=timeout
+    )
+    r.raise_for_status()
+    sha = r.json()['sha']
+    registry.add(sha, speculative=speculative)
+    return sha
+
+
+class _Base64JsonBody:
+    """
+    File-like тело запроса {"encoding":"base64","content":"..."}:
+    base64 считается по частям из mmap по мере чтения http-клиентом.
+    __len__ → requests выставляет Content-Length (без chunked-кодирования).
+    """
+
+    _PREFIX = b'{"encoding":"base64","content":"'
+    _SUFFIX = b'"}'
+
+    def __init__(self, mm: mmap.mmap, size: int):
+        self._mm = mm
+        self._size = size
+        self._pos = 0
+        self._buf = self._PREFIX
+        self._off = 0
+        self._done = False
+        self._length = len(self._PREFIX) + 4 * ((size + 2) // 3) + len(self._SUFFIX)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _refill(self) -> None:
+        if self._pos < self._size:
+            chunk = self._mm[self._pos:self._pos + STREAM_CHUNK_SIZE]
+            self._pos += len(chunk)
+            self._buf = base64.b64encode(chunk)
+        elif not self._done:
+            self._buf = self._SUFFIX
+            self._done = True
+        else:
+            self._buf = b""
+        self._off = 0
+
+    def read(self, n: int = -1) -> bytes:
+        if self._off >= len(self._buf):
+            self._refill()
+        if n is None or n < 0:
+            n = len(self._buf) - self._off
+        out = self._buf[self._off:self._off + n]
+        self._off += len(out)
+        return out
+
+
+def upload_blob_file(path: Path, timeout=STREAM_TIMEOUT, speculative: bool = False) -> str:
+    """Потоковая загрузка файла как blob'а (для файлов ≥ STREAM_UPLOAD_THRESHOLD)"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return upload_blob(b"", speculative=speculative)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            headers = _api_headers()
+            headers["Content-Type"] = "application/json"
+            body_size = len(_Base64JsonBody(mm, size))
+            # новое тело на каждую попытку: повтор после rate limit читает файл с начала
+            r = governor.call(
+                lambda: requests.post(
+                    f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/git/blobs",
+                    headers=headers,
+                    data=_Base64JsonBody(mm, size),
+                    timeout=timeout
+                ),
+                nbytes=body_size
+            )
+    r.raise_for_status()
+    sha = r.json()['sha']
+    registry.add(sha, speculative=speculative)
+    log_soft(f"[BLOB-STREAM] {path.name}: {size // 1024} KB загружено потоково ({sha[:10]})")
+    return sha
+
+
+def ensure_blob_file(path: Path, known_sha: Optional[str] = None, timeout: int = 30) -> tuple[str, bool]:
+    """
+    ensure_blob для файла на диске: маленькие читаются целиком,
+    большие хэшируются и загружаются потоково (файл целиком в память не попадает).
+    """
+    if known_sha is not None and known_sha in registry:
+        return known_sha, False
+    size = os.stat(path).st_size
+    if size < STREAM_UPLOAD_THRESHOLD:
+        return ensure_blob(Path(path).read_bytes(), timeout=timeout)
+    if known_sha is None:
+        known_sha, _ = file_blob_sha(str(path), size)
+        if known_sha in registry:
+            return known_sha, False
+    return upload_blob_file(Path(path)), True
+
+
+def ensure_blob(data: bytes, timeout: int = 30) -> tuple[str, bool]:
+    """
+    Гарантирует наличие blob'а на remote.
+    Возвращает (sha, uploaded): uploaded=False, если blob уже был известен.
+    """
+    sha = git_blob_sha(data)
+    if sha in registry:
+        return sha, False
+    return upload_blob(data, timeout=timeout), True
+
+
+# ────────────────────────────────────────────────
+# Снимок содержимого файлов на время пуша
+# ────────────────────────────────────────────────
+
+class FileSnapshot:
+    """
+    Байты файлов, прочитанные один раз за пуш (движок direct):
+    описание коммита, SHA и загрузка blob'а работают с одним буфером.
+    В памяти остаются только файлы, чьих blob'ов ещё нет на remote
+    (known_sha → SHA из манифеста), и только до их загрузки.
+    Большие файлы (≥ STREAM_UPLOAD_THRESHOLD) не буферизуются — они грузятся потоково.
+    """
+
+    def __init__(self, root: Path, known_sha: Optional[Callable[[str], Optional[str]]] = None):
+        self.root = Path(root)
+        self.known_sha = known_sha
+        self._data: dict[str, bytes] = {}
+
+    def _needs_upload(self, rel: str) -> bool:
+        sha = self.known_sha(rel) if self.known_sha is not None else None
+        return sha is None or sha not in registry
+
+    def read(self, rel: str) -> Optional[bytes]:
+        """None — файла нет или он не меньше STREAM_UPLOAD_THRESHOLD (не читается целиком)"""
+        data = self._data.get(rel)
+        if data is not None:
+            return data
+        path = self.root / rel
+        try:
+            if os.stat(path).st_size >= STREAM_UPLOAD_THRESHOLD:
+                log_soft(f"[SNAPSHOT] {rel}: большой файл — без diff, blob потоково")
+                return None
+            data = path.read_bytes()
+        except OSError as e:
+            log_soft(f"[SNAPSHOT] Не удалось прочитать {rel}: {e}")
+            return None
+        if self._needs_upload(rel):
+            self._data[rel] = data
+        return data
+
+    def text(self, rel: str) -> Optional[str]:
+        data = self.read(rel)
+        return data.decode('utf-8', errors='replace') if data is not None else None
+
+    def has(self, rel: str) -> bool:
+        return rel in self._data
+
+    def take(self, rel: str) -> Optional[bytes]:
+        """Отдать байты для загрузки и освободить буфер (None — файла в снимке нет)"""
+        return self._data.pop(rel, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# ────────────────────────────────────────────────
+# Спекулятивная загрузка во время debounce
+# ────────────────────────────────────────────────
+
+class SpeculativeUploader:
+    """
+    Получает «грязные» пути от watchdog, ждёт, пока файл перестанет меняться,
+    и заранее загружает его blob. Когда debounce сработает, do_push найдёт
+    SHA в registry и не будет загружать файл повторно.
+    """
+
+    TICK_SECONDS = 0.5
+
+    def __init__(
+        self,
+        root: Path = WATCHED_FOLDER,
+        stable_seconds: float = SPECULATIVE_STABLE_SECONDS,
+        include: Optional[Callable[[str], bool]] = None,
+    ):
+        self.root = Path(root)
+        self.stable_seconds = stable_seconds
+        self.include = include
+
+        self._lock = threading.Lock()
+        # abs_path → (время последнего события, (size, mtime_ns) последнего stat)
+        self._dirty: dict[str, tuple[float, Optional[tuple[int, int]]]] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def note(self, path: str) -> None:
+        """Вызывается из обработчика watchdog — только запоминает путь"""
+        with self._lock:
+            prev = self._dirty.get(path)
+            self._dirty[path] = (time.monotonic(), prev[1] if prev else None)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="speculative-upload", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    self._thread = None
+                    return
+            self._wake.wait(timeout=self.TICK_SECONDS)
+            self._wake.clear()
+            for path in self._take_stable():
+                self._upload(path)
+
+    def _take_stable(self) -> list[str]:
+        """
+        Пути без событий ≥ stable_seconds, чей stat не изменился с прошлой проверки
+        (или чей mtime уже старше stable_seconds — тогда хватает одной проверки).
+        stat — вне блокировки: note() на потоке watchdog не должен ждать обхода.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                (path, last_event, last_stat)
+                for path, (last_event, last_stat) in self._dirty.items()
+                if now - last_event >= self.stable_seconds
+            ]
+
+        checked = []
+        for path, last_event, last_stat in candidates:
+            try:
+                st = os.stat(path)
+            except OSError:
+                checked.append((path, last_event, None, False))  # удалён/перемещён
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            quiet = time.time() - st.st_mtime_ns / 1e9 >= self.stable_seconds
+            checked.append((path, last_event, current, current == last_stat or quiet))
+
+        ready = []
+        with self._lock:
+            for path, last_event, current, stable in checked:
+                entry = self._dirty.get(path)
+                if entry is None or entry[0] != last_event:
+                    continue  # пока шёл stat, пришло новое событие
+                if current is None:
+                    del self._dirty[path]  # загружать нечего
+                elif stable:
+                    ready.append(path)
+                    del self._dirty[path]
+                else:
+                    self._dirty[path] = (now, current)
+        return ready
+
+    def _upload(self, path: str) -> None:
+        try:
+            rel = Path(path).relative_to(self.root).as_posix()
+        except ValueError:
+            return
+        if self.include is not None and not self.include(rel):
+            return
+
+        try:
+            size = os.stat(path).st_size
+            if size >= STREAM_UPLOAD_THRESHOLD:
+                sha, _ = file_blob_sha(path, size)
+                data = None
+            else:
+                data = Path(path).read_bytes()
+                sha = git_blob_sha(data)
+        except OSError as e:
+            log_soft(f"[SPECULATIVE] Не удалось прочитать {rel}: {e}")
+            return
+
+        if sha in registry:
+            return
+
+        try:
+            if data is None:
+                upload_blob_file(Path(path), speculative=True)
+            else:
+                upload_blob(data, speculative=True)
+            log_soft(f"[SPECULATIVE] Blob загружен заранее: {rel} ({sha[:10]})")
+        except Exception as e:
+            # не страшно — do_push загрузит сам
+            log_main(f"[SPECULATIVE] Ошибка загрузки {rel}: {e}")
+
+
+_uploader: Optional[SpeculativeUploader] = None
+_uploader_lock = threading.Lock()
+
+
+def get_speculative_uploader() -> SpeculativeUploader:
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            from do_push import should_include_in_tree_and_index  # ленивый импорт
+            _uploader = SpeculativeUploader(include=should_include_in_tree_and_index)
+        return _uploader
@@ -0,0 +1,242 @@
+"""
+comment_outbox.py
+
+Персистентная очередь (outbox) комментариев к коммитам.
+
+✔ Один фоновый поток на всё приложение вместо Timer на каждый пуш
+✔ Очередь на диске (push_comments/outbox/*.json) — переживает перезапуск
+✔ Строгий порядок отправки (по времени постановки в очередь)
+✔ Учитывает Retry-After / X-RateLimit-* и вторичные лимиты GitHub
+✔ Пауза ≥ 1 сек между комментариями (рекомендация GitHub для content-запросов)
+✔ Сеть и 5xx повторяются без ограничения числа попыток; в failed/ уходят
+  только постоянные 4xx и повреждённые записи
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app_logger import log_main, log_soft, log_both
+from config import COMMENT_OUTBOX_DIR, COMMENT_DELAY_SECONDS
+from make_description import GitHubCommenter
+
+
+MIN_INTERVAL_SECONDS = 1.0     # между двумя комментариями
+BACKOFF_BASE_SECONDS = 4.0     # 4, 8, 16, ... затем каждые BACKOFF_MAX_SECONDS
+BACKOFF_MAX_SECONDS = 300.0
+IDLE_WAIT_SECONDS = 30.0
+
+
+class CommentOutbox:
+    def __init__(self, outbox_dir: Path = COMMENT_OUTBOX_DIR, delay_seconds: float = COMMENT_DELAY_SECONDS):
+        self.outbox_dir = Path(outbox_dir)
+        self.failed_dir = self.outbox_dir / "failed"
+        self.delay_seconds = delay_seconds
+
+        self.outbox_dir.mkdir(parents=True, exist_ok=True)
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # Не раньше этого момента (time.time()) — выставляется при rate limit
+        self._not_before = 0.0
+
+    # ───────────────────────────────────────────────
+    # Публичный API
+    # ───────────────────────────────────────────────
+
+    def enqueue(self, commit_sha: str, body: str) -> Optional[Path]:
+        """Кладёт комментарий в очередь на диске и будит worker. Не блокирует."""
+        if not body.strip():
+            log_main("[OUTBOX] Пустой комментарий — пропуск")
+            return None
+
+        entry = {
+            "sha": commit_sha,
+            "body": body,
+            "created": time.time(),
+            "ready_at": time.time() + self.delay_seconds,
+            "attempts": 0,
+        }
+        path = self.outbox_dir / f"{time.time_ns()}_{commit_sha[:12]}.json"
+
+        try:
+            self._write_entry(path, entry)
+        except Exception as e:
+            log_main(f"[OUTBOX] Не удалось сохранить комментарий для {commit_sha[:12]}: {e}")
+            return None
+
+        log_soft(f"[OUTBOX] Комментарий для {commit_sha[:12]} поставлен в очередь ({path.name})")
+        self.start()
+        self._wake.set()
+        return path
+
+    def pending(self) -> list[Path]:
+        """Ожидающие записи в порядке постановки"""
+        return sorted(self.outbox_dir.glob("*.json"))
+
+    def pause_until(self, timestamp: float) -> None:
+        """Откладывает отправку (используется при исчерпании лимитов)"""
+        self._not_before = max(self._not_before, timestamp)
+
+    def start(self) -> None:
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="comment-outbox", daemon=True)
+            self._thread.start()
+
+        left = len(self.pending())
+        if left:
+            log_both(f"[OUTBOX] Worker запущен, в очереди: {left}")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    # ───────────────────────────────────────────────
+    # Worker
+    # ───────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            items = self.pending()
+            if not items:
+                self._wake.wait(timeout=IDLE_WAIT_SECONDS)
+                self._wake.clear()
+                continue
+
+            # Обрабатываем всю накопившуюся пачку подряд, сохраняя порядок.
+            # Любая задержка головы очереди задерживает и всё, что за ней.
+            for path in items:
+                if self._stop.is_set():
+                    return
+                if not self._process(path):
+                    break
+
+    def _process(self, path: Path) -> bool:
+        """Обрабатывает одну запись. False → прервать пачку и начать цикл заново."""
+        entry = self._read_entry(path)
+        if entry is None:
+            return True
+
+        wait = max(self._not_before, entry.get("ready_at", 0.0)) - time.time()
+        if wait > 0:
+            # прерываемое ожидание: stop() не должен висеть; новые записи
+            # встают в хвост и всё равно ждут голову очереди
+            self._stop.wait(wait)
+            return False
+
+        status, delay = GitHubCommenter.post_once(entry["sha"], entry["body"])
+
+        if status == "ok":
+            self._remove(path)
+            self._stop.wait(MIN_INTERVAL_SECONDS)
+            return True
+
+        if status == "fatal":
+            self._move_to_failed(path, entry, "fatal")
+            return True
+
+        if status == "rate_limited":
+            self.pause_until(time.time() + delay)
+            return False
+
+        # retry — экспоненциальный backoff для головы очереди, без лимита попыток:
+        # сон ноутбука или обрыв Wi-Fi не должны терять комментарий
+        entry["attempts"] = entry.get("attempts", 0) + 1
+        exponent = min(entry["attempts"] - 1, 16)
+        backoff = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** exponent)
+        entry["ready_at"] = time.time() + backoff
+        try:
+            self._write_entry(path, entry)
+        except Exception as e:
+            log_main(f"[OUTBOX] Не удалось обновить {path.name}: {e}")
+        log_soft(f"[OUTBOX] {entry['sha'][:12]}: попытка {entry['attempts']}, повтор через {backoff:.0f} сек")
+        return False
+
+    # ───────────────────────────────────────────────
+    # Работа с файлами очереди
+    # ───────────────────────────────────────────────
+
+    @staticmethod
+    def _write_entry(path: Path, entry: dict) -> None:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _read_entry(self, path: Path) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if not entry.get("sha") or "body" not in entry:
+                raise ValueError("нет sha/body")
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log_main(f"[OUTBOX] Повреждённая запись {path.name}: {e}")
+            self._move_to_failed(path, None, "corrupt")
+            return None
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log_main(f"[OUTBOX] Не удалось удалить {path.name}: {e}")
+
+    def _move_to_failed(self, path: Path, entry: Optional[dict], reason: str) -> None:
+        sha = entry["sha"][:12] if entry else path.stem
+        log_main(f"[OUTBOX] Комментарий {sha} не отправлен ({reason}) → {self.failed_dir.name}/")
+        try:
+            self.failed_dir.mkdir(parents=True, exist_ok=True)
+            os.replace(path, self.failed_dir / path.name)
+        except Exception as e:
+            log_main(f"[OUTBOX] Не удалось переместить {path.name}: {e}")
+            self._remove(path)
+
+
+# ────────────────────────────────────────────────
+# Синглтон
+# ────────────────────────────────────────────────
+
+_outbox: Optional[CommentOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> CommentOutbox:
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = CommentOutbox()
+        return _outbox
+
+
+def enqueue_comment(commit_sha: str, body: str) -> Optional[Path]:
+    """Поставить комментарий в очередь (вызывается из do_push после пуша)"""
+    return get_outbox().enqueue(commit_sha, body)
+
+
+def start_outbox() -> None:
+    """Запуск worker'а при старте приложения — досылает то, что осталось с прошлого раза"""
+    get_outbox().start()
+
+
+def stop_outbox() -> None:
+    if _outbox is not None:
+        _outbox.stop()
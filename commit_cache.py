@@ -0,0 +1,338 @@
+"""
+commit_cache.py
+
+Локальный кэш истории коммитов и комментариев (SQLite) для списка пушей в GUI.
+
+✔ Список рисуется из кэша сразу при запуске, сеть — потом и в фоне
+✔ sync() догружает только коммиты новее самого нового в кэше: страницы /commits
+  читаются, пока не встретится известный SHA (история линейная — каждый пуш
+  ставит родителем HEAD)
+✔ Первая страница запрашивается с If-None-Match: ответ 304 не расходует лимит
+  GitHub, а периодическое обновление чаще всего ничего нового не находит
+✔ Известный SHA не найден за SYNC_MAX_PAGES страниц (история переписана или
+  слишком большой разрыв) — кэш заменяется свежими страницами
+✔ Старая история — по требованию: load_older() догружает страницу предков самого
+  старого коммита в кэше (?sha=<oldest>) — курсор не сдвигается от новых пушей,
+  в отличие от номера страницы
+✔ window(offset, limit) / position(sha) — для виртуального списка: в памяти
+  только видимое окно, вся история — на диске
+✔ Комментарии к коммитам: показываются из кэша, перепроверяются в фоне
+✔ Соединение на поток (WAL): чтение в потоке Tk не ждёт запись из пула
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from app_logger import log_main, log_soft
+import config
+
+
+COMMIT_CACHE_FILE = config.SCRIPT_DIR / "commit_cache.sqlite3"
+SYNC_PAGE_SIZE = 30       # как у GitHub по умолчанию
+SYNC_MAX_PAGES = 5
+GITHUB_MAX_PER_PAGE = 100 # больше per_page GitHub не отдаёт
+INITIAL_PAGE_SIZE = 100   # пустой кэш: одна страница (максимум GitHub)
+HISTORY_PAGE_SIZE = 99    # страница старой истории: + сам oldest = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    repo    TEXT NOT NULL,
+    sha     TEXT NOT NULL,
+    seq     INTEGER NOT NULL,          -- больше = новее
+    message TEXT NOT NULL,
+    author  TEXT,
+    date    TEXT,
+    PRIMARY KEY (repo, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_by_seq ON commits (repo, seq);
+CREATE TABLE IF NOT EXISTS comments (
+    repo       TEXT NOT NULL,
+    sha        TEXT NOT NULL,
+    payload    TEXT NOT NULL,          -- JSON: [{user, created_at, body, html_url}]
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (repo, sha)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    repo  TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (repo, key)
+);
+"""
+
+# fetch_page(page, per_page, etag) → (коммиты JSON или None при 304, новый ETag)
+FetchPage = Callable[[int, int, Optional[str]], Tuple[Optional[list], Optional[str]]]
+# fetch_older(sha, per_page) → коммиты JSON: sha и его предки, новые первыми
+FetchOlder = Callable[[str, int], list]
+
+
+class CachedCommit(NamedTuple):
+    sha: str
+    message: str
+    author: str
+    date: str
+
+    @property
+    def title(self) -> str:
+        return (self.message.splitlines() or [""])[0]
+
+    @classmethod
+    def from_api(cls, item: dict) -> "CachedCommit":
+        commit = item.get("commit", {})
+        author = commit.get("author") or {}
+        return cls(item["sha"], commit.get("message", ""), author.get("name", ""), author.get("date", ""))
+
+
+def compact_comments(comments: list) -> List[dict]:
+    """Из ответа /comments — только то, что показывает GUI"""
+    return [
+        {
+            "user": c.get("user", {}).get("login", "—"),
+            "created_at": c.get("created_at", "—"),
+            "body": c.get("body", "(пусто)"),
+            "html_url": c.get("html_url", "—"),
+        }
+        for c in comments
+    ]
+
+
+class CommitCache:
+    def __init__(self, path: Path = COMMIT_CACHE_FILE):
+        self.path = Path(path)
+        self.repo_key = f"{config.GITHUB_USERNAME}/{config.GITHUB_REPO}"
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+
+    # ─── соединение ───
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            try:
+                db = self._connect()
+            except sqlite3.DatabaseError as e:
+                # файл повреждён — кэш восстановим из сети
+                log_main(f"[COMMIT-CACHE] База повреждена ({e}) — создаём заново")
+                for suffix in ("", "-wal", "-shm"):
+                    Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+                db = self._connect()
+            self._local.db = db
+        return db
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.path), timeout=10)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+        except sqlite3.Error:
+            db.close()  # иначе файл не удалить (Windows)
+            raise
+        return db
+
+    # ─── коммиты ───
+
+    def recent(self, limit: int) -> List[CachedCommit]:
+        """Самые новые коммиты, новые первыми"""
+        try:
+            rows = self._db().execute(
+                "SELECT sha, message, author, date FROM commits WHERE repo = ? ORDER BY seq DESC LIMIT ?",
+                (self.repo_key, limit),
+            ).fetchall()
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения: {e}")
+            return []
+        return [CachedCommit(*row) for row in rows]
+
+    def window(self, offset: int, limit: int) -> List[CachedCommit]:
+        """limit коммитов начиная с offset-го от самого нового"""
+        try:
+            rows = self._db().execute(
+                "SELECT sha, message, author, date FROM commits WHERE repo = ? "
+                "ORDER BY seq DESC LIMIT ? OFFSET ?",
+                (self.repo_key, limit, max(0, offset)),
+            ).fetchall()
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения: {e}")
+            return []
+        return [CachedCommit(*row) for row in rows]
+
+    def count(self) -> int:
+        try:
+            return self._db().execute(
+                "SELECT COUNT(*) FROM commits WHERE repo = ?", (self.repo_key,)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения: {e}")
+            return 0
+
+    def position(self, sha: str) -> Optional[int]:
+        """Сколько коммитов новее sha (None — sha нет в кэше)"""
+        try:
+            row = self._db().execute(
+                "SELECT seq FROM commits WHERE repo = ? AND sha = ?", (self.repo_key, sha)
+            ).fetchone()
+            if row is None:
+                return None
+            return self._db().execute(
+                "SELECT COUNT(*) FROM commits WHERE repo = ? AND seq > ?", (self.repo_key, row[0])
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения: {e}")
+            return None
+
+    def history_complete(self) -> bool:
+        """В кэше вся история, вплоть до первого коммита"""
+        return self._meta("complete") == "1"
+
+    def newest_sha(self) -> Optional[str]:
+        try:
+            row = self._db().execute(
+                "SELECT sha FROM commits WHERE repo = ? ORDER BY seq DESC LIMIT 1", (self.repo_key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения: {e}")
+            return None
+        return row[0] if row else None
+
+    def _meta(self, key: str) -> Optional[str]:
+        try:
+            row = self._db().execute(
+                "SELECT value FROM meta WHERE repo = ? AND key = ?", (self.repo_key, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения: {e}")
+            return None
+        return row[0] if row else None
+
+    def _set_meta(self, db: sqlite3.Connection, key: str, value: Optional[str]) -> None:
+        db.execute(
+            "INSERT OR REPLACE INTO meta (repo, key, value) VALUES (?, ?, ?)", (self.repo_key, key, value)
+        )
+
+    def _store(self, fresh: List[CachedCommit], replace: bool, etag: Optional[str], complete: bool = False) -> None:
+        """fresh — новые первыми; добавляются поверх кэша или заменяют его"""
+        db = self._db()
+        with db:
+            if replace:
+                db.execute("DELETE FROM commits WHERE repo = ?", (self.repo_key,))
+                self._set_meta(db, "complete", "1" if complete else "0")
+                top = 0
+            else:
+                top = db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM commits WHERE repo = ?", (self.repo_key,)
+                ).fetchone()[0]
+            db.executemany(
+                "INSERT OR REPLACE INTO commits (repo, sha, seq, message, author, date) VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.repo_key, c.sha, top + len(fresh) - i, c.message, c.author, c.date)
+                 for i, c in enumerate(fresh)],
+            )
+            self._set_meta(db, "etag", etag)
+
+    def sync(
+        self,
+        fetch_page: FetchPage,
+        per_page: int = SYNC_PAGE_SIZE,
+        max_pages: int = SYNC_MAX_PAGES,
+        initial_page: int = INITIAL_PAGE_SIZE,
+    ) -> int:
+        """
+        Догрузить коммиты новее самого нового в кэше.
+        Возвращает число новых коммитов (-1 — кэш заменён целиком).
+        Ошибки сети пробрасываются — кэш при этом не меняется.
+        """
+        with self._sync_lock:
+            newest = self.newest_sha()
+            etag = self._meta("etag") if newest else None
+            if newest is None:
+                per_page, max_pages = initial_page, 1
+
+            fresh: List[CachedCommit] = []
+            first_etag = None
+            reached_end = False
+            for page in range(1, max_pages + 1):
+                data, page_etag = fetch_page(page, per_page, etag if page == 1 else None)
+                if page == 1:
+                    if data is None:
+                        return 0  # 304: ничего нового
+                    first_etag = page_etag
+                for item in data or ():
+                    if item["sha"] == newest:
+                        self._store(fresh, replace=False, etag=first_etag)
+                        if fresh:
+                            log_soft(f"[COMMIT-CACHE] Новых коммитов: {len(fresh)}")
+                        return len(fresh)
+                    fresh.append(CachedCommit.from_api(item))
+                if not data or len(data) < per_page:
+                    reached_end = True
+                    break  # конец истории
+
+            if not fresh:
+                return 0  # пустой ответ — не повод стирать кэш
+            self._store(fresh, replace=True, etag=first_etag, complete=reached_end)
+            if newest is not None:
+                log_main(f"[COMMIT-CACHE] {newest[:8]} не найден в истории remote — кэш заменён "
+                         f"({len(fresh)} коммитов)")
+            return -1
+
+    def load_older(self, fetch_older: FetchOlder, per_page: int = HISTORY_PAGE_SIZE) -> int:
+        """
+        Догрузить страницу истории старше самого старого коммита в кэше.
+        Возвращает число добавленных коммитов. Ошибки сети пробрасываются.
+        """
+        with self._sync_lock:
+            row = self._db().execute(
+                "SELECT sha, seq FROM commits WHERE repo = ? ORDER BY seq ASC LIMIT 1", (self.repo_key,)
+            ).fetchone()
+            if row is None or self.history_complete():
+                return 0
+            oldest, bottom = row
+
+            # ответ начинается с самого oldest — берём на один больше,
+            # но не больше, чем GitHub отдаёт за страницу
+            requested = min(per_page + 1, GITHUB_MAX_PER_PAGE)
+            data = fetch_older(oldest, requested)
+            older = [CachedCommit.from_api(item) for item in data if item["sha"] != oldest]
+
+            db = self._db()
+            with db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO commits (repo, sha, seq, message, author, date) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(self.repo_key, c.sha, bottom - 1 - i, c.message, c.author, c.date)
+                     for i, c in enumerate(older)],
+                )
+                if len(data) < requested or not older:
+                    self._set_meta(db, "complete", "1")
+            log_soft(f"[COMMIT-CACHE] Старая история: +{len(older)} коммитов")
+            return len(older)
+
+    # ─── комментарии ───
+
+    def comments(self, sha: str) -> Optional[List[dict]]:
+        """Комментарии из кэша или None, если их ещё не загружали"""
+        try:
+            row = self._db().execute(
+                "SELECT payload FROM comments WHERE repo = ? AND sha = ?", (self.repo_key, sha)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            log_main(f"[COMMIT-CACHE] Ошибка чтения комментариев: {e}")
+            return None
+
+    def store_comments(self, sha: str, comments: List[dict]) -> None:
+        try:
+            db = self._db()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO comments (repo, sha, payload, fetched_at) VALUES (?, ?, ?, ?)",
+                    (self.repo_key, sha, json.dumps(comments, ensure_ascii=False), time.time()),
+                )
+        except sqlite3.Error as e:
+            log_main(f"[COMMIT-CACHE] Ошибка записи комментариев: {e}")
+
+
+commit_cache = CommitCache()
@@ -10,7 +10,7 @@ from typing import Union
 import dotenv
 from dataclasses import dataclass
 
-from app_logger import log_main, log_soft, log_both
+from app_logger import log_main, log_soft, log_both, configure_logging, configure_rotation
 
 
 # ────────────────────────────────────────────────────────────────
@@ -42,6 +42,44 @@ VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
 
 dotenv.load_dotenv()   # загружаем .env из текущей директории
 
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    """Читает целое из .env; при ошибке или значении < minimum → default"""
+    raw = os.getenv(name, "").strip().strip('"')
+    if not raw:
+        return default
+    try:
+        value = int(float(raw))
+    except (ValueError, TypeError):
+        log_main(f"[CONFIG] Некорректное значение {name}='{raw}' → используется {default}")
+        return default
+    if value < minimum:
+        log_main(f"[CONFIG] {name}={value} < {minimum} → используется {default}")
+        return default
+    return value
+
+
+def _env_list(name: str, default: tuple[str, ...] = ()) -> tuple[str, ...]:
+    """Читает список из .env через запятую/точку с запятой"""
+    raw = os.getenv(name, "").strip().strip('"')
+    if not raw:
+        return default
+    return tuple(item.strip() for item in raw.replace(";", ",").split(",") if item.strip())
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Читает флаг из .env: 1/true/yes/on → True, 0/false/no/off → False"""
+    raw = os.getenv(name, "").strip().strip('"').lower()
+    if not raw:
+        return default
+    if raw in ("1", "true", "yes", "on"):
+        return True
+    if raw in ("0", "false", "no", "off"):
+        return False
+    log_main(f"[CONFIG] Некорректное значение {name}='{raw}' → используется {default}")
+    return default
+
+
 GITHUB_USERNAME = os.getenv("GITHUB_USERNAME", "").strip('"')
 GITHUB_REPO     = os.getenv("GITHUB_REPO",     "").strip('"')
 GITHUB_TOKEN    = os.getenv("GITHUB_TOKEN",    "").strip('"')
@@ -96,6 +134,16 @@ else:
 debounce_timer = None
 push_lock = False
 
+# ────────────────────────────────────────────────────────────────
+# Шторм событий watchdog (OneDrive resync, git pull, переиндексация)
+# ────────────────────────────────────────────────────────────────
+
+# Больше стольких событий за секунду → режим шторма (без обработки по событию)
+STORM_EVENTS_PER_SECOND = _env_int("STORM_EVENTS_PER_SECOND", 200, minimum=10)
+
+# Шаг проверки затишья; шторм заканчивается, когда темп падает в 10 раз
+STORM_QUIET_SECONDS = _env_int("STORM_QUIET_SECONDS", 3, minimum=1)
+
 # ────────────────────────────────────────────────────────────────
 # Игнорируемые директории
 # ────────────────────────────────────────────────────────────────
@@ -110,6 +158,102 @@ IGNORED_DIRS = {
     "push_comments",
 }
 
+# Дополнительные .gitignore-паттерны из .env (например: IGNORE_PATTERNS="drafts/,*.bak")
+# Плюс .gitignore в корне WATCHED_FOLDER — см. ignore_rules.py
+IGNORE_PATTERNS = _env_list("IGNORE_PATTERNS")
+
+def _env_extensions(name: str, default: tuple[str, ...]) -> tuple[str, ...]:
+    """Список расширений из .env → нижний регистр, с точкой"""
+    return tuple(
+        e.lower() if e.startswith(".") else f".{e.lower()}"
+        for e in _env_list(name, default)
+    )
+
+
+# Какие текстовые файлы синхронизируются (для них строится diff в описании)
+SYNC_EXTENSIONS = _env_extensions("SYNC_EXTENSIONS", (".md", ".json"))
+
+# Вложения хранилища (картинки, PDF, аудио) — opt-in: SYNC_ATTACHMENTS=true
+SYNC_ATTACHMENTS = _env_bool("SYNC_ATTACHMENTS", False)
+ATTACHMENT_EXTENSIONS = _env_extensions("ATTACHMENT_EXTENSIONS", (
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp",
+    ".pdf",
+    ".mp3", ".m4a", ".wav", ".ogg", ".flac",
+    ".mp4", ".webm", ".mov",
+))
+
+# Вложения больше этого размера не загружаются (лимит GitHub на blob — 100 MB)
+ATTACHMENT_MAX_MB = _env_int("ATTACHMENT_MAX_MB", 50, minimum=1)
+
+
+# ────────────────────────────────────────────────────────────────
+# Генерация описания коммита
+# ────────────────────────────────────────────────────────────────
+
+# Начиная с какого числа файлов diff'ы считаются в пуле процессов
+DESCRIPTION_POOL_THRESHOLD = _env_int("DESCRIPTION_POOL_THRESHOLD", 200, minimum=1)
+
+# Размер пула (0 → по числу ядер)
+DESCRIPTION_POOL_WORKERS = _env_int("DESCRIPTION_POOL_WORKERS", 0)
+
+
+# ────────────────────────────────────────────────────────────────
+# Спекулятивная загрузка blob'ов во время debounce (opt-in)
+# ────────────────────────────────────────────────────────────────
+
+SPECULATIVE_UPLOAD = _env_bool("SPECULATIVE_UPLOAD", False)
+
+# Файл считается «стабильным», если столько секунд не было событий и stat не менялся
+SPECULATIVE_STABLE_SECONDS = _env_int("SPECULATIVE_STABLE_SECONDS", 2, minimum=1)
+
+
+# ────────────────────────────────────────────────────────────────
+# Движок пуша
+# ────────────────────────────────────────────────────────────────
+
+# "staging" — копия в fake_git_temp + локальный индекс pygit2 (как раньше)
+# "direct"  — blob'ы читаются прямо из WATCHED_FOLDER, без копии в staging
+PUSH_ENGINE = os.getenv("PUSH_ENGINE", "staging").strip().strip('"').lower()
+if PUSH_ENGINE not in ("staging", "direct"):
+    log_main(f"[CONFIG] Неизвестный PUSH_ENGINE='{PUSH_ENGINE}' → используется staging")
+    PUSH_ENGINE = "staging"
+
+# Файлы не меньше этого размера загружаются потоково (mmap + base64 по частям)
+STREAM_UPLOAD_THRESHOLD_KB = _env_int("STREAM_UPLOAD_THRESHOLD_KB", 4096, minimum=64)
+
+# Как копировать в staging: auto (reflink → copy_file_range → copy), copy, hardlink.
+# hardlink — только если staging никто не меняет на месте (это тот же файл, что в хранилище)
+STAGING_COPY_MODE = os.getenv("STAGING_COPY_MODE", "auto").strip().strip('"').lower()
+if STAGING_COPY_MODE not in ("auto", "copy", "hardlink"):
+    log_main(f"[CONFIG] Неизвестный STAGING_COPY_MODE='{STAGING_COPY_MODE}' → используется auto")
+    STAGING_COPY_MODE = "auto"
+
+
+# ────────────────────────────────────────────────────────────────
+# Лимиты GitHub API и транспорт пуша
+# ────────────────────────────────────────────────────────────────
+
+# Вторичные лимиты на content-запросы (blob / tree / commit / комментарий)
+API_CONTENT_PER_MINUTE = _env_int("API_CONTENT_PER_MINUTE", 80, minimum=1)
+API_CONTENT_PER_HOUR = _env_int("API_CONTENT_PER_HOUR", 500, minimum=1)
+
+# Потолок скорости загрузки blob'ов, КБ/сек (0 — без ограничения)
+API_UPLOAD_KBPS = _env_int("API_UPLOAD_KBPS", 0)
+
+# Сколько запросов первичного лимита (X-RateLimit-Remaining) не тратить на пуш — для GUI
+API_RESERVE_REQUESTS = _env_int("API_RESERVE_REQUESTS", 50)
+
+# "auto" — REST API, а pack (git push через pygit2) если бюджета не хватает
+# "api"  — только REST API;  "pack" — всегда git push
+PUSH_TRANSPORT = os.getenv("PUSH_TRANSPORT", "auto").strip().strip('"').lower()
+if PUSH_TRANSPORT not in ("auto", "api", "pack"):
+    log_main(f"[CONFIG] Неизвестный PUSH_TRANSPORT='{PUSH_TRANSPORT}' → используется auto")
+    PUSH_TRANSPORT = "auto"
+
+# auto: pack, если blob'ов для загрузки не меньше этого или ожидание лимитов дольше N секунд
+PACK_TRANSPORT_MIN_BLOBS = _env_int("PACK_TRANSPORT_MIN_BLOBS", 150, minimum=1)
+PACK_TRANSPORT_MAX_WAIT = _env_int("PACK_TRANSPORT_MAX_WAIT", 60)
+
 
 # ────────────────────────────────────────────────────────────────
 # Пути git-файлов и служебных папок
@@ -120,10 +264,14 @@ GITATTRIBUTES_PATH = REPO_PATH / ".gitattributes"
 
 DELETED_DIR       = REPO_PATH / "deleted"
 PUSH_COMMENTS_DIR = SCRIPT_DIR / "push_comments"
+COMMENT_OUTBOX_DIR = PUSH_COMMENTS_DIR / "outbox"
 
-for path in [DELETED_DIR, PUSH_COMMENTS_DIR]:
+for path in [DELETED_DIR, PUSH_COMMENTS_DIR, COMMENT_OUTBOX_DIR]:
     path.mkdir(parents=True, exist_ok=True)
 
+# Через сколько секунд после пуша outbox отправляет комментарий
+COMMENT_DELAY_SECONDS = _env_int("COMMENT_DELAY_SECONDS", 10)
+
 
 # ────────────────────────────────────────────────────────────────
 # Логи
@@ -133,6 +281,28 @@ LOG_FILE        = SCRIPT_DIR / "logger.txt"
 SOFTLOGGER_FILE = SCRIPT_DIR / "loggerm.txt"
 COM_LOG_FILE    = SCRIPT_DIR / "comlogger.txt"
 
+# Категории логов: soft (loggerm.txt), debug (syslog.txt),
+# trace — строка на каждый файл пуша ([TREE-ADD], [INDEX-ADD], [COPY-OK]...) — дорого на больших пушах
+LOG_SOFT  = _env_bool("LOG_SOFT", True)
+LOG_DEBUG = _env_bool("LOG_DEBUG", True)
+LOG_TRACE = _env_bool("LOG_TRACE", False)
+configure_logging(soft=LOG_SOFT, debug=LOG_DEBUG, trace=LOG_TRACE)
+
+# Ротация logger.txt / loggerm.txt / syslog.txt: размер сегмента (КБ, 0 — без ротации)
+# и сколько старых сегментов (*.txt.1 … *.txt.N) хранить
+LOG_SEGMENT_KB = _env_int("LOG_SEGMENT_KB", 1024)
+LOG_SEGMENTS   = _env_int("LOG_SEGMENTS", 3)
+configure_rotation(segment_bytes=LOG_SEGMENT_KB * 1024, segments=LOG_SEGMENTS)
+
+# Окна логов в GUI: не больше строк в виджете, период вывода (мс), буфер между выводами
+GUI_LOG_MAX_LINES    = _env_int("GUI_LOG_MAX_LINES", 2000, minimum=100)
+GUI_LOG_FLUSH_MS     = _env_int("GUI_LOG_FLUSH_MS", 100, minimum=16)
+GUI_LOG_BUFFER_LINES = _env_int("GUI_LOG_BUFFER_LINES", 1000, minimum=50)
+
+# Фоновые задачи GUI (сеть, pygit2): потоков в пуле и период разбора результатов (мс)
+GUI_TASK_WORKERS = _env_int("GUI_TASK_WORKERS", 4, minimum=1)
+GUI_TASK_POLL_MS = _env_int("GUI_TASK_POLL_MS", 50, minimum=10)
+
 
 # ────────────────────────────────────────────────────────────────
 # Lazy imports
@@ -159,15 +329,20 @@ def get_run_logger_clean():
     global _cleaner
     if _cleaner is None:
         try:
-            from make_description import run_logger_clean
-            _cleaner = run_logger_clean
+            from log_cleaner import schedule_log_clean
+            _cleaner = schedule_log_clean
         except ImportError:
             _cleaner = lambda: None
     return _cleaner
 
 
-parser_logger = get_parser_logger
-run_logger_clean = get_run_logger_clean
+def parser_logger(*args, **kwargs):
+    return get_parser_logger()(*args, **kwargs)
+
+
+def run_logger_clean():
+    """Очистка logger.txt от push-комментариев в фоновом потоке (не блокирует)"""
+    get_run_logger_clean()()
 
 
 # ────────────────────────────────────────────────────────────────
@@ -302,12 +477,46 @@ __all__ = [
     "VERSIONS_DIR",
     "DELETED_TEMP",
     "IGNORED_DIRS",
+    "IGNORE_PATTERNS",
+    "SYNC_EXTENSIONS",
+    "SYNC_ATTACHMENTS",
+    "ATTACHMENT_EXTENSIONS",
+    "ATTACHMENT_MAX_MB",
     "GITHUB_USERNAME",
     "GITHUB_REPO",
     "GITHUB_TOKEN",
     "GITHUB_REPO_URL",
     "GITHUB_PROFILE_URL",
     "DEBOUNCE_SECONDS",
+    "DESCRIPTION_POOL_THRESHOLD",
+    "DESCRIPTION_POOL_WORKERS",
+    "SPECULATIVE_UPLOAD",
+    "SPECULATIVE_STABLE_SECONDS",
+    "PUSH_ENGINE",
+    "STAGING_COPY_MODE",
+    "STREAM_UPLOAD_THRESHOLD_KB",
+    "API_CONTENT_PER_MINUTE",
+    "API_CONTENT_PER_HOUR",
+    "API_UPLOAD_KBPS",
+    "API_RESERVE_REQUESTS",
+    "PUSH_TRANSPORT",
+    "PACK_TRANSPORT_MIN_BLOBS",
+    "PACK_TRANSPORT_MAX_WAIT",
+    "PUSH_COMMENTS_DIR",
+    "COMMENT_OUTBOX_DIR",
+    "COMMENT_DELAY_SECONDS",
+    "LOG_SOFT",
+    "LOG_DEBUG",
+    "LOG_TRACE",
+    "LOG_SEGMENT_KB",
+    "LOG_SEGMENTS",
+    "GUI_LOG_MAX_LINES",
+    "GUI_LOG_FLUSH_MS",
+    "GUI_LOG_BUFFER_LINES",
+    "GUI_TASK_WORKERS",
+    "GUI_TASK_POLL_MS",
+    "STORM_EVENTS_PER_SECOND",
+    "STORM_QUIET_SECONDS",
     "debounce_timer",
     "push_lock",
     "settings",
@@ -0,0 +1,61 @@
+"""
+diff_worker.py
+
+Чистые (без логгера, config и сети) функции построения diff-строк.
+Модуль специально лёгкий: его импортируют процессы пула CommitAnalyzer,
+поэтому здесь нельзя тянуть config / app_logger / requests.
+"""
+
+import difflib
+from typing import List, Optional, Tuple
+
+# Константы
+MAX_LINE_LENGTH = 200
+MAX_LINES_PER_FILE = 10
+
+# Тип задачи для пула: (rel_path, old_content, new_content, kind)
+# kind: "added" / "modified" / "deleted"
+DiffJob = Tuple[str, Optional[str], Optional[str], str]
+
+
+def generate_diff(old_content: Optional[str], new_content: Optional[str], rel_path: str,
+                  is_added: bool = False, is_deleted: bool = False) -> List[str]:
+    """Генерирует diff-строки. Возвращает ТОЛЬКО значимые + и - строки"""
+    if is_added and new_content:
+        lines = new_content.splitlines()
+        diff_lines = [f"* {line[:MAX_LINE_LENGTH]}" for line in lines if line.strip()]
+    elif is_deleted and old_content:
+        lines = old_content.splitlines()
+        diff_lines = [f"- {line[:MAX_LINE_LENGTH]}" for line in lines if line.strip()]
+    else:
+        # modified
+        old_lines = old_content.splitlines() if old_content else []
+        new_lines = new_content.splitlines() if new_content else []
+        diff = difflib.unified_diff(old_lines, new_lines, n=0)
+        diff_lines = []
+        for line in diff:
+            if line.startswith('+') and not line.startswith('+++'):
+                cleaned = line[1:].strip()
+                if cleaned:
+                    diff_lines.append(f"* {cleaned[:MAX_LINE_LENGTH]}")
+            elif line.startswith('-') and not line.startswith('---'):
+                cleaned = line[1:].strip()
+                if cleaned:
+                    diff_lines.append(f"- {cleaned[:MAX_LINE_LENGTH]}")
+
+    # Ограничение количества строк
+    if len(diff_lines) > MAX_LINES_PER_FILE:
+        diff_lines = diff_lines[:MAX_LINES_PER_FILE // 2] + ['... (ещё строки опущены)'] + diff_lines[-MAX_LINES_PER_FILE // 2:]
+
+    return diff_lines
+
+
+def run_diff_job(job: DiffJob) -> Tuple[str, str, List[str]]:
+    """Точка входа для пула процессов: одна задача → (rel, kind, diff_lines)"""
+    rel, old_content, new_content, kind = job
+    diff_lines = generate_diff(
+        old_content, new_content, rel,
+        is_added=(kind == "added"),
+        is_deleted=(kind == "deleted"),
+    )
+    return rel, kind, diff_lines
@@ -12,19 +12,18 @@ import time
 import base64
 import requests
 from pathlib import Path
-import threading
 import os
 import tempfile
 import glob
 import pygit2
 
-from typing import Optional, List, Tuple, Callable
+from typing import Optional, List, Tuple, Callable, Dict
 
 from observer_manager import start_observer, stop_observer, is_observer_running, restart_observer
 
 from copy_item import sync_changed_files
 
-from app_logger import log_main, log_both, log_soft, init_logger
+from app_logger import log_main, log_both, log_soft, log_trace, trace_enabled, init_logger
 
 from config import (
     GITHUB_USERNAME,
@@ -37,10 +36,20 @@ from config import (
     VERSIONS_DIR,
     FAKE_PUSH_GIT,
     SCRIPT_DIR,
+    SYNC_EXTENSIONS,
+    PUSH_ENGINE,
 )
 
 # Импорт из make_description.py
-from make_description import CommitAnalyzer, GitHubCommenter
+from make_description import CommitAnalyzer, github_api_get_file_content
+from comment_outbox import enqueue_comment, get_outbox
+from rate_governor import governor
+from pack_transport import push_via_pack
+from blob_store import (
+    ensure_blob, ensure_blob_file, git_blob_sha, FileSnapshot, registry as blob_registry, STREAM_UPLOAD_THRESHOLD
+)
+from ignore_rules import get_rules, reload_rules, is_text_file
+from vault_manifest import Manifest, ManifestEntry, scan_vault, remote_cache, keep_excluded, file_blob_sha
 
 
 # Получаем директорию скрипта
@@ -51,7 +60,7 @@ if not FAKE_PUSH_GIT.is_absolute():
     FAKE_PUSH_GIT = script_dir / FAKE_PUSH_GIT
 
 # Константы
-SUPPORTED_EXTENSIONS = (".md", ".json")
+SUPPORTED_EXTENSIONS = SYNC_EXTENSIONS
 MAX_BLOCK_LENGTH = 1300
 
 VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
@@ -77,17 +86,6 @@ def clear_python_cache():
         log_main(f"[CACHE-CLEAN-ERROR] Не удалось очистить кэш: {e}")
 
 
-def is_malformed_path(rel_path: str) -> bool:
-    forbidden_parts = {'.git', '.obsidian', '__MACOSX'}
-    if rel_path.startswith('/'): return True
-    if rel_path.endswith('/'): return True
-    if '//' in rel_path: return True
-    if '..' in rel_path.split('/'): return True
-    if any(c in rel_path for c in '\x00-\x1f\x7f<>:"\\|?*'): return True
-    if any(part in forbidden_parts for part in rel_path.split('/')): return True
-    return False
-
-
 def normalize_path(rel_path: str) -> str:
     rel_path = rel_path.lstrip('./').lstrip('/')
     rel_path = rel_path.rstrip('/')
@@ -104,6 +102,8 @@ def normalize_path(rel_path: str) -> str:
 
 
 def debug_directory_contents(dir_path: Path, label: str):
+    if not trace_enabled():
+        return  # обход папки — только ради лога
     log_both(f"[DEBUG] {label} ({dir_path}):")
     if not dir_path.exists():
         log_both("[DEBUG] Директория не существует")
@@ -132,8 +132,6 @@ def clear_temp_repo_content(temp_repo_path: Path):
     git_dir = temp_repo_path / ".git"
     keep = {git_dir} if git_dir.exists() else set()
 
-    debug_directory_contents(temp_repo_path, "Перед очисткой fake_git_temp")
-
     for item in list(temp_repo_path.iterdir()):
         if item in keep:
             continue
@@ -270,7 +268,7 @@ def github_api_get_current_head() -> Optional[str]:
 
     for attempt in range(1, 4):
         try:
-            r = requests.get(url, headers=headers, timeout=30)
+            r = governor.request("GET", url, content=False, headers=headers, timeout=30)
             log_both(f"[API-HEAD] статус {r.status_code} (попытка {attempt})")
             r.raise_for_status()
             sha = r.json()['object']['sha']
@@ -286,92 +284,215 @@ def github_api_get_current_head() -> Optional[str]:
     return None
 
 
-def github_api_get_remote_blobs(sha: str) -> set:
-    if not sha:
-        return set()
+def github_api_get_commit_tree(commit_sha: str) -> Optional[str]:
+    """tree SHA коммита. Коммиты неизменяемы → ответ кэшируется навсегда."""
+    if not commit_sha:
+        return None
+    cached = remote_cache.tree_for_commit(commit_sha)
+    if cached:
+        log_soft(f"[API-COMMIT] tree {cached[:10]} для {commit_sha[:10]} (кэш)")
+        return cached
 
-    log_soft(f"[API-TREE] Получаем дерево для {sha[:10]}...")
     headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github.v3+json"}
-    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/git/trees/{sha}?recursive=1"
+    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/git/commits/{commit_sha}"
+    try:
+        r = governor.request("GET", url, content=False, headers=headers, timeout=15)
+        r.raise_for_status()
+        tree_sha = r.json()['tree']['sha']
+        remote_cache.remember_commit(commit_sha, tree_sha)
+        return tree_sha
+    except Exception as e:
+        log_main(f"[API-COMMIT] Ошибка получения коммита {commit_sha[:10]}: {e}")
+        return None
+
+
+def github_api_get_remote_manifest(sha: str, tree_sha: Optional[str] = None) -> Manifest:
+    """
+    Рекурсивное дерево remote как манифест. Все SHA попадают в blob registry.
+    sha — коммит или tree; при известном tree_sha манифест берётся из кэша.
+    """
+    empty = Manifest.from_sha_map({})
+    if not sha and not tree_sha:
+        return empty
+
+    if tree_sha:
+        cached = remote_cache.manifest_for_tree(tree_sha)
+        if cached is not None:
+            blob_registry.add_many(cached.sha_at(i) for i in range(len(cached)))
+            log_soft(f"[API-TREE] Дерево {tree_sha[:10]} из кэша ({len(cached)} файлов)")
+            return cached
+
+    ref = tree_sha or sha
+    log_soft(f"[API-TREE] Получаем дерево для {ref[:10]}...")
+    headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github.v3+json"}
+    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/git/trees/{ref}?recursive=1"
 
     try:
-        r = requests.get(url, headers=headers, timeout=15)
+        r = governor.request("GET", url, content=False, headers=headers, timeout=15)
         r.raise_for_status()
         data = r.json()
-        blobs = {item['path'] for item in data.get('tree', []) if item['type'] == 'blob'}
+        # size из tree API — для оценок плана (deleted_files/ в staging)
+        blobs = [ManifestEntry(item['path'], item.get('size', 0), 0, 0, item['sha'])
+                 for item in data.get('tree', []) if item['type'] == 'blob']
+        blob_registry.add_many(entry.sha for entry in blobs)
+        manifest = Manifest.from_entries(None, blobs)
+        if data.get('truncated'):
+            log_main("[API-TREE] Дерево remote усечено GitHub — кэш не сохраняется")
+        elif data.get('sha'):
+            remote_cache.store_manifest(data['sha'], manifest)
         log_soft(f"[API-TREE] Найдено {len(blobs)} файлов в remote")
-        return blobs
+        return manifest
     except Exception as e:
         log_main(f"[API-TREE] Ошибка получения дерева: {e}")
-        return set()
+        return empty
 
 
-def github_api_get_file_content(rel_path: str) -> Optional[str]:
-    log_soft(f"[API-FILE] Запрос содержимого удалённого файла: {rel_path}")
+def github_api_get_remote_tree(sha: str) -> Dict[str, str]:
+    """Рекурсивное дерево remote: {путь: blob SHA}"""
+    return github_api_get_remote_manifest(sha).sha_map()
 
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/contents/{rel_path}"
 
-    for attempt in range(1, 4):
-        try:
-            r = requests.get(url, headers=headers, timeout=20)
-            if r.status_code == 404:
-                log_soft(f"[API-FILE] Файл не найден на remote: {rel_path}")
-                return None
-            r.raise_for_status()
-            data = r.json()
-            if data.get('encoding') == 'base64':
-                content = base64.b64decode(data['content']).decode('utf-8', errors='replace')
-                log_soft(f"[API-FILE] Успешно получено {len(content)} символов")
-                return content
-            else:
-                log_main(f"[API-FILE] Неизвестный формат кодировки для {rel_path}")
-                return None
-        except Exception as e:
-            log_main(f"[API-FILE] Ошибка (попытка {attempt}): {e}")
-            if attempt < 3:
-                time.sleep(3)
+def github_api_get_remote_blobs(sha: str) -> set:
+    return set(github_api_get_remote_tree(sha))
 
-    log_main(f"[API-FILE] Не удалось получить содержимое {rel_path} после 3 попыток")
-    return None
 
+def _local_blob_sha(file_path: Path) -> Optional[str]:
+    try:
+        return file_blob_sha(str(file_path), file_path.stat().st_size)[0]  # потоково
+    except OSError as e:
+        log_main(f"[MOVE] Не удалось прочитать {file_path}: {e}")
+        return None
 
-def collect_changes(temp_repo_path: Path) -> Tuple[List[str], List[str], List[str]]:
+
+def _apply_move_hints(rel: str, hints: List[Tuple[str, str, bool]]) -> str:
+    """Прогоняет путь через цепочку перемещений из watchdog (файлы и папки)"""
+    for src, dest, is_dir in hints:
+        if is_dir:
+            if rel.startswith(src + "/"):
+                rel = dest + rel[len(src):]
+        elif rel == src:
+            rel = dest
+    return rel
+
+
+def detect_moves(
+    temp_repo_path: Path,
+    added: List[str],
+    deleted: List[str],
+    remote_files: Dict[str, str],
+    local_shas: Optional[Dict[str, str]] = None,
+    use_hints: bool = True,
+) -> Tuple[List[Tuple[str, str]], List[str], List[str]]:
+    """
+    Находит перемещения: удалённый путь и добавленный путь с одинаковым blob SHA.
+    Подсказки watchdog (FileMovedEvent / DirMovedEvent) имеют приоритет,
+    затем — совпадение по SHA (с предпочтением одинакового имени файла).
+    local_shas — SHA из манифеста (файлы тогда не перечитываются).
+    use_hints=False — не забирать подсказки watchdog (план пуша без пуша).
+    Возвращает (renamed [(old, new)], оставшиеся added, оставшиеся deleted).
+    """
+    hints = None
+    if use_hints:
+        from gui_watcher import take_move_hints  # ленивый импорт (цикл через observer_manager)
+        hints = take_move_hints()
+
+    if not added or not deleted:
+        return [], added, deleted
+
+    local_sha = {}
+    by_sha: Dict[str, List[str]] = {}
+    for rel in added:
+        sha = local_shas.get(rel) if local_shas is not None else None
+        if sha is None:
+            sha = _local_blob_sha(temp_repo_path / rel)
+        if sha:
+            local_sha[rel] = sha
+            by_sha.setdefault(sha, []).append(rel)
+
+    renamed = []
+    moved_new = set()
+    moved_old = set()
+
+    def take(old: str, new: str):
+        renamed.append((old, new))
+        moved_old.add(old)
+        moved_new.add(new)
+        by_sha[local_sha[new]].remove(new)
+
+    # 1) подсказки watchdog
+    if hints:
+        for old in deleted:
+            new = _apply_move_hints(old, hints)
+            if new != old and new in local_sha and new not in moved_new \
+                    and local_sha[new] == remote_files.get(old):
+                take(old, new)
+
+    # 2) совпадение содержимого
+    for old in deleted:
+        if old in moved_old:
+            continue
+        candidates = by_sha.get(remote_files.get(old, ""))
+        if not candidates:
+            continue
+        name = old.rsplit("/", 1)[-1]
+        same_name = [c for c in candidates if c.rsplit("/", 1)[-1] == name]
+        take(old, (same_name or candidates)[0])
+
+    if renamed:
+        log_both(f"[MOVE] Обнаружено перемещений: {len(renamed)} (blob'ы переиспользуются)")
+        for old, new in renamed:
+            log_soft(f"[MOVE] {old} → {new}")
+
+    return (
+        sorted(renamed),
+        [rel for rel in added if rel not in moved_new],
+        [rel for rel in deleted if rel not in moved_old],
+    )
+
+
+def collect_changes(
+    temp_repo_path: Path,
+    manifest: Optional[Manifest] = None,
+    remote_manifest: Optional[Manifest] = None,
+    use_hints: bool = True,
+) -> Tuple[List[str], List[str], List[str], List[Tuple[str, str]]]:
+    """
+    Классификация по blob SHA: modified — только файлы, чьё содержимое
+    отличается от remote; совпадающие считаются unchanged и в описание не идут.
+    """
     added = []
     modified = []
     deleted = []
+    unchanged = 0
 
-    head_sha = github_api_get_current_head()
-    remote_files = github_api_get_remote_blobs(head_sha)
+    if remote_manifest is None:
+        remote_manifest = github_api_get_remote_manifest(github_api_get_current_head())
 
-    local_rels = set()
-    for f in temp_repo_path.rglob("*"):
-        if not f.is_file():
-            continue
-        rel = f.relative_to(temp_repo_path).as_posix()
+    if manifest is None:
+        manifest = scan_vault(temp_repo_path)
+
+    # merge join двух отсортированных манифестов — без промежуточных множеств путей
+    local_shas = {}
+    deleted_shas = {}
+    for rel, i, j in manifest.merge(remote_manifest):
         if rel.startswith("deleted_files/"):
             continue
-        if not rel.lower().endswith(SUPPORTED_EXTENSIONS):
-            continue
-        if is_malformed_path(rel):
-            continue
-        local_rels.add(rel)
-
-    for rel in local_rels:
-        if rel in remote_files:
+        if j < 0:
+            added.append(rel)
+            local_shas[rel] = manifest.sha_at(i)
+        elif i < 0:
+            deleted.append(rel)
+            deleted_shas[rel] = remote_manifest.sha_at(j)
+        elif manifest.sha_bytes_at(i) != remote_manifest.sha_bytes_at(j):
             modified.append(rel)
         else:
-            added.append(rel)
+            unchanged += 1
 
-    for rel in remote_files:
-        if rel not in local_rels and not rel.startswith("deleted_files/"):
-            deleted.append(rel)
+    renamed, added, deleted = detect_moves(temp_repo_path, added, deleted, deleted_shas, local_shas, use_hints)
 
-    log_soft(f"[COLLECT] added: {len(added)}, modified: {len(modified)}, deleted: {len(deleted)}")
-    return sorted(added), sorted(modified), sorted(deleted)
+    log_soft(f"[COLLECT] added: {len(added)}, modified: {len(modified)}, unchanged: {unchanged}, "
+             f"deleted: {len(deleted)}, renamed: {len(renamed)}")
+    return sorted(added), sorted(modified), sorted(deleted), renamed
 
 
 def initialize_repository(temp_repo_path: Path) -> bool:
@@ -444,34 +565,181 @@ def initialize_repository(temp_repo_path: Path) -> bool:
 
 
 def should_include_in_tree_and_index(rel_path: str) -> bool:
-    if is_malformed_path(rel_path):
-        return False
+    # deleted_files/ — обычная папка для движка правил, отдельная ветка не нужна
+    return get_rules().include_file(rel_path)
+
+
+def _manifest_sha(manifest: Manifest, rel: str) -> Optional[str]:
+    entry = manifest.get(rel)
+    return entry.sha if entry is not None else None
 
-    if 'temp' in rel_path.lower() or rel_path.endswith('.lock'):
+
+def remote_text_readable(rel: str, remote_manifest: Manifest) -> bool:
+    """Текстовый файл remote, который можно скачать целиком (меньше STREAM_UPLOAD_THRESHOLD)"""
+    if not is_text_file(rel):
         return False
+    entry = remote_manifest.get(rel)
+    return entry is None or entry.size < STREAM_UPLOAD_THRESHOLD
+
+
+def populate_deleted_files(deleted_root: Path, deleted: List[str], remote_manifest: Manifest) -> int:
+    """Движок staging: скачивает удалённые файлы в deleted_files/ (плоские имена)"""
+    log_both(f"[DELETED] Найдено {len(deleted)} удалённых файлов — популяция deleted_files...")
+    deleted_root.mkdir(exist_ok=True)
+    populated_count = 0
+    trace = trace_enabled()
+    for rel in deleted:
+        if not remote_text_readable(rel, remote_manifest):
+            if trace:
+                log_trace("[DELETED-SKIP] Вложение или большой файл (в staging — только текст): %s", rel)
+            continue
+        content = github_api_get_file_content(rel)
+        if content is not None and content.strip():
+            flat_rel = rel.replace('/', '_').replace('\\', '_')
+            deleted_path = deleted_root / flat_rel
+            deleted_path.parent.mkdir(parents=True, exist_ok=True)
+            deleted_path.write_text(content, encoding='utf-8')
+            populated_count += 1
+            if trace:
+                log_trace("[DELETED-POPULATE] %s → flat %s (%d символов)", rel, flat_rel, len(content))
+        elif trace:
+            log_trace("[DELETED-SKIP] Пустой или недоступный: %s", rel)
+
+    log_both(f"[DELETED] Успешно популировано {populated_count} из {len(deleted)} файлов")
+
+    if not any(deleted_root.rglob("*")):
+        (deleted_root / ".gitkeep").touch()
+        log_soft("[GITKEEP] Добавлен .gitkeep в deleted_files (нет содержимого)")
+    return populated_count
+
+
+EMPTY_BLOB_SHA = git_blob_sha(b"")
+
+
+def deleted_blob_entries(deleted: List[str], remote_manifest: Manifest) -> Dict[str, str]:
+    """
+    Движок direct: deleted_files/ без скачивания и повторной загрузки —
+    плоское имя указывает на blob удалённого файла, который уже есть на remote.
+    """
+    rules = get_rules()
+    entries = {}
+    trace = trace_enabled()
+    for rel in deleted:
+        entry = remote_manifest.get(rel)
+        sha = entry.sha if entry is not None else None
+        flat_rel = rel.replace('/', '_').replace('\\', '_')
+        if not sha or sha == EMPTY_BLOB_SHA:
+            if trace:
+                log_trace("[DELETED-SKIP] Пустой или недоступный: %s", rel)
+            continue
+        if not rules.include_file(f"deleted_files/{flat_rel}"):
+            continue
+        entries[f"deleted_files/{flat_rel}"] = sha
+        if trace:
+            log_trace("[DELETED-REUSE] %s → flat %s (%s)", rel, flat_rel, sha[:10])
+    if deleted:
+        log_both(f"[DELETED] В deleted_files: {len(entries)} из {len(deleted)} файлов (blob'ы remote)")
+    return entries
 
-    if rel_path.startswith("deleted_files/") and rel_path.lower().endswith(SUPPORTED_EXTENSIONS):
-        return True
 
-    if rel_path.lower().endswith(SUPPORTED_EXTENSIONS):
-        return True
+def remote_attachment(entry: ManifestEntry) -> bool:
+    """Вложение, чей blob уже есть на remote: в staging не копируется и не перечитывается"""
+    return not is_text_file(entry.path) and entry.sha in blob_registry
 
-    return False
 
+def write_local_index(temp_repo_path: Path, manifest: Manifest, deleted_root: Path) -> int:
+    """Движок staging: локальный индекс pygit2 по манифесту + deleted_files/"""
+    repo = pygit2.Repository(temp_repo_path)
+    index = repo.index
+    index.clear()
 
-def github_api_create_tree_from_folder(folder_path: Path):
-    log_both(f"[API-TREE] Создание tree из {folder_path}")
+    log_both("[GIT] Добавление файлов в индекс (включая deleted_files)...")
+    added_count = error_count = 0
 
-    all_files = []
-    for f in folder_path.rglob("*"):
-        if not f.is_file():
-            continue
-        rel_path = f.relative_to(folder_path).as_posix()
+    index_paths = [entry.path for entry in manifest if not remote_attachment(entry)]
+    if deleted_root.is_dir():
+        index_paths += [f"deleted_files/{rel}" for rel, _ in get_rules().walk(deleted_root)]
 
-        if not should_include_in_tree_and_index(rel_path):
+    trace = trace_enabled()
+    for rel_path in index_paths:
+        try:
+            index.add(rel_path)
+            added_count += 1
+            if trace:
+                log_trace("[INDEX-ADD] %s", rel_path)
+        except Exception as e:
+            log_main(f"[GIT-ERROR] {rel_path}: {e}")
+            error_count += 1
+
+    index.write()
+    return added_count
+
+
+def tree_file_list(
+    folder_path: Path,
+    manifest: Optional[Manifest] = None,
+    extra_entries: Optional[Dict[str, str]] = None,
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    Содержимое будущего tree: [(rel_path, известный SHA или None)].
+    extra_entries — готовые {путь: SHA} (deleted_files/ в движке direct);
+    без них deleted_files/ обходится по папке.
+    """
+    all_files: List[Tuple[str, Optional[str]]] = []
+    if manifest is not None:
+        all_files += [(entry.path, entry.sha) for entry in manifest]
+        if extra_entries is not None:
+            all_files += sorted(extra_entries.items())
+        else:
+            deleted_dir = folder_path / "deleted_files"
+            if deleted_dir.is_dir():
+                all_files += [(f"deleted_files/{rel}", None) for rel, _ in get_rules().walk(deleted_dir)]
+    else:
+        all_files += [(rel, None) for rel, _ in get_rules().walk(folder_path)]
+    return [(normalize_path(rel), sha) for rel, sha in all_files]
+
+
+def pending_uploads(
+    folder_path: Path,
+    all_files: List[Tuple[str, Optional[str]]],
+    manifest: Optional[Manifest] = None,
+) -> Tuple[int, int]:
+    """(сколько blob'ов придётся загрузить, сколько байт) — для плана пуша"""
+    count = size = 0
+    for rel, sha in all_files:
+        if sha is not None and sha in blob_registry:
             continue
+        count += 1
+        entry = manifest.get(rel) if manifest is not None else None
+        if entry is not None:
+            size += entry.size
+        else:
+            try:
+                size += (folder_path / rel).stat().st_size
+            except OSError:
+                pass
+    return count, size
+
+
+def github_api_create_tree_from_folder(
+    folder_path: Path,
+    manifest: Optional[Manifest] = None,
+    snapshot: Optional[FileSnapshot] = None,
+    extra_entries: Optional[Dict[str, str]] = None,
+    all_files: Optional[List[Tuple[str, Optional[str]]]] = None,
+):
+    """
+    manifest — снимок файлов в folder_path: их SHA уже известны,
+    и файл читается только если blob'а ещё нет на remote.
+    snapshot — источник байтов (движок direct), иначе чтение из folder_path.
+    all_files — готовый tree_file_list (иначе строится здесь).
+    Загрузки идут через rate_governor; blob, не загрузившийся и после повторов,
+    отменяет tree — иначе файл пропал бы из remote как удалённый.
+    """
+    log_both(f"[API-TREE] Создание tree из {folder_path}")
 
-        all_files.append(f)
+    if all_files is None:
+        all_files = tree_file_list(folder_path, manifest, extra_entries)
 
     if not all_files:
         log_main("[API-TREE] Нет файлов для включения в tree")
@@ -481,21 +749,17 @@ def github_api_create_tree_from_folder(folder_path: Path):
     base_url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}"
 
     tree_entries = []
-    for file_path in all_files:
-        rel_path = normalize_path(file_path.relative_to(folder_path).as_posix())
-
+    uploaded_count = 0
+    trace = trace_enabled()
+    for rel_path, known_sha in all_files:
         try:
-            content = file_path.read_bytes()
-            b64 = base64.b64encode(content).decode('utf-8')
-
-            r = requests.post(
-                f"{base_url}/git/blobs",
-                headers=headers,
-                json={"content": b64, "encoding": "base64"},
-                timeout=30
-            )
-            r.raise_for_status()
-            blob_sha = r.json()['sha']
+            if known_sha is not None and known_sha in blob_registry:
+                blob_sha, uploaded = known_sha, False
+            elif snapshot is not None and snapshot.has(rel_path):
+                blob_sha, uploaded = ensure_blob(snapshot.take(rel_path))
+            else:
+                # большие файлы — потоково, без чтения целиком в память
+                blob_sha, uploaded = ensure_blob_file(folder_path / rel_path, known_sha)
 
             tree_entries.append({
                 "path": rel_path,
@@ -504,20 +768,39 @@ def github_api_create_tree_from_folder(folder_path: Path):
                 "sha": blob_sha
             })
 
-            log_soft(f"[TREE-ADD] {rel_path}")
+            if uploaded:
+                uploaded_count += 1
+                if trace:
+                    log_trace("[TREE-ADD] %s", rel_path)
+            elif trace:
+                log_trace("[TREE-REUSE] %s (%s)", rel_path, blob_sha[:10])
+        except OSError as e:
+            if not isinstance(e, requests.RequestException):
+                # файл исчез или недоступен после сканирования — в tree его нет
+                log_main(f"[TREE-ERROR] {rel_path}: {e}")
+                continue
+            log_main(f"[TREE-ERROR] Blob {rel_path} не загружен: {e} — tree отменён")
+            blob_registry.forget_speculative()
+            return None
         except Exception as e:
-            log_main(f"[TREE-ERROR] {rel_path}: {e}")
+            log_main(f"[TREE-ERROR] Blob {rel_path} не загружен: {type(e).__name__}: {e} — tree отменён")
+            blob_registry.forget_speculative()
+            return None
 
     if not tree_entries:
         log_main("[API-TREE] Не удалось создать ни одного blob → tree пустой")
         return None
 
-    log_both("=== Пути в tree ===")
-    for entry in tree_entries:
-        log_soft(f"  → {entry['path']}")
+    log_both(f"[API-TREE] Blob'ов загружено: {uploaded_count}, переиспользовано: {len(tree_entries) - uploaded_count}")
+
+    if trace:
+        log_trace("=== Пути в tree ===")
+        for entry in tree_entries:
+            log_trace("  → %s", entry['path'])
 
     try:
-        r = requests.post(
+        r = governor.request(
+            "POST",
             f"{base_url}/git/trees",
             headers=headers,
             json={"tree": tree_entries},
@@ -526,9 +809,15 @@ def github_api_create_tree_from_folder(folder_path: Path):
         r.raise_for_status()
         tree_sha = r.json()['sha']
         log_both(f"[API-TREE] Tree готов: {tree_sha[:10]}...")
+        # Следующий push найдёт манифест этого дерева без GET /git/trees
+        remote_cache.store_manifest(
+            tree_sha, Manifest.from_sha_map({e['path']: e['sha'] for e in tree_entries})
+        )
         return tree_sha
     except Exception as e:
         log_main(f"[API-TREE] Ошибка создания tree: {e}")
+        # Если tree не принял заранее загруженные blob'ы — следующий пуш загрузит их заново
+        blob_registry.forget_speculative()
         return None
 
 
@@ -549,12 +838,12 @@ def github_api_force_push_from_tree(tree_sha, commit_message):
     }
 
     try:
-        r = requests.post(f"{base_url}/git/commits", headers=headers, json=payload, timeout=30)
+        r = governor.request("POST", f"{base_url}/git/commits", headers=headers, json=payload, timeout=30)
         r.raise_for_status()
         new_commit_sha = r.json()['sha']
 
         payload_ref = {"sha": new_commit_sha, "force": True}
-        r_ref = requests.patch(f"{base_url}/git/refs/heads/main", headers=headers, json=payload_ref, timeout=30)
+        r_ref = governor.request("PATCH", f"{base_url}/git/refs/heads/main", headers=headers, json=payload_ref, timeout=30)
         r_ref.raise_for_status()
 
         log_both("[PUSH] выполнен")
@@ -613,6 +902,9 @@ def do_push():
 
     clear_temp_repo_content(temp_repo_path)
 
+    # .gitignore в папке мог измениться с прошлого пуша
+    reload_rules()
+
     deleted_root = temp_repo_path / "deleted_files"
 
     recovery = PushRecoveryHandler(
@@ -623,95 +915,94 @@ def do_push():
     )
 
     try:
-        log_both("[SYNC] Синхронизация изменённых файлов...")
-        has_changes = sync_changed_files(
-            target_dir=temp_repo_path,
-            log_soft=log_soft,
-            verbose=False
-        )
-
+        direct = PUSH_ENGINE == "direct"
+
+        # Один обход наблюдаемой папки — дальше все стадии работают по манифесту
+        log_both(f"[SCAN] Обход наблюдаемой папки (движок: {PUSH_ENGINE})...")
+        manifest = scan_vault(WATCHED_FOLDER)
+
+        # Корневой tree SHA считается локально: совпал с remote — пушить нечего,
+        # ни копирования, ни чтения файлов, ни загрузок
+        head_sha = github_api_get_current_head()
+        remote_tree_sha = github_api_get_commit_tree(head_sha)
+        remote_manifest = None
+        if manifest.excluded:
+            # вложения сверх лимита не удаляются с remote — их blob'ы остаются в дереве
+            remote_manifest = github_api_get_remote_manifest(head_sha, remote_tree_sha)
+            manifest = keep_excluded(manifest, remote_manifest)
+
+        local_tree_sha = manifest.tree_sha()
+        if remote_tree_sha and remote_tree_sha == local_tree_sha:
+            log_main(f"[NOOP] Дерево {local_tree_sha[:10]} совпадает с HEAD — push не нужен")
+            return
 
-        time.sleep(0.6)
+        # Дерево remote — до копирования: его blob'ы попадают в registry
+        if remote_manifest is None:
+            remote_manifest = github_api_get_remote_manifest(head_sha, remote_tree_sha)
+        if len(remote_manifest) and remote_manifest.tree_sha(exclude_prefix="deleted_files/") == local_tree_sha:
+            log_main("[NOOP] Изменения только в deleted_files/ remote — push не нужен")
+            return
 
-        debug_directory_contents(temp_repo_path, "После sync")
+        if direct:
+            # Без копии в staging: blob'ы читаются прямо из WATCHED_FOLDER
+            source_root = WATCHED_FOLDER
+        else:
+            log_both("[SYNC] Синхронизация изменённых файлов...")
+            has_changes = sync_changed_files(
+                target_dir=temp_repo_path,
+                log_soft=log_soft,
+                verbose=False,
+                manifest=manifest,
+                skip=remote_attachment
+            )
+            time.sleep(0.6)
+            source_root = temp_repo_path
 
-        added, modified, deleted = collect_changes(temp_repo_path)
+        added, modified, deleted, renamed = collect_changes(source_root, manifest, remote_manifest)
 
         # ─── КРИТИЧЕСКАЯ ЗАЩИТА ОТ ПУСТЫХ ПУШЕЙ ───────────────────────────────
-        if not added and not modified and not deleted:
+        if not added and not modified and not deleted and not renamed:
             log_main("[SYNC] Нет ни добавленных, ни изменённых, ни удалённых файлов — push отменён")
             return
 
-        has_deleted = len(deleted) > 0
+        snapshot = None
+        deleted_entries = None
+        read_deleted = None
 
-        if has_deleted:
-            log_both(f"[DELETED] Найдено {len(deleted)} удалённых файлов — популяция deleted_files...")
-            deleted_root.mkdir(exist_ok=True)
-            populated_count = 0
-            for rel in deleted:
-                content = github_api_get_file_content(rel)
-                if content is not None and content.strip():
-                    flat_rel = rel.replace('/', '_').replace('\\', '_')
-                    deleted_path = deleted_root / flat_rel
-                    deleted_path.parent.mkdir(parents=True, exist_ok=True)
-                    deleted_path.write_text(content, encoding='utf-8')
-                    populated_count += 1
-                    log_soft(f"[DELETED-POPULATE] {rel} → flat {flat_rel} ({len(content)} символов)")
-                else:
-                    log_soft(f"[DELETED-SKIP] Пустой или недоступный: {rel}")
-
-            log_both(f"[DELETED] Успешно популировано {populated_count} из {len(deleted)} файлов")
-
-            if not any(deleted_root.rglob("*")):
-                (deleted_root / ".gitkeep").touch()
-                log_soft("[GITKEEP] Добавлен .gitkeep в deleted_files (нет содержимого)")
-
-        debug_directory_contents(deleted_root, "deleted_files после популяции")
-
-        time.sleep(0.8)
-
-        if not initialize_repository(temp_repo_path):
-            log_main("[ERROR] Не удалось подготовить репозиторий — push отменён")
-            return
-
-        repo = pygit2.Repository(temp_repo_path)
-        index = repo.index
-        index.clear()
-
-        log_both("[GIT] Добавление файлов в индекс (включая deleted_files)...")
-        added_count = error_count = 0
-
-        for file_path in temp_repo_path.rglob("*"):
-            if not file_path.is_file():
-                continue
-            rel_path = file_path.relative_to(temp_repo_path).as_posix()
+        if direct:
+            deleted_entries = deleted_blob_entries(deleted, remote_manifest)
+            snapshot = FileSnapshot(WATCHED_FOLDER, known_sha=lambda rel: _manifest_sha(manifest, rel))
+            read_deleted = lambda rel: (
+                github_api_get_file_content(rel) if remote_text_readable(rel, remote_manifest) else None
+            )
+        else:
+            if deleted:
+                populate_deleted_files(deleted_root, deleted, remote_manifest)
 
-            if not should_include_in_tree_and_index(rel_path):
-                continue
+            debug_directory_contents(deleted_root, "deleted_files после популяции")
 
-            try:
-                index.add(rel_path)
-                added_count += 1
-                log_soft(f"[INDEX-ADD] {rel_path}")
-            except Exception as e:
-                log_main(f"[GIT-ERROR] {rel_path}: {e}")
-                error_count += 1
+            time.sleep(0.8)
 
-        index.write()
+            if not initialize_repository(temp_repo_path):
+                log_main("[ERROR] Не удалось подготовить репозиторий — push отменён")
+                return
 
-        if added_count == 0:
-            log_main("[GIT] После фильтрации не осталось файлов для коммита — push отменён")
-            return
+            if write_local_index(temp_repo_path, manifest, deleted_root) == 0:
+                log_main("[GIT] После фильтрации не осталось файлов для коммита — push отменён")
+                return
 
         commit_sha = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
 
         analyzer = CommitAnalyzer()
         comment_text = analyzer.generate_commit_description(
             commit_sha=commit_sha,
-            repo_path=temp_repo_path,
+            repo_path=source_root,
             added=added,
             modified=modified,
-            deleted=deleted
+            deleted=deleted,
+            renamed=renamed,
+            read_new=snapshot.text if snapshot is not None else None,
+            read_deleted=read_deleted
         )
 
         log_both("Сгенерированное описание коммита:")
@@ -719,27 +1010,50 @@ def do_push():
         log_both(comment_text)
         log_both("-" * 80)
 
-        log_both("[API] Создаём tree...")
-        tree_sha = github_api_create_tree_from_folder(temp_repo_path)
-        if not tree_sha:
-            log_main("[API] Tree не создан — push отменён")
-            return
-
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
         message = f"PUSH - [{timestamp}]"
 
-        log_both("[PUSH] Отправка...")
-        new_commit_sha = push_with_retry(tree_sha, message)
+        # План по бюджету API: сколько blob'ов грузить и каким транспортом
+        all_files = tree_file_list(source_root, manifest, deleted_entries)
+        uploads, upload_bytes = pending_uploads(source_root, all_files, manifest)
+        plan = governor.plan(uploads, upload_bytes)
+        log_both(f"[PLAN] Blob'ов к загрузке: {uploads} ({upload_bytes // 1024} KB), "
+                 f"транспорт: {plan.transport} ({plan.reason}), ожидание лимитов ~{plan.eta_seconds:.0f} сек")
+        if plan.defer_comments:
+            # комментарии подождут, пока blob'ы этого пуша не пройдут
+            get_outbox().pause_until(time.time() + plan.eta_seconds)
+
+        new_commit_sha = None
+        tree_sha = None
+        if plan.transport == "pack":
+            if snapshot is not None:
+                snapshot.clear()  # pack читает файлы с диска сам
+            result = push_via_pack(temp_repo_path, all_files, [source_root, WATCHED_FOLDER], message)
+            if result:
+                new_commit_sha, tree_sha = result
+            else:
+                log_main("[PACK] Не удалось — пуш через REST API")
+
+        if new_commit_sha is None:
+            log_both("[API] Создаём tree...")
+            tree_sha = github_api_create_tree_from_folder(source_root, manifest, snapshot, all_files=all_files)
+            if snapshot is not None:
+                snapshot.clear()
+            if not tree_sha:
+                log_main("[API] Tree не создан — push отменён")
+                return
+
+            log_both("[PUSH] Отправка...")
+            new_commit_sha = push_with_retry(tree_sha, message)
+
+        log_soft(f"[GOVERNOR] {governor.describe()}")
 
         if new_commit_sha:
             log_main(f"[PUSH] УСПЕХ: {message}")
+            remote_cache.remember_commit(new_commit_sha, tree_sha)
 
-            log_soft(f"[COMMENT] Планируем отправку комментария через 10 сек...")
-            threading.Timer(
-                10,
-                GitHubCommenter.post_to_commit,
-                args=(new_commit_sha, comment_text)
-            ).start()
+            # Комментарий уходит через персистентный outbox — push не ждёт
+            enqueue_comment(new_commit_sha, comment_text)
 
         else:
             log_main("[PUSH] Не удалось выполнить пуш")
@@ -786,4 +1100,9 @@ if __name__ == "__main__":
     except Exception as e:
         log_both(f"Логгер ошибка: {e}")
 
-    do_push()
+    if "--plan" in sys.argv:
+        # план без пуша: python do_push.py --plan [--online] [--json]
+        from push_plan import main as plan_main
+        plan_main([arg for arg in sys.argv[1:] if arg != "--plan"])
+    else:
+        do_push()
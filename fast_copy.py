@@ -0,0 +1,179 @@
+"""
+fast_copy.py
+
+Быстрое копирование файлов в staging (fake_git_temp) без дублирования байтов
+там, где файловая система это умеет.
+
+Порядок попыток (режим STAGING_COPY_MODE):
+  auto     : reflink (ioctl FICLONE) → os.copy_file_range → shutil.copy2
+  hardlink : os.link → затем как auto.
+             Только если staging гарантированно никто не меняет на месте:
+             жёсткая ссылка — это тот же файл, что и в наблюдаемой папке!
+  copy     : shutil.copy2 (как раньше)
+
+✔ Стратегия определяется один раз на пару устройств (st_dev источника и цели)
+  и кэшируется; неподдерживаемые способы больше не пробуются
+✔ mtime/atime сохраняются (SmartSyncCopier сравнивает по size + mtime_ns)
+✔ Цель сначала удаляется: если там осталась жёсткая ссылка от режима hardlink,
+  запись «wb» в неё испортила бы оригинал в наблюдаемой папке
+✔ На btrfs / XFS (reflink=1) копирование хранилища — почти мгновенно и без места на диске
+"""
+
+import errno
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+from app_logger import log_soft
+from config import STAGING_COPY_MODE
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) — Linux
+
+# Ошибки «способ не поддерживается здесь» → пробуем следующий
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EBADF,
+    errno.EPERM, errno.EMLINK,
+    getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTSUP", errno.EINVAL),
+}
+
+PathLike = Union[str, Path]
+
+
+# ────────────────────────────────────────────────
+# Стратегии
+# ────────────────────────────────────────────────
+
+def _unlink_target(dst: str) -> None:
+    """Убирает старую цель: писать нужно в новый файл, а не в чужой inode"""
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+
+
+def _copy_reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "ioctl недоступен")
+    _unlink_target(dst)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def _copy_file_range(src: str, dst: str) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range недоступен")
+    _unlink_target(dst)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+        # файл мог вырасти после fstat — докопируем обычным способом
+        shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(src, dst)
+
+
+def _hardlink(src: str, dst: str) -> None:
+    try:
+        if os.path.samefile(src, dst):
+            return
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    os.link(src, dst)
+
+
+def _copy_plain(src: str, dst: str) -> None:
+    _unlink_target(dst)
+    shutil.copy2(src, dst)
+
+
+_STRATEGIES = {
+    "reflink": _copy_reflink,
+    "copy_file_range": _copy_file_range,
+    "hardlink": _hardlink,
+    "copy": _copy_plain,
+}
+
+
+def _candidates(mode: str) -> Tuple[str, ...]:
+    if mode == "copy":
+        return ("copy",)
+    if mode == "hardlink":
+        return ("hardlink", "reflink", "copy_file_range", "copy")
+    return ("reflink", "copy_file_range", "copy")
+
+
+# ────────────────────────────────────────────────
+# Копировщик с кэшем стратегий
+# ────────────────────────────────────────────────
+
+class FastCopier:
+    def __init__(self, mode: str = STAGING_COPY_MODE):
+        self.mode = mode
+        self._lock = threading.Lock()
+        # (dev источника, dev цели) → индекс первой рабочей стратегии в _candidates
+        self._chosen: Dict[Tuple[int, int], int] = {}
+
+    def copy(self, src: PathLike, dst: PathLike) -> str:
+        """Копирует src → dst. Возвращает имя сработавшей стратегии."""
+        src, dst = str(src), str(dst)
+        key = (os.stat(src).st_dev, os.stat(os.path.dirname(dst) or ".").st_dev)
+        candidates = _candidates(self.mode)
+
+        start = self._chosen.get(key)
+        known = start is not None
+        for i in range(start or 0, len(candidates)):
+            name = candidates[i]
+            try:
+                _STRATEGIES[name](src, dst)
+            except OSError as e:
+                if name == "copy" or e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                if known:
+                    # раньше работало — возможно, единичный сбой; не понижаем навсегда
+                    log_soft(f"[FAST-COPY] {name} не сработал для {dst}: {e} → следующий способ")
+                continue
+
+            if not known:
+                with self._lock:
+                    self._chosen[key] = i
+                log_soft(f"[FAST-COPY] Устройства {key[0]} → {key[1]}: стратегия {name}")
+            return name
+
+        raise OSError(errno.EIO, f"Не удалось скопировать {src}")
+
+
+_copier = FastCopier()
+
+
+def is_current(src: PathLike, dst: PathLike) -> bool:
+    """
+    Актуальна ли копия dst: это тот же файл (жёсткая ссылка — тот же inode)
+    или совпадают size + mtime_ns (копирование сохраняет mtime).
+    """
+    try:
+        d = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    s = os.stat(src)
+    if s.st_ino and (s.st_dev, s.st_ino) == (d.st_dev, d.st_ino):
+        return True
+    return s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns
+
+
+def fast_copy(src: PathLike, dst: PathLike) -> str:
+    """Копирование для staging (режим из STAGING_COPY_MODE). Ошибки пробрасываются."""
+    return _copier.copy(src, dst)
@@ -3,11 +3,12 @@
 Фильтры и эвристики для очистки логов.
 """
 
-from .push_comment_filter import should_skip_push_comment_line
-from .deep_heuristics import looks_like_push_comment_line
+from .push_comment_filter import should_skip_push_comment_line, should_skip_push_comment_lines
+from .deep_heuristics import looks_like_push_comment_line, looks_like_push_comment_lines
 
 __all__ = [
     "should_skip_push_comment_line",
+    "should_skip_push_comment_lines",
     "looks_like_push_comment_line",
+    "looks_like_push_comment_lines",
 ]
-
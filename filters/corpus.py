@@ -0,0 +1,114 @@
+"""
+Синтетический logger.txt для замеров и проверок фильтров.
+
+Три вида строк (по доле в корпусе):
+  ✔ push   — настоящий шум: дампы списков файлов, [TREE-ADD]/[INDEX-ADD]/[DELETED-*]
+             с push_comments/<40 hex>.txt
+  ✔ near   — похожие, но не шум: push_comments/ без SHA, короткие SHA, outbox,
+             заголовки коммитов, строки с SHA вне push_comments
+  ✔ plain  — обычный лог: синхронизация, копирование, лимиты API, трассировки
+"""
+
+import hashlib
+import random
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+
+KINDS = ("push", "near", "plain")
+DEFAULT_MIX = (0.30, 0.15, 0.55)
+
+_WORDS = ("notes", "daily", "projects", "archive", "inbox", "people", "ideas",
+          "books", "meetings", "research", "drafts", "templates", "journal")
+
+
+class _Generator:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.now = datetime(2026, 3, 1, 9, 0, 0)
+        self.counter = 0
+
+    def ts(self) -> str:
+        self.now += timedelta(seconds=self.rng.choice((0, 0, 0, 1, 1, 2, 15)))
+        return self.now.strftime("%Y-%m-%d %H:%M:%S")
+
+    def sha(self) -> str:
+        self.counter += 1
+        return hashlib.sha1(f"{self.counter}:{self.rng.random()}".encode()).hexdigest()
+
+    def rel(self) -> str:
+        rng = self.rng
+        parts = [rng.choice(_WORDS) + str(rng.randint(0, 40)) for _ in range(rng.randint(0, 3))]
+        return "/".join(parts + [f"{rng.choice(_WORDS)} {rng.randint(0, 10 ** 5)}.md"])
+
+    # ─── виды строк ───
+
+    def push(self) -> str:
+        rng, ts, sha = self.rng, self.ts(), self.sha()
+        roll = rng.random()
+        if roll < 0.55:
+            return f'[{ts}] "push_comments/{sha}.txt",'
+        if roll < 0.70:
+            return f'[{ts}] "push_comments/{sha}.txt"'
+        tag = rng.choice(("TREE-ADD", "TREE-REUSE", "INDEX-ADD", "DELETED-SKIP", "BLOB-REUSE"))
+        if roll < 0.90:
+            return f"[{ts}] [{tag}] push_comments/{sha}.txt"
+        return f"[{ts}] [{tag}] push_comments/{sha}.txt ({rng.randint(1, 9999) / 10:.1f} KB)"
+
+    def near(self) -> str:
+        rng, ts = self.rng, self.ts()
+        roll = rng.randrange(7)
+        if roll == 0:
+            return f"[{ts}] [PUSH] Папка push_comments/ содержит {rng.randint(0, 5000)} файлов, " \
+                   f"новых с прошлого пуша: {rng.randint(0, 40)}"
+        if roll == 1:
+            return f'[{ts}] "push_comments/{rng.choice(_WORDS)}_{rng.choice(_WORDS)}_{rng.randint(0, 999)}_review.txt",'
+        if roll == 2:
+            return f"[{ts}] [COMMENT] Сохранён push_comments/{self.sha()[:7]}.txt для коммита " \
+                   f"«{rng.choice(_WORDS)} {rng.randint(0, 99)}»"
+        if roll == 3:
+            uid = self.sha()
+            return f"[{ts}] [OUTBOX] push_comments/outbox/{uid[:8]}-{uid[8:12]}-{uid[12:16]}-{uid[16:20]}.json " \
+                   f"отложен на {rng.randint(1, 60)} сек"
+        if roll == 4:
+            return f"[{ts}] [PUSH] Коммит {self.sha()} создан, push_comments/ будут описаны позже"
+        if roll == 5:
+            return f"[{ts}] [IGNORE] Пропущен push_comments/ (правило settings.ini), файл {self.rel()}"
+        return f'[{ts}] "{self.rel()}", "push_comments/",'
+
+    def plain(self) -> str:
+        rng, ts = self.rng, self.ts()
+        roll = rng.randrange(8)
+        if roll == 0:
+            return f"[{ts}] [COPY-OK] {self.rel()}"
+        if roll == 1:
+            return f"[{ts}] [SYNC] Изменено файлов: {rng.randint(0, 200)}, удалено: {rng.randint(0, 20)}"
+        if roll == 2:
+            return f"[{ts}] [RATE] Осталось запросов {rng.randint(0, 5000)}/5000, сброс через {rng.randint(0, 3600)} сек"
+        if roll == 3:
+            return f"[{ts}] [TREE-ADD] {self.rel()}"
+        if roll == 4:
+            return f"[{ts}] [WATCH] modified: {self.rel()}"
+        if roll == 5:
+            return f'  File "{self.rel()}", line {rng.randint(1, 900)}, in {rng.choice(_WORDS)}'
+        if roll == 6:
+            return f"[{ts}] [PUSH] Готово: коммит {self.sha()[:10]}, файлов {rng.randint(1, 300)}"
+        return f"[{ts}] [MEM] RSS {rng.randint(40, 400)} MB, потоков {rng.randint(3, 20)}"
+
+
+def generate_log_lines(
+    target_bytes: int,
+    seed: int = 1,
+    mix: Tuple[float, float, float] = DEFAULT_MIX,
+) -> List[Tuple[str, str]]:
+    """[(вид, строка без \\n)] общим размером ~target_bytes в UTF-8"""
+    gen = _Generator(seed)
+    makers = (gen.push, gen.near, gen.plain)
+    lines = []
+    size = 0
+    while size < target_bytes:
+        kind = gen.rng.choices(range(3), weights=mix)[0]
+        line = makers[kind]()
+        lines.append((KINDS[kind], line))
+        size += len(line.encode("utf-8")) + 1
+    return lines
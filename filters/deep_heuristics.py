@@ -1,133 +1,222 @@
+"""
+Тяжёлые эвристики push-комментариев — поэтапный классификатор.
+
+Ответы совпадают с исходной реализацией (deep_heuristics_reference.py) строка
+в строку — проверка: python -m filters.differential_check
+
+✔ Сначала дешёвые проверки, дорогие (difflib, Левенштейн) — последними
+✔ Эвристики 1–3 — одна прекомпилированная регулярка: hex-серия ≥ 30 символов
+  покрывает и «/<40 hex>.txt», и 40-hex с энтропией
+✔ Перед каждой дорогой проверкой — необходимое условие, при невыполнении
+  которого исходная проверка гарантированно дала бы False
+✔ Левенштейн — ограниченный: полоса ±19 и выход, как только расстояние ≥ 20
+✔ LRU-кэш для повторяющихся строк, пакетный API для списка строк
+"""
+
 import re
-import math
-import difflib
-import fnmatch
-import hashlib
 import ast
 import json
-import base64
+import os
 import zlib
-from datetime import datetime, date
+import difflib
 from collections import Counter
+from datetime import datetime, date
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 
 
-HEX_40_RE = re.compile(r'/([a-f0-9]{40})\.txt', re.IGNORECASE)
-PUSH_COMMENTS_RE = re.compile(r'../push_comments/', re.IGNORECASE)
 TEMPLATE = '[YYYY-MM-DD HH:MM:SS] "push_comments/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx.txt",'
+CACHE_SIZE = 8192
 
+# 1–3: любая hex-серия длиной ≥ 30 (findall {20,} находит максимальные серии)
+_HEX_RUN_RE = re.compile(r'[0-9a-f]{30}', re.IGNORECASE)
+# 5: в posix-режиме shlex разделяет только по этим символам
+_SHLEX_WS_RE = re.compile(r'[ \t\r\n]')
+_SHLEX_SPECIAL = ('"', "'", '\\')
+# 8: b16decode принимает ASCII чётной длины из [0-9A-F] (и пустую строку)
+_B16_RE = re.compile(r'(?:[0-9A-F]{2})*')
 
-def looks_like_push_comment_line(s: str, time_part: str | None = None) -> bool:
-    """
-    Тяжёлые эвристики.
-    Сюда попадают ТОЛЬКО строки, которые уже прошли базовые проверки.
-    """
+# 6: fnmatch = normcase + шаблон «префикс*суффикс»
+_FN_PREFIX, _, _FN_SUFFIX = os.path.normcase('push_comments/*.txt').partition('*')
 
-    # 1. Классика: путь + 40 hex
-    if HEX_40_RE.search(s):
-        return True
+_TEMPLATE_LOWER = TEMPLATE.lower()
+_TEMPLATE_COUNTS = Counter(_TEMPLATE_LOWER)
+_MAX_DISTANCE = 19  # эвристика 9: расстояние < 20
 
-    # 2. Длинные hex-последовательности
-    hex_chunks = re.findall(r'[0-9a-f]{20,}', s, re.IGNORECASE)
-    if any(len(chunk) >= 30 for chunk in hex_chunks):
-        return True
 
-    # 3. Энтропия 40-hex
-    m = re.search(r'([a-f0-9]{40})', s, re.IGNORECASE)
-    if m:
-        chars = m.group(1).lower()
-        freq = Counter(chars)
-        entropy = -sum((c / 40) * math.log2(c / 40) for c in freq.values())
-        if entropy > 3.5:
-            return True
+def _quoted_path(s: str) -> str:
+    return s[s.find('"') + 1 : s.rfind('"')]
 
-    # 4. Сходство с шаблоном
-    if difflib.SequenceMatcher(None, s.lower(), TEMPLATE.lower()).ratio() > 0.7:
-        return True
 
-    # 5. shlex-парсинг
+def _fnmatch_push_comment(path: str) -> bool:
+    """6. fnmatch(path, 'push_comments/*.txt') и имя из 44–45 символов"""
+    norm = os.path.normcase(path)
+    if (
+        len(norm) >= len(_FN_PREFIX) + len(_FN_SUFFIX)
+        and norm.startswith(_FN_PREFIX)
+        and norm.endswith(_FN_SUFFIX)
+    ):
+        return len(path.split('/')[-1]) in (44, 45)
+    return False
+
+
+def _b16_name(path: str) -> bool:
+    """8. base64.b16decode(<имя без расширения>.upper()) не бросает исключение"""
+    return _B16_RE.fullmatch(path.split('/')[-1].split('.')[0].upper()) is not None
+
+
+def _future_date(time_part: Optional[str], this_year: int) -> bool:
+    """12. Дата из будущего (дальше следующего года)"""
+    if not time_part:
+        return False
+    # формат начинается с %Y: strptime требует ровно 4 цифры в начале
+    year = time_part[:4]
+    if len(year) != 4 or not year.isdecimal() or int(year) <= this_year + 1:
+        return False
     try:
-        import shlex
-        parsed = shlex.split(s[s.find(']') + 1 :].strip())
-        if (
-            len(parsed) == 1
-            and parsed[0].startswith('push_comments/')
-            and parsed[0].endswith('.txt')
-        ):
-            return True
+        return datetime.strptime(time_part, '%Y-%m-%d %H:%M:%S').year > this_year + 1
     except ValueError:
-        pass
+        return False
 
-    # 6. fnmatch
-    path = s[s.find('"') + 1 : s.rfind('"')]
-    if fnmatch.fnmatch(path, 'push_comments/*.txt'):
-        name = path.split('/')[-1]
-        if len(name) in (44, 45):  # 40 hex + ".txt"
-            return True
 
-    # 7. ast.literal_eval
+def _zlib_compressible(s: str) -> bool:
+    """11. Сжимается больше чем вдвое"""
     try:
-        eval_part = ast.literal_eval(path)
-        if (
-            isinstance(eval_part, str)
-            and eval_part.startswith('push_comments/')
-            and eval_part.endswith('.txt')
-        ):
-            return True
+        return len(zlib.compress(s.encode())) < len(s) / 2
     except Exception:
-        pass
+        return False
+
 
-    # 8. base16 / base64 попытка
+def _json_like(s: str) -> bool:
+    """10. После подстановки ключей строка — валидный JSON"""
     try:
-        base64.b16decode(path.split('/')[-1].split('.')[0].upper())
+        json.loads('{' + s.replace('[', '"time":"').replace('] "', '","file":') + '}')
         return True
     except Exception:
-        pass
-
-    # 9. levenshtein distance
-    def levenshtein(a, b):
-        if len(a) < len(b):
-            return levenshtein(b, a)
-        if not b:
-            return len(a)
-        prev = range(len(b) + 1)
-        for i, c1 in enumerate(a):
-            curr = [i + 1]
-            for j, c2 in enumerate(b):
-                curr.append(
-                    min(
-                        prev[j + 1] + 1,
-                        curr[j] + 1,
-                        prev[j] + (c1 != c2),
-                    )
-                )
-            prev = curr
-        return prev[-1]
-
-    if levenshtein(s.lower(), TEMPLATE.lower()) < 20:
-        return True
+        return False
 
-    # 10. JSON-подобность
+
+def _literal_push_path(path: str) -> bool:
+    """7. ast.literal_eval(path) — строка push_comments/*.txt"""
+    # строковый литерал невозможен без кавычки
+    if '"' not in path and "'" not in path:
+        return False
     try:
-        json_like = '{' + s.replace('[', '"time":"').replace('] "', '","file":') + '}'
-        json.loads(json_like)
-        return True
+        value = ast.literal_eval(path)
     except Exception:
-        pass
-
-    # 11. zlib compressibility (entropy косвенно)
+        return False
+    return isinstance(value, str) and value.startswith('push_comments/') and value.endswith('.txt')
+
+
+def _shlex_single_token(s: str) -> bool:
+    """5. shlex.split(<после ]>) — ровно один токен push_comments/*.txt"""
+    rest = s[s.find(']') + 1 :].strip()
+    if not any(ch in rest for ch in _SHLEX_SPECIAL):
+        # без кавычек и экранирования shlex — просто split по пробельным символам
+        return (
+            _SHLEX_WS_RE.search(rest) is None
+            and rest.startswith('push_comments/')
+            and rest.endswith('.txt')
+        )
     try:
-        if len(zlib.compress(s.encode())) < len(s) / 2:
+        import shlex
+        parsed = shlex.split(rest)
+    except ValueError:
+        return False
+    return len(parsed) == 1 and parsed[0].startswith('push_comments/') and parsed[0].endswith('.txt')
+
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """Расстояние Левенштейна a↔b ≤ limit. Полоса ±limit, выход при превышении."""
+    if len(a) < len(b):
+        a, b = b, a
+    la, lb = len(a), len(b)
+    if la - lb > limit:
+        return False
+    if not lb:
+        return la <= limit
+
+    over = limit + 1
+    prev = list(range(lb + 1))
+    for i in range(1, la + 1):
+        c1 = a[i - 1]
+        curr = [over] * (lb + 1)
+        curr[0] = i if i <= limit else over
+        row_min = curr[0]
+        for j in range(max(1, i - limit), min(lb, i + limit) + 1):
+            v = prev[j - 1] + (c1 != b[j - 1])
+            x = prev[j] + 1
+            if x < v:
+                v = x
+            x = curr[j - 1] + 1
+            if x < v:
+                v = x
+            if v > over:
+                v = over
+            curr[j] = v
+            if v < row_min:
+                row_min = v
+        # минимум строки матрицы не убывает — дальше будет только больше
+        if row_min > limit:
+            return False
+        prev = curr
+    return prev[lb] <= limit
+
+
+def _similar_to_template(s: str) -> bool:
+    """4. difflib ratio > 0.7 и 9. Левенштейн < 20 — с общей гистограммой символов"""
+    low = s.lower()
+    la, lb = len(low), len(_TEMPLATE_LOWER)
+    # совпадающие символы как мультимножество (то же, что считает quick_ratio)
+    counts = Counter(low)
+    matches = sum(min(n, _TEMPLATE_COUNTS[ch]) for ch, n in counts.items())
+
+    # 4: ratio() ≤ quick_ratio() = 2·matches / (la + lb)
+    if 2.0 * matches / (la + lb) > 0.7:
+        if difflib.SequenceMatcher(None, low, _TEMPLATE_LOWER).ratio() > 0.7:
             return True
-    except Exception:
-        pass
 
-    # 12. Контроль даты
-    if time_part:
-        try:
-            ts = datetime.strptime(time_part, '%Y-%m-%d %H:%M:%S')
-            if ts.year > date.today().year + 1:
-                return True
-        except ValueError:
-            pass
+    # 9: расстояние ≥ max(la, lb) − matches
+    if max(la, lb) - matches > _MAX_DISTANCE:
+        return False
+    return _within_distance(low, _TEMPLATE_LOWER, _MAX_DISTANCE)
 
-    return False
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _classify(s: str, time_part: Optional[str], this_year: int) -> bool:
+    # 1–3
+    if _HEX_RUN_RE.search(s):
+        return True
+
+    path = _quoted_path(s)
+    if _fnmatch_push_comment(path) or _b16_name(path):        # 6, 8
+        return True
+    if _future_date(time_part, this_year):                     # 12
+        return True
+    if _zlib_compressible(s) or _json_like(s):                 # 11, 10
+        return True
+    if _literal_push_path(path) or _shlex_single_token(s):     # 7, 5
+        return True
+    return _similar_to_template(s)                              # 4, 9
+
+
+def looks_like_push_comment_line(s: str, time_part: str | None = None) -> bool:
+    """
+    Тяжёлые эвристики.
+    Сюда попадают ТОЛЬКО строки, которые уже прошли базовые проверки.
+    """
+    return _classify(s, time_part, date.today().year)
+
+
+def looks_like_push_comment_lines(items: Iterable[Tuple[str, Optional[str]]]) -> List[bool]:
+    """Пакетный вариант: [(строка, time_part)] → [bool], повторы считаются один раз"""
+    this_year = date.today().year
+    seen = {}
+    result = []
+    for s, time_part in items:
+        key = (s, time_part)
+        verdict = seen.get(key)
+        if verdict is None:
+            verdict = seen[key] = _classify(s, time_part, this_year)
+        result.append(verdict)
+    return result
@@ -0,0 +1,189 @@
+"""
+Эталонная (исходная) реализация looks_like_push_comment_line.
+
+Логика каждой из 12 эвристик — без изменений, только вынесена в отдельную
+функцию, чтобы её можно было замерять по отдельности (bench_filters.py).
+Быстрый классификатор в deep_heuristics.py обязан давать те же ответы —
+см. filters/differential_check.py.
+"""
+
+import re
+import math
+import difflib
+import fnmatch
+import ast
+import json
+import base64
+import zlib
+from datetime import datetime, date
+from collections import Counter
+
+
+HEX_40_RE = re.compile(r'/([a-f0-9]{40})\.txt', re.IGNORECASE)
+TEMPLATE = '[YYYY-MM-DD HH:MM:SS] "push_comments/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx.txt",'
+
+
+def _quoted_path(s: str) -> str:
+    return s[s.find('"') + 1 : s.rfind('"')]
+
+
+# 1. Классика: путь + 40 hex
+def h01_hex40_path(s, time_part=None):
+    return bool(HEX_40_RE.search(s))
+
+
+# 2. Длинные hex-последовательности
+def h02_long_hex(s, time_part=None):
+    hex_chunks = re.findall(r'[0-9a-f]{20,}', s, re.IGNORECASE)
+    return any(len(chunk) >= 30 for chunk in hex_chunks)
+
+
+# 3. Энтропия 40-hex
+def h03_hex40_entropy(s, time_part=None):
+    m = re.search(r'([a-f0-9]{40})', s, re.IGNORECASE)
+    if m:
+        chars = m.group(1).lower()
+        freq = Counter(chars)
+        entropy = -sum((c / 40) * math.log2(c / 40) for c in freq.values())
+        if entropy > 3.5:
+            return True
+    return False
+
+
+# 4. Сходство с шаблоном
+def h04_template_ratio(s, time_part=None):
+    return difflib.SequenceMatcher(None, s.lower(), TEMPLATE.lower()).ratio() > 0.7
+
+
+# 5. shlex-парсинг
+def h05_shlex(s, time_part=None):
+    try:
+        import shlex
+        parsed = shlex.split(s[s.find(']') + 1 :].strip())
+        if (
+            len(parsed) == 1
+            and parsed[0].startswith('push_comments/')
+            and parsed[0].endswith('.txt')
+        ):
+            return True
+    except ValueError:
+        pass
+    return False
+
+
+# 6. fnmatch
+def h06_fnmatch(s, time_part=None):
+    path = _quoted_path(s)
+    if fnmatch.fnmatch(path, 'push_comments/*.txt'):
+        name = path.split('/')[-1]
+        if len(name) in (44, 45):  # 40 hex + ".txt"
+            return True
+    return False
+
+
+# 7. ast.literal_eval
+def h07_literal_eval(s, time_part=None):
+    path = _quoted_path(s)
+    try:
+        eval_part = ast.literal_eval(path)
+        if (
+            isinstance(eval_part, str)
+            and eval_part.startswith('push_comments/')
+            and eval_part.endswith('.txt')
+        ):
+            return True
+    except Exception:
+        pass
+    return False
+
+
+# 8. base16 / base64 попытка
+def h08_base16(s, time_part=None):
+    path = _quoted_path(s)
+    try:
+        base64.b16decode(path.split('/')[-1].split('.')[0].upper())
+        return True
+    except Exception:
+        pass
+    return False
+
+
+# 9. levenshtein distance
+def h09_levenshtein(s, time_part=None):
+    def levenshtein(a, b):
+        if len(a) < len(b):
+            return levenshtein(b, a)
+        if not b:
+            return len(a)
+        prev = range(len(b) + 1)
+        for i, c1 in enumerate(a):
+            curr = [i + 1]
+            for j, c2 in enumerate(b):
+                curr.append(
+                    min(
+                        prev[j + 1] + 1,
+                        curr[j] + 1,
+                        prev[j] + (c1 != c2),
+                    )
+                )
+            prev = curr
+        return prev[-1]
+
+    return levenshtein(s.lower(), TEMPLATE.lower()) < 20
+
+
+# 10. JSON-подобность
+def h10_json(s, time_part=None):
+    try:
+        json_like = '{' + s.replace('[', '"time":"').replace('] "', '","file":') + '}'
+        json.loads(json_like)
+        return True
+    except Exception:
+        pass
+    return False
+
+
+# 11. zlib compressibility (entropy косвенно)
+def h11_zlib(s, time_part=None):
+    try:
+        if len(zlib.compress(s.encode())) < len(s) / 2:
+            return True
+    except Exception:
+        pass
+    return False
+
+
+# 12. Контроль даты
+def h12_future_date(s, time_part=None):
+    if time_part:
+        try:
+            ts = datetime.strptime(time_part, '%Y-%m-%d %H:%M:%S')
+            if ts.year > date.today().year + 1:
+                return True
+        except ValueError:
+            pass
+    return False
+
+
+REFERENCE_HEURISTICS = [
+    ("01 hex40 path", h01_hex40_path),
+    ("02 long hex", h02_long_hex),
+    ("03 hex40 entropy", h03_hex40_entropy),
+    ("04 template ratio", h04_template_ratio),
+    ("05 shlex", h05_shlex),
+    ("06 fnmatch", h06_fnmatch),
+    ("07 literal_eval", h07_literal_eval),
+    ("08 base16", h08_base16),
+    ("09 levenshtein", h09_levenshtein),
+    ("10 json", h10_json),
+    ("11 zlib", h11_zlib),
+    ("12 future date", h12_future_date),
+]
+
+
+def looks_like_push_comment_line_reference(s: str, time_part: str | None = None) -> bool:
+    """Исходный порядок: первая сработавшая эвристика → True"""
+    for _, heuristic in REFERENCE_HEURISTICS:
+        if heuristic(s, time_part):
+            return True
+    return False
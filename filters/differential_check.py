@@ -0,0 +1,135 @@
+"""
+Дифференциальная проверка: быстрый классификатор ↔ эталонная реализация.
+
+    python -m filters.differential_check            # 20000 строк, seed 1
+    python -m filters.differential_check 200000 7
+
+Корпус — мутации шаблона push-комментария (вставки, удаления, замены, кавычки,
+экранирование, не-ASCII, даты из будущего) и обычные строки лога, плюс
+реалистичный лог из filters/corpus.py (примерно столько же строк). Сравниваются
+looks_like_push_comment_line (напрямую и пакетом) и should_skip_push_comment_line(s).
+Код выхода 1, если есть хоть одно расхождение.
+"""
+
+import random
+import sys
+import warnings
+from typing import List, Optional, Tuple
+
+from filters.corpus import generate_log_lines
+from filters.deep_heuristics import looks_like_push_comment_line, looks_like_push_comment_lines
+from filters.deep_heuristics_reference import looks_like_push_comment_line_reference
+from filters.push_comment_filter import (
+    _time_part,
+    should_skip_push_comment_line,
+    should_skip_push_comment_lines,
+)
+
+
+_HEX = "0123456789abcdef"
+# символы, на которых у эвристик особые случаи
+_TRICKY = list("\"'\\/.[]{}:, \t#*?") + ["ﬀ", "ß", "ı", "٣", " ", "\x0b", "A", "F", "x", "0"]
+
+
+def _hex(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(_HEX) for _ in range(n))
+
+
+def _timestamp(rng: random.Random) -> str:
+    year = rng.choice([2024, 2025, 2026, 2027, 2028, 2031, 2099])
+    return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} " \
+           f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+
+
+def _base_line(rng: random.Random) -> str:
+    kind = rng.randrange(11)
+    ts = _timestamp(rng)
+    if kind == 0:
+        return f'[{ts}] "push_comments/{_hex(rng, 40)}.txt",'
+    if kind == 1:
+        return f'[{ts}] push_comments/{_hex(rng, rng.choice([8, 20, 29, 30, 40]))}.txt'
+    if kind == 2:
+        return f'[{ts}] "push_comments/{_hex(rng, rng.randint(0, 44))}.txt"'
+    if kind == 3:
+        return f"[{ts}] 'push_comments/note_{rng.randint(0, 999)}.txt'"
+    if kind == 4:
+        return f'[{ts}] [PUSH] Обработка push_comments/ — файлов: {rng.randint(0, 500)}, пропущено {rng.randint(0, 9)}'
+    if kind == 5:
+        return f'[{ts}] {{"file": "push_comments/{_hex(rng, 12)}.txt", "size": {rng.randint(1, 9999)}}}'
+    if kind == 6:
+        return f"[{ts}] " + "push_comments/" * rng.randint(1, 8) + "x" * rng.randint(0, 80)
+    if kind == 7:
+        return f'[{ts}] ""push_comments/{"note_" * rng.randint(4, 8)}.txt""'
+    if kind == 8:
+        return f'[{ts}] "push_comments/{"note_" * rng.randint(4, 8)}.txt"'
+    if kind == 9:
+        return f'[YYYY-MM-DD HH:MM:SS] "push_comments/{"x" * rng.randint(20, 40)}{_hex(rng, 8)}.txt",'
+    return f"[{ts}] [SYNC] Скопирован файл notes/{_hex(rng, 6)}.md → vault ({rng.randint(1, 99)} KB)"
+
+
+def _mutate(rng: random.Random, s: str) -> str:
+    chars = list(s)
+    for _ in range(rng.choice([0, 0, 1, 2, 5, 15, 30])):
+        op = rng.randrange(3)
+        pos = rng.randrange(len(chars) + 1)
+        ch = rng.choice(_TRICKY) if rng.random() < 0.5 else rng.choice(_HEX)
+        if op == 0:
+            chars.insert(pos, ch)
+        elif op == 1 and pos < len(chars):
+            del chars[pos]
+        elif pos < len(chars):
+            chars[pos] = ch
+    return "".join(chars)
+
+
+def build_corpus(size: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [_mutate(rng, _base_line(rng)) for _ in range(size)]
+
+
+def _pairs(corpus: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """(строка, time_part) для прямого вызова: и реальные time_part, и произвольные"""
+    pairs = []
+    for line in corpus:
+        s = line.strip()
+        pairs.append((s, _time_part(s) or s[1:20]))
+        pairs.append((line, None))
+    return pairs
+
+
+def check(size: int = 20000, seed: int = 1) -> int:
+    corpus = build_corpus(size, seed)
+    corpus += [line for _, line in generate_log_lines(size * 80, seed)]
+    mismatches = 0
+    # ast.literal_eval на мусоре из корпуса шумит SyntaxWarning (в обеих реализациях)
+    warnings.simplefilter("ignore", SyntaxWarning)
+
+    pairs = _pairs(corpus)
+    batch = looks_like_push_comment_lines(pairs)
+    for (s, time_part), fast_batch in zip(pairs, batch):
+        expected = looks_like_push_comment_line_reference(s, time_part)
+        fast = looks_like_push_comment_line(s, time_part)
+        if fast != expected or fast_batch != expected:
+            mismatches += 1
+            print(f"РАСХОЖДЕНИЕ looks_like: {s!r} time_part={time_part!r} "
+                  f"эталон={expected} быстрый={fast} пакет={fast_batch}")
+
+    skip_batch = should_skip_push_comment_lines(corpus)
+    positives = 0
+    for line, fast_batch in zip(corpus, skip_batch):
+        s = line.strip()
+        time_part = _time_part(s)
+        expected = time_part is not None and looks_like_push_comment_line_reference(s, time_part)
+        positives += expected
+        if should_skip_push_comment_line(line) != expected or fast_batch != expected:
+            mismatches += 1
+            print(f"РАСХОЖДЕНИЕ should_skip: {line!r} эталон={expected}")
+
+    print(f"Строк: {len(corpus)} (+{len(pairs)} прямых вызовов), отбрасывается: {positives}, "
+          f"расхождений: {mismatches}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(1 if check(*args) else 0)
@@ -1,23 +1,45 @@
-import re
-from filters.deep_heuristics import looks_like_push_comment_line
+from typing import Iterable, List, Optional
 
+from filters.deep_heuristics import looks_like_push_comment_line, looks_like_push_comment_lines
 
-def should_skip_push_comment_line(s: str) -> bool:
-    s = s.strip()
 
+def _time_part(s: str) -> Optional[str]:
+    """Базовые проверки. None — строка точно не push-комментарий."""
     if len(s) < 70 or not s.startswith('['):
-        return False
+        return None
 
     close = s.find(']')
     if close == -1 or close > 30:
-        return False
+        return None
 
     if "push_comments/" not in s.lower():
-        return False
+        return None
 
-    time_part = s[1:close].strip()
+    return s[1:close].strip()
+
+
+def should_skip_push_comment_line(s: str) -> bool:
+    s = s.strip()
+    time_part = _time_part(s)
+    if time_part is None:
+        return False
 
     # быстрые базовые проверки прошли →
     return looks_like_push_comment_line(s, time_part)
 
 
+def should_skip_push_comment_lines(lines: Iterable[str]) -> List[bool]:
+    """Пакетный вариант should_skip_push_comment_line для списка строк"""
+    result = []
+    candidates = []   # (индекс, строка, time_part) — прошедшие базовые проверки
+    for line in lines:
+        s = line.strip()
+        time_part = _time_part(s)
+        if time_part is not None:
+            candidates.append((len(result), s, time_part))
+        result.append(False)
+
+    verdicts = looks_like_push_comment_lines((s, time_part) for _, s, time_part in candidates)
+    for (index, _, _), verdict in zip(candidates, verdicts):
+        result[index] = verdict
+    return result
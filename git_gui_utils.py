@@ -27,8 +27,9 @@ from config import (
     REPO_PATH, FAKE_PUSH_GIT,
     GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN,
     WATCHED_FOLDER, DELETED_TEMP, VERSIONS_DIR,
-    IGNORED_DIRS   # ← добавлен импорт
 )
+from ignore_rules import get_rules
+from rate_governor import governor
 
 IS_WINDOWS = os.name == "nt"
 
@@ -92,50 +93,41 @@ def open_versions():
 
 
 # ────────────────────────────────────────────────
-# FETCH PUSHES через GitHub API (без изменений)
+# СТРАНИЦЫ КОММИТОВ через GitHub API
 # ────────────────────────────────────────────────
 
-def fetch_pushes(github_user: str, github_repo: str, github_token: str):
-    """Получает последние коммиты из репозитория через GitHub API"""
+def fetch_commits_page(
+    github_user: str,
+    github_repo: str,
+    github_token: str,
+    page: int = 1,
+    per_page: int = 30,
+    etag: str | None = None,
+    sha: str | None = None,
+):
+    """
+    Одна страница /commits (новые первыми) для commit_cache.
+    sha — начать с этого коммита (он и его предки) вместо HEAD ветки по умолчанию.
+    Возвращает (коммиты или None при 304 Not Modified, ETag). Ошибки — исключением.
+    """
     url = f"https://api.github.com/repos/{github_user}/{github_repo}/commits"
     headers = {"Authorization": f"token {github_token}"}
-
-    log_soft(f"Запрашиваем последние коммиты через GitHub API: {url}")
-
-    try:
-        resp = requests.get(url, headers=headers, timeout=15)
-        if resp.status_code == 200:
-            data = resp.json()
-            log_soft(f"Получено {len(data)} коммитов")
-            return data
-        else:
-            log_main(f"GitHub API вернул ошибку: {resp.status_code} - {resp.text[:200]}")
-            return []
-    except Exception as e:
-        log_main(f"Ошибка запроса к GitHub API: {type(e).__name__}: {e}")
-        return []
-
-
-def fetch_commit_comment(commit_sha: str, github_user: str, github_repo: str, github_token: str):
-    """Получает полный комментарий коммита по SHA"""
-    url = f"https://api.github.com/repos/{github_user}/{github_repo}/commits/{commit_sha}"
-    headers = {"Authorization": f"token {github_token}"}
-
-    log_soft(f"Запрашиваем комментарий коммита: {commit_sha}")
-
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            message = data["commit"]["message"]
-            log_soft(f"Комментарий коммита получен (длина: {len(message)} символов)")
-            return message
-        else:
-            log_main(f"GitHub API ошибка для коммита {commit_sha}: {resp.status_code}")
-            return f"Ошибка: {resp.status_code}"
-    except Exception as e:
-        log_main(f"Ошибка получения комментария коммита {commit_sha}: {type(e).__name__}: {e}")
-        return f"Ошибка: {e}"
+    if etag:
+        headers["If-None-Match"] = etag
+    params = {"page": page, "per_page": per_page}
+    if sha:
+        params["sha"] = sha
+
+    # через governor: тот же первичный лимит, что и у пушей
+    resp = governor.request("GET", url, content=False, headers=headers, params=params, timeout=15)
+    if resp.status_code == 304:
+        return None, etag
+    if resp.status_code != 200:
+        # 409 — «Git Repository is empty»: текст ответа нужен вызывающему
+        raise requests.HTTPError(f"{resp.status_code} {resp.text[:200]}", response=resp)
+    data = resp.json()
+    log_soft(f"Страница коммитов {page}: {len(data)} шт.")
+    return data, resp.headers.get("ETag")
 
 
 # ────────────────────────────────────────────────
@@ -192,15 +184,12 @@ def do_push_with_fake_git(repo_path: Path = REPO_PATH, fake_git: Path = FAKE_PUS
         DELETED_TEMP.mkdir(parents=True, exist_ok=True)
 
         copied = 0
-        for src in WATCHED_FOLDER.rglob("*"):
-            if src.is_dir() or any(p in IGNORED_DIRS for p in src.parts):
-                continue
-            rel = src.relative_to(WATCHED_FOLDER)
+        for rel_posix, entry in get_rules().walk(WATCHED_FOLDER):
+            src = Path(entry.path)
+            rel = Path(rel_posix)
             dst = temp_path / rel
-            if '.git' in rel.parts or 'deleted_temp' in rel.parts:
-                continue
             dst.parent.mkdir(parents=True, exist_ok=True)
-            if not dst.exists() or src.stat().st_mtime > dst.stat().st_mtime:
+            if not dst.exists() or entry.stat().st_mtime > dst.stat().st_mtime:
                 shutil.copy2(src, dst)
                 copied += 1
                 log_soft(f"  + {rel}")
@@ -22,6 +22,8 @@ from gui_settings import SettingsTab, SETTINGS_FILE
 
 # Импортируем новую вкладку
 from gui_main_page import MainTab
+from gui_log_sink import GuiLogSink
+from gui_tasks import GuiTaskExecutor
 
 
 class GitVersionRestoreApp:
@@ -40,13 +42,18 @@ class GitVersionRestoreApp:
         self.auto_on_var = tk.BooleanVar(value=True)
         self.start_minimized_var = tk.BooleanVar(value=False)
 
-        self.current_branch_var = tk.StringVar(value=get_current_branch())
+        # заполняется из пула в _start_background_tasks — pygit2 не на потоке Tk
+        self.current_branch_var = tk.StringVar(value="")
 
         # Tray
         self.tray_icon = None
         self.tray_thread: threading.Thread | None = None
         self.hidden_to_tray = False
 
+        # Сеть и pygit2 — в пуле, результаты возвращаются в главный поток
+        self.tasks = GuiTaskExecutor(self.root)
+        self.tasks.start()
+
         # Инициализация
         self._load_settings()
         self._setup_singleton()
@@ -298,32 +305,16 @@ class GitVersionRestoreApp:
         # bind listbox selection теперь внутри MainTab
 
     def _bind_loggers(self) -> None:
-        def append_to_main(text: str):
-            widget = self.main_tab.log_box_main
-            if not widget or not widget.winfo_exists():
-                return
-            try:
-                widget.config(state="normal")
-                widget.insert(tk.END, text + "\n")
-                widget.see(tk.END)
-                widget.config(state="disabled")
-            except:
-                pass
-
-        def append_to_soft(text: str):
-            if not hasattr(self, "log_box_soft") or not self.log_box_soft.winfo_exists():
-                return
-            try:
-                self.log_box_soft.config(state="normal")
-                self.log_box_soft.insert(tk.END, text + "\n")
-                self.log_box_soft.see(tk.END)
-                self.log_box_soft.config(state="disabled")
-            except:
-                pass
+        # Коллбеки логгера вызываются из его потока — только буфер;
+        # в виджеты строки попадают пачками из главного потока
+        self.main_log_sink = GuiLogSink(self.root, lambda: self.main_tab.log_box_main)
+        self.soft_log_sink = GuiLogSink(self.root, lambda: getattr(self, "log_box_soft", None))
+        self.main_log_sink.start()
+        self.soft_log_sink.start()
 
         try:
             logger = get_logger()
-            logger.set_callbacks(main=append_to_main, soft=append_to_soft)
+            logger.set_callbacks(main=self.main_log_sink.write, soft=self.soft_log_sink.write)
             log_main("Логгер успешно привязан к GUI")
         except Exception as e:
             log_main(f"Не удалось привязать логгер к GUI: {e}")
@@ -381,7 +372,8 @@ class GitVersionRestoreApp:
     # ───────────────────────────────────────────────────────────────
 
     def _start_background_tasks(self) -> None:
-        threading.Thread(target=self.main_tab.load_pushes, daemon=True).start()
+        self.tasks.submit("branch-check", get_current_branch, on_done=self._on_branch_checked)
+        self.main_tab.load_pushes()
 
         if self.watcher_var.get():
             self.toggle_watcher()
@@ -396,12 +388,18 @@ class GitVersionRestoreApp:
         self.root.after(15000, self._periodic_push_refresh)
 
     def _periodic_branch_check(self) -> None:
-        current = get_current_branch()
+        if not self.tasks.busy("branch-check"):
+            self.tasks.submit("branch-check", get_current_branch, on_done=self._on_branch_checked)
+        self.root.after(30000, self._periodic_branch_check)
+
+    def _on_branch_checked(self, current: str) -> None:
+        if current and not self.current_branch_var.get():
+            self.current_branch_var.set(current)  # первое заполнение — не смена ветки
+            return
         if current and current != self.current_branch_var.get():
             self.current_branch_var.set(current)
             self.main_tab.load_pushes(force_refresh=True)
             log_soft(f"Обнаружена смена ветки → {current}")
-        self.root.after(30000, self._periodic_branch_check)
 
     # ───────────────────────────────────────────────────────────────
     # Утилиты
@@ -10,6 +10,7 @@ from pathlib import Path
 from app_logger import log_main, log_soft, log_both
 
 from config import FAKE_PUSH_GIT, GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN
+from gui_tasks import GuiTaskExecutor
 
 
 
@@ -75,14 +76,15 @@ def change_branch(branch_name, repo_path=FAKE_PUSH_GIT):
 class BranchSelectorWindow(tk.Toplevel):
     """Всплывающее окно с таблицей всех веток и пагинацией"""
 
-    def __init__(self, parent, on_select_callback):
+    def __init__(self, parent, on_select_callback, branches=None):
         super().__init__(parent)
         self.title("Выбор ветки")
         self.geometry("600x500")
         self.resizable(True, True)
         self.on_select = on_select_callback
 
-        self.branches = get_remote_branches()
+        # список лучше загрузить заранее в фоне (GuiTaskExecutor) и передать сюда
+        self.branches = branches if branches is not None else get_remote_branches()
         if not self.branches:
             messagebox.showerror("Ошибка", "Не удалось загрузить список веток")
             self.destroy()
@@ -151,7 +153,12 @@ class BranchSelectorWindow(tk.Toplevel):
             self.destroy()
 
 
-def create_branch_selector_button(parent_frame, current_branch_var: tk.StringVar, refresh_callback):
+def create_branch_selector_button(
+    parent_frame,
+    current_branch_var: tk.StringVar,
+    refresh_callback,
+    tasks: GuiTaskExecutor,
+):
     """
     Создаёт кнопку-селектор веток над списком пушей.
 
@@ -159,14 +166,19 @@ def create_branch_selector_button(parent_frame, current_branch_var: tk.StringVar
     - parent_frame: куда помещать кнопку
     - current_branch_var: tk.StringVar с текущей веткой
     - refresh_callback: функция, которая обновляет список пушей после смены ветки
+    - tasks: пул фоновых задач GUI — запросы к GitHub и pygit2 идут через него
     """
 
     def show_branch_menu(event):
+        x, y = event.x_root, event.y_root
+        tasks.submit("branch-menu", get_remote_branches,
+                     on_done=lambda branches: popup_branch_menu(branches, x, y))
+
+    def popup_branch_menu(branches, x, y):
         menu = tk.Menu(parent_frame, tearoff=0)
 
         # Последние 15 веток (локально + удалённые)
-        branches = get_remote_branches()[:15]
-        for branch in branches:
+        for branch in branches[:15]:
             menu.add_command(
                 label=branch,
                 command=lambda b=branch: select_branch(b)
@@ -176,18 +188,26 @@ def create_branch_selector_button(parent_frame, current_branch_var: tk.StringVar
         menu.add_command(label="Show More...", command=show_all_branches_window)
 
         try:
-            menu.tk_popup(event.x_root, event.y_root)
+            menu.tk_popup(x, y)
         finally:
             menu.grab_release()
 
     def select_branch(branch_name):
-        if change_branch(branch_name):
+        if tasks.busy("branch-change"):
+            log_main("Переключение ветки ещё выполняется — подождите")
+            return  # два checkout одного репозитория параллельно — нельзя
+        tasks.submit("branch-change", change_branch, branch_name,
+                     on_done=lambda ok: on_branch_changed(ok, branch_name))
+
+    def on_branch_changed(ok, branch_name):
+        if ok:
             current_branch_var.set(branch_name)
             refresh_callback()  # обновляем список пушей
             log_both(f"Переключено на ветку: {branch_name}")
 
     def show_all_branches_window():
-        BranchSelectorWindow(parent_frame, select_branch)
+        tasks.submit("branch-list", get_remote_branches,
+                     on_done=lambda branches: BranchSelectorWindow(parent_frame, select_branch, branches))
 
     # Сама кнопка
     branch_btn = tk.Button(
@@ -0,0 +1,98 @@
+"""
+gui_log_sink.py
+
+Вывод логов в Text-виджеты без подвисаний GUI.
+
+✔ write() вызывается из потока логгера и только кладёт строку в ограниченный буфер —
+  никаких обращений к Tk не из главного потока
+✔ Главный поток забирает буфер раз в GUI_LOG_FLUSH_MS (root.after) и вставляет
+  все строки одним insert
+✔ Всплеск больше буфера: старые строки отбрасываются, вместо них — одна строка
+  «пропущено N строк»
+✔ Виджет обрезается сверху до GUI_LOG_MAX_LINES строк
+"""
+
+import threading
+import tkinter as tk
+from collections import deque
+from typing import Callable, Optional
+
+from config import GUI_LOG_MAX_LINES, GUI_LOG_FLUSH_MS, GUI_LOG_BUFFER_LINES
+
+
+class GuiLogSink:
+    def __init__(
+        self,
+        root: tk.Misc,
+        get_widget: Callable[[], Optional[tk.Text]],
+        max_lines: int = GUI_LOG_MAX_LINES,
+        interval_ms: int = GUI_LOG_FLUSH_MS,
+        buffer_lines: int = GUI_LOG_BUFFER_LINES,
+    ):
+        self.root = root
+        self.get_widget = get_widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+
+        self._lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=min(buffer_lines, max_lines))
+        self._dropped = 0
+        self._running = False
+
+    # ─── поток логгера ───
+
+    def write(self, line: str) -> None:
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._dropped += 1
+            self._buffer.append(line if line.endswith("\n") else line + "\n")
+
+    # ─── главный поток ───
+
+    def start(self) -> None:
+        """Вызывать из главного потока (после создания виджета)"""
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval_ms, self._pump)
+
+    def stop(self) -> None:
+        self._running = False
+
+    def _pump(self) -> None:
+        if not self._running:
+            return
+        try:
+            self.flush()
+        finally:
+            try:
+                self.root.after(self.interval_ms, self._pump)
+            except tk.TclError:
+                self._running = False  # окно уничтожено
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                return
+            lines = list(self._buffer)
+            self._buffer.clear()
+            dropped, self._dropped = self._dropped, 0
+
+        widget = self.get_widget()
+        if widget is None or not widget.winfo_exists():
+            return
+
+        if dropped:
+            lines.insert(0, f"… пропущено {dropped} строк (всплеск логов)\n")
+
+        try:
+            at_bottom = widget.yview()[1] >= 0.999
+            widget.config(state="normal")
+            widget.insert(tk.END, "".join(lines))
+            total = int(widget.index("end-1c").split(".")[0])
+            if total > self.max_lines:
+                widget.delete("1.0", f"{total - self.max_lines + 1}.0")
+            widget.config(state="disabled")
+            if at_bottom:
+                widget.see(tk.END)
+        except tk.TclError:
+            pass
@@ -5,17 +5,62 @@
 
 import tkinter as tk
 from tkinter import scrolledtext, ttk
-import threading
-import requests
 import tkinter.messagebox as messagebox
 
 from app_logger import log_main, log_soft
 from config import GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN, GITHUB_PROFILE_URL
-from git_gui_utils import clone_version, open_versions, fetch_pushes
+from rate_governor import governor
+from commit_cache import commit_cache, compact_comments
+from git_gui_utils import clone_version, open_versions, fetch_commits_page
 from gui_func_tables import create_branch_selector_button
+from gui_push_list import VirtualPushList
 from gui_watcher import safe_ensure_repository_and_main_branch
 
 
+# Ключи задач GuiTaskExecutor
+PUSHES_TASK = "pushes"
+COMMENT_TASK = "commit-comment"
+
+
+def _fetch_page(page: int, per_page: int, etag: str | None):
+    return fetch_commits_page(GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN, page, per_page, etag)
+
+
+def _sync_pushes() -> int:
+    """Поток пула: догрузить новые коммиты в кэш; пустой репозиторий (409) — инициализировать"""
+    try:
+        return commit_cache.sync(_fetch_page)
+    except Exception as e:
+        if "409" in str(e) and "empty" in str(e).lower():
+            log_main("Репозиторий пустой (409) → инициализация")
+            safe_ensure_repository_and_main_branch()
+            return commit_cache.sync(_fetch_page)
+        raise
+
+
+def _load_older() -> int:
+    """Поток пула: следующая страница старой истории в кэш"""
+    return commit_cache.load_older(
+        lambda sha, per_page: fetch_commits_page(
+            GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN, per_page=per_page, sha=sha
+        )[0]
+    )
+
+
+def _fetch_commit_comments(sha: str) -> list[dict]:
+    """Поток пула: комментарии к коммиту (и в кэш)"""
+    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/commits/{sha}/comments"
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+
+    r = governor.request("GET", url, content=False, headers=headers, timeout=10)
+    r.raise_for_status()
+    comments = compact_comments(r.json())
+    commit_cache.store_comments(sha, comments)
+    return comments
+
+
 class MainTab:
     """
     Класс, отвечающий за содержимое вкладки "Главная"
@@ -32,14 +77,17 @@ class MainTab:
         self.log_box_main = None
         self.watcher_status_label = None
         self.branch_button = None
+        self.push_list: VirtualPushList | None = None
 
         # Данные
-        self.pushes: list[dict] = []
         self.selected_sha: str | None = None
 
         self._build_ui()
         self._bind_events()
 
+        # список — сразу из локального кэша, обновление из сети придёт позже
+        self.push_list.show(0)
+
     def _build_ui(self):
         f = self.parent
 
@@ -53,7 +101,8 @@ class MainTab:
         self.branch_button = create_branch_selector_button(
             branch_f,
             self.app.current_branch_var,
-            self.load_pushes
+            lambda: self.load_pushes(force_refresh=True),
+            self.app.tasks,
         )
 
         # Поле SHA
@@ -115,10 +164,10 @@ class MainTab:
         sb = tk.Scrollbar(left)
         sb.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.push_listbox = tk.Listbox(
-            left, yscrollcommand=sb.set, font=("Consolas", 10))
+        self.push_listbox = tk.Listbox(left, font=("Consolas", 10))
         self.push_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        sb.config(command=self.push_listbox.yview)
+        # в Listbox — только окно над историей из commit_cache, scrollbar — по всей истории
+        self.push_list = VirtualPushList(self.push_listbox, sb, self.app.tasks, _load_older)
 
         # Комментарий к коммиту справа
         right = tk.Frame(paned_h)
@@ -153,34 +202,29 @@ class MainTab:
     # ───────────────────────────────────────────────
 
     def load_pushes(self, force_refresh: bool = False) -> None:
-        try:
-            fresh = fetch_pushes(GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN)
-
-            if fresh != self.pushes or force_refresh:
-                self.pushes = fresh
-                self.push_listbox.delete(0, tk.END)
-
-                for commit in self.pushes[:60]:
-                    msg = commit["commit"]["message"].splitlines()[0][:90]
-                    self.push_listbox.insert(tk.END, f"{commit['sha'][:8]} | {msg}")
-
-                log_soft(f"Список пушей обновлён: {len(self.pushes)} коммитов")
-
-        except Exception as e:
-            if "409" in str(e) and "empty" in str(e).lower():
-                log_main("Репозиторий пустой (409) → инициализация")
-                safe_ensure_repository_and_main_branch()
-                self.load_pushes(force_refresh=True)
-            else:
-                log_main(f"Ошибка загрузки пушей: {e}")
+        """
+        Догрузить новые коммиты в фоне. Обычное обновление пропускается, пока идёт
+        предыдущее; force_refresh вытесняет его (например, после смены ветки).
+        """
+        tasks = self.app.tasks
+        if not force_refresh and tasks.busy(PUSHES_TASK):
+            return
+        tasks.submit(
+            PUSHES_TASK,
+            _sync_pushes,
+            on_done=lambda added: self.push_list.refresh_top(),
+            on_error=lambda e: log_main(f"Ошибка загрузки пушей: {e}"),
+        )
 
     def on_select_commit(self, event):
         sel = self.push_listbox.curselection()
         if not sel:
             return
 
-        idx = sel[0]
-        self.selected_sha = self.pushes[idx]["sha"]
+        commit = self.push_list.commit_at(sel[0])
+        if commit is None:
+            return
+        self.selected_sha = self.push_list.selected_sha = commit.sha
 
         self.commit_entry.delete(0, tk.END)
         self.commit_entry.insert(0, self.selected_sha)
@@ -188,47 +232,43 @@ class MainTab:
         self._load_commit_comment_async(self.selected_sha)
 
     def _load_commit_comment_async(self, sha: str):
+        cached = commit_cache.comments(sha)
+        if cached is None:
+            self._set_comment("Загрузка комментария...\n")
+        else:
+            self._show_comments(cached)
+
+        # комментарий могут добавить позже пуша — кэш перепроверяется в фоне;
+        # новый выбор вытесняет прежний запрос — опоздавший ответ не затрёт текст
+        self.app.tasks.submit(
+            COMMENT_TASK,
+            _fetch_commit_comments,
+            sha,
+            on_done=lambda comments: self._show_comments(comments) if comments != cached else None,
+            on_error=lambda e: self._show_comment_error(e, shown=cached is not None),
+        )
+
+    def _set_comment(self, text: str) -> None:
         self.comment_box.config(state="normal")
         self.comment_box.delete("1.0", tk.END)
-        self.comment_box.insert(tk.END, "Загрузка комментария...\n")
+        self.comment_box.insert(tk.END, text)
         self.comment_box.config(state="disabled")
 
-        def fetch_task():
-            try:
-                url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/commits/{sha}/comments"
-                headers = {"Accept": "application/vnd.github+json"}
-                if GITHUB_TOKEN:
-                    headers["Authorization"] = f"token {GITHUB_TOKEN}"
-
-                r = requests.get(url, headers=headers, timeout=10)
-                r.raise_for_status()
-                comments = r.json()
-
-                self.comment_box.config(state="normal")
-                self.comment_box.delete("1.0", tk.END)
-
-                if not comments:
-                    self.comment_box.insert(tk.END, "Комментариев к этому коммиту нет.\n")
-                else:
-                    c = comments[-1]
-                    user = c.get("user", {}).get("login", "—")
-                    date = c.get("created_at", "—")
-                    body = c.get("body", "(пусто)")
-                    link = c.get("html_url", "—")
-                    self.comment_box.insert(tk.END, f"@{user} ({date})\n\n{body}\n\n→ {link}\n")
-
-                self.comment_box.config(state="disabled")
-                self.comment_box.see(tk.END)
-
-            except Exception as e:
-                msg = f"Ошибка загрузки комментария: {e}"
-                self.comment_box.config(state="normal")
-                self.comment_box.delete("1.0", tk.END)
-                self.comment_box.insert(tk.END, msg + "\n")
-                self.comment_box.config(state="disabled")
-                log_main(msg)
-
-        threading.Thread(target=fetch_task, daemon=True).start()
+    def _show_comments(self, comments: list[dict]) -> None:
+        if not comments:
+            self._set_comment("Комментариев к этому коммиту нет.\n")
+        else:
+            c = comments[-1]
+            self._set_comment(f"@{c['user']} ({c['created_at']})\n\n{c['body']}\n\n→ {c['html_url']}\n")
+        self.comment_box.see(tk.END)
+
+    def _show_comment_error(self, e: BaseException, shown: bool) -> None:
+        msg = f"Ошибка загрузки комментария: {e}"
+        if shown:
+            log_soft(msg + " (показан кэш)")
+            return
+        self._set_comment(msg + "\n")
+        log_main(msg)
 
     def copy_selected_sha(self):
         if self.selected_sha:
@@ -250,4 +290,5 @@ class MainTab:
         if not sha:
             messagebox.showwarning("Ошибка", "Введите SHA коммита")
             return
-        clone_version(sha, GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN)
\ No newline at end of file
+        self.app.tasks.submit(f"clone:{sha}", clone_version, sha, GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN)
+        self.app._create_notification("Клонирование запущено (см. лог)")
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+gui_push_list.py
+
+Виртуальный список пушей: вся история — в commit_cache (SQLite), в Listbox —
+только окно вокруг видимых строк.
+
+✔ В Listbox не больше WINDOW_ROWS строк при любой длине истории; память
+  не растёт с числом коммитов
+✔ Прокрутка внутри окна — родная (колесо, клавиши); у края окна оно
+  перестраивается вокруг видимой строки (after_idle, не изнутри callback'а)
+✔ Ползунок Scrollbar — по всей истории в кэше: перетаскивание сразу
+  показывает нужное место
+✔ Ближе PREFETCH_ROWS строк к концу кэша — следующая страница старой
+  истории грузится в фоне (GuiTaskExecutor), пока пользователь до неё листает
+✔ Новые коммиты сверху: если окно у вершины — вставляются в Listbox,
+  иначе окно остаётся на тех же коммитах (позиция — по SHA)
+✔ Выбранный коммит остаётся выделенным после перестройки окна
+"""
+
+import tkinter as tk
+from typing import Callable, List, Optional
+
+from app_logger import log_main
+from commit_cache import CachedCommit, commit_cache
+from gui_tasks import GuiTaskExecutor
+
+
+WINDOW_ROWS = 240      # строк в Listbox
+WINDOW_MARGIN = 80     # строк над видимой частью после перестройки окна
+EDGE_ROWS = 40         # ближе к краю окна — перестроить
+PREFETCH_ROWS = 300    # ближе к концу кэша — грузить старую историю
+
+HISTORY_TASK = "push-history"
+
+
+class VirtualPushList:
+    def __init__(
+        self,
+        listbox: tk.Listbox,
+        scrollbar: tk.Scrollbar,
+        tasks: GuiTaskExecutor,
+        load_older: Callable[[], int],
+    ):
+        self.lb = listbox
+        self.sb = scrollbar
+        self.tasks = tasks
+        self.load_older = load_older      # поток пула: страница старой истории → число новых строк
+
+        self.start = 0                    # номер первой строки окна (0 — самый новый коммит)
+        self.rows: List[CachedCommit] = []
+        self.total = 0
+        self.complete = False
+        self.selected_sha: Optional[str] = None
+        self._rendering = False
+        self._shift_pending = False
+
+        self.lb.config(yscrollcommand=self._on_view)
+        self.sb.config(command=self._on_scrollbar)
+
+    # ─── данные ───
+
+    @staticmethod
+    def _row_text(commit: CachedCommit) -> str:
+        return f"{commit.sha[:8]} | {commit.title[:90]}"
+
+    def commit_at(self, index: int) -> Optional[CachedCommit]:
+        """Коммит по индексу строки Listbox"""
+        return self.rows[index] if 0 <= index < len(self.rows) else None
+
+    def _top(self) -> int:
+        """Номер самой верхней видимой строки в истории"""
+        nearest = self.lb.nearest(0) if self.rows else -1
+        return self.start + max(0, nearest)
+
+    # ─── отрисовка ───
+
+    def show(self, top: int = 0) -> None:
+        """Перестроить окно так, чтобы строка top была вверху видимой части"""
+        self.total = commit_cache.count()
+        self.complete = commit_cache.history_complete()
+        top = max(0, min(top, self.total - 1))
+        self.start = max(0, top - WINDOW_MARGIN)
+        self.rows = commit_cache.window(self.start, WINDOW_ROWS)
+
+        self._rendering = True
+        try:
+            self.lb.delete(0, tk.END)
+            if self.rows:
+                self.lb.insert(tk.END, *[self._row_text(c) for c in self.rows])
+                self.lb.yview(top - self.start)
+            self._restore_selection()
+        finally:
+            self._rendering = False
+            self._shift_pending = False
+        self._update_scrollbar()
+
+    def _restore_selection(self) -> None:
+        if self.selected_sha is None:
+            return
+        for i, commit in enumerate(self.rows):
+            if commit.sha == self.selected_sha:
+                self.lb.selection_set(i)
+                return
+
+    def _update_scrollbar(self) -> None:
+        self._on_view(*self.lb.yview())
+
+    # ─── прокрутка ───
+
+    def _on_view(self, first, last) -> None:
+        """yscrollcommand Listbox: положение окна → положение во всей истории"""
+        n = len(self.rows)
+        if not n or not self.total:
+            self.sb.set(0.0, 1.0)
+            return
+        top = self.start + float(first) * n
+        bottom = self.start + float(last) * n
+        self.sb.set(top / self.total, bottom / self.total)
+        if self._rendering:
+            return
+
+        near_top = self.start > 0 and top - self.start < EDGE_ROWS
+        near_bottom = self.start + n < self.total and self.start + n - bottom < EDGE_ROWS
+        if (near_top or near_bottom) and not self._shift_pending:
+            self._shift_pending = True
+            self.lb.after_idle(lambda: self.show(self._top()))
+
+        if self.total - bottom < PREFETCH_ROWS:
+            self._prefetch()
+
+    def _on_scrollbar(self, *args) -> None:
+        if args and args[0] == "moveto":
+            self.show(int(float(args[1]) * self.total))
+        else:
+            # «scroll N units/pages» — в пределах окна; край подхватит _on_view
+            self.lb.yview(*args)
+
+    # ─── обновление истории ───
+
+    def _prefetch(self) -> None:
+        if self.complete or self.tasks.busy(HISTORY_TASK):
+            return
+        self.tasks.submit(
+            HISTORY_TASK,
+            self.load_older,
+            on_done=self._on_older_loaded,
+            on_error=lambda e: log_main(f"Ошибка загрузки старой истории: {e}"),
+        )
+
+    def _on_older_loaded(self, added: int) -> None:
+        at_end = self.start + len(self.rows) >= self.total
+        self.total = commit_cache.count()
+        self.complete = commit_cache.history_complete()
+        if added and at_end:
+            self.show(self._top())  # окно упиралось в конец кэша — дотянуть
+        else:
+            self._update_scrollbar()
+
+    def refresh_top(self) -> None:
+        """После sync: новые коммиты сверху. Окно остаётся на тех же коммитах."""
+        anchor = self.rows[0].sha if self.rows else None
+        position = commit_cache.position(anchor) if anchor else None
+        if position is None:
+            self.show(0)  # первый показ или история на remote переписана
+            return
+
+        added = position - self.start
+        self.total = commit_cache.count()
+        if added <= 0:
+            self._update_scrollbar()
+            return
+
+        if self.start == 0 and added < WINDOW_ROWS:
+            # окно у вершины: вставить новые строки сверху, лишние — срезать снизу
+            top = self._top()
+            new = commit_cache.window(0, added)
+            self._rendering = True
+            try:
+                self.lb.insert(0, *[self._row_text(c) for c in new])
+                self.rows[0:0] = new
+                self.lb.delete(WINDOW_ROWS, tk.END)
+                del self.rows[WINDOW_ROWS:]
+                # у самой вершины — показать новые; иначе вид не прыгает
+                self.lb.yview(top + len(new) if top > 0 else 0)
+            finally:
+                self._rendering = False
+        else:
+            self.start = position
+        self._update_scrollbar()
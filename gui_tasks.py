@@ -0,0 +1,142 @@
+"""
+gui_tasks.py
+
+Фоновые задачи GUI: сеть и pygit2 — не в потоке Tk.
+
+✔ Ограниченный пул daemon-потоков (GUI_TASK_WORKERS): выход из приложения
+  не ждёт зависший запрос или долгий clone
+✔ Результат возвращается в главный поток: очередь разбирается через root.after
+  раз в GUI_TASK_POLL_MS — callback'и on_done / on_error могут трогать виджеты
+✔ Задачи с одним ключом вытесняют друг друга: новый submit делает старую
+  задачу устаревшей — если она ещё в очереди, она не запустится, если уже
+  выполняется, её результат будет отброшен
+✔ busy(key) — для периодических задач: не ставить новую, пока идёт прежняя
+"""
+
+import queue
+import threading
+import tkinter as tk
+from typing import Any, Callable, Dict, Optional
+
+from app_logger import log_main, log_soft
+from config import GUI_TASK_WORKERS, GUI_TASK_POLL_MS
+
+
+class GuiTaskExecutor:
+    def __init__(
+        self,
+        root: tk.Misc,
+        workers: int = GUI_TASK_WORKERS,
+        interval_ms: int = GUI_TASK_POLL_MS,
+    ):
+        self.root = root
+        self.workers = workers
+        self.interval_ms = interval_ms
+
+        self._tasks: queue.Queue = queue.Queue()
+        self._results: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation: Dict[str, int] = {}
+        self._pending: Dict[str, int] = {}     # ключ → поколение, ещё не доставленное
+        self._threads = []
+        self._running = False
+
+    # ─── главный поток ───
+
+    def start(self) -> None:
+        """Вызывать из главного потока"""
+        if self._running:
+            return
+        self._running = True
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, name=f"gui-task-{len(self._threads)}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self.root.after(self.interval_ms, self._pump)
+
+    def stop(self) -> None:
+        self._running = False
+        with self._lock:
+            # всё, что ещё не доставлено, — устаревшее
+            for key in list(self._pending):
+                self._generation[key] += 1
+            self._pending.clear()
+
+    def submit(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        **kwargs,
+    ) -> int:
+        """Поставить fn(*args, **kwargs) в пул. Возвращает поколение задачи."""
+        with self._lock:
+            generation = self._generation.get(key, 0) + 1
+            self._generation[key] = generation
+            self._pending[key] = generation
+        self._tasks.put((key, generation, fn, args, kwargs, on_done, on_error))
+        return generation
+
+    def cancel(self, key: str) -> None:
+        """Результат текущей задачи с этим ключом не будет доставлен"""
+        with self._lock:
+            if key in self._pending:
+                self._generation[key] += 1
+                del self._pending[key]
+
+    def busy(self, key: str) -> bool:
+        with self._lock:
+            return key in self._pending
+
+    def is_current(self, key: str, generation: int) -> bool:
+        with self._lock:
+            return self._pending.get(key) == generation
+
+    def _pump(self) -> None:
+        if not self._running:
+            return
+        try:
+            self._drain()
+        finally:
+            try:
+                self.root.after(self.interval_ms, self._pump)
+            except tk.TclError:
+                self._running = False  # окно уничтожено
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                key, generation, ok, value, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                if self._pending.get(key) != generation:
+                    continue  # устарела, пока выполнялась
+                del self._pending[key]
+
+            try:
+                if ok:
+                    if on_done is not None:
+                        on_done(value)
+                elif on_error is not None:
+                    on_error(value)
+                else:
+                    log_main(f"[GUI-TASK] {key}: {type(value).__name__}: {value}")
+            except Exception as e:
+                log_main(f"[GUI-TASK] Ошибка в обработчике {key}: {type(e).__name__}: {e}")
+
+    # ─── потоки пула ───
+
+    def _worker(self) -> None:
+        while True:
+            key, generation, fn, args, kwargs, on_done, on_error = self._tasks.get()
+            if not self.is_current(key, generation):
+                log_soft(f"[GUI-TASK] {key}: устарела до запуска — пропущена")
+                continue
+            try:
+                value, ok = fn(*args, **kwargs), True
+            except Exception as e:
+                value, ok = e, False
+            self._results.put((key, generation, ok, value, on_done, on_error))
@@ -27,13 +27,17 @@ from app_logger import log_main, log_soft
 
 from config import (
     DEBOUNCE_SECONDS,
-    IGNORED_DIRS,
     GITHUB_USERNAME,
     GITHUB_REPO,
     GITHUB_TOKEN,
-    REPO_PATH
+    REPO_PATH,
+    SPECULATIVE_UPLOAD,
+    STORM_EVENTS_PER_SECOND,
+    STORM_QUIET_SECONDS,
 )
 
+from ignore_rules import get_rules, reload_rules, vault_rel
+
 from observer_manager import (
     start_observer,
     stop_observer,
@@ -55,6 +59,10 @@ debounce_timer: Timer | None = None
 watcher_thread: threading.Thread | None = None
 _watcher_running = False
 
+# Перемещения из watchdog: (старый rel, новый rel, это папка) — подсказки для detect_moves
+_move_hints: list[tuple[str, str, bool]] = []
+_move_hints_lock = Lock()
+
 
 # ─────────────────────────────────────────────
 # GitHub API check: repo empty?
@@ -170,24 +178,178 @@ def bootstrap_force_push_cli():
 # Watchdog handler
 # ─────────────────────────────────────────────
 
+def record_move(src_path: str, dest_path: str, is_directory: bool) -> None:
+    src_rel, dest_rel = vault_rel(src_path), vault_rel(dest_path)
+    if not src_rel or not dest_rel:
+        return
+    with _move_hints_lock:
+        _move_hints.append((src_rel, dest_rel, is_directory))
+
+
+def take_move_hints() -> list[tuple[str, str, bool]]:
+    """Забирает накопленные перемещения (вызывается в начале пуша)"""
+    with _move_hints_lock:
+        hints = list(_move_hints)
+        _move_hints.clear()
+    return hints
+
+
+class EventStormGuard:
+    """
+    Детектор шторма событий по темпу.
+
+    Обычный режим: считаем события в окне 1 сек (monotonic + инкремент).
+    Игнорируемые пути сюда не доходят (отсеяны в ChangeHandler.dispatch).
+    Порог превышен → шторм: отменяем запланированный push, дальше каждое
+    событие стоит одного инкремента (без логов и пересоздания Timer).
+    Отдельный поток раз в STORM_QUIET_SECONDS смотрит темп; когда он упал
+    в 10 раз ниже порога — выходим из шторма и планируем ОДИН push,
+    который сам пересканирует всю папку.
+
+    hit() вызывается из потока observer, _wait_for_calm — из своего потока:
+    счётчики и флаг шторма меняются только под self._lock.
+    """
+
+    def __init__(self, threshold: int = STORM_EVENTS_PER_SECOND, quiet_seconds: int = STORM_QUIET_SECONDS):
+        self.threshold = threshold
+        self.quiet_seconds = quiet_seconds
+        self.in_storm = False
+
+        self._lock = Lock()
+        self._window_start = 0.0
+        self._window_count = 0
+        self._storm_events = 0
+
+    def hit(self) -> bool:
+        """Учитывает событие. True → идёт шторм, событие обрабатывать не нужно."""
+        with self._lock:
+            if self.in_storm:
+                self._storm_events += 1
+                return True
+
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+
+            self._window_count += 1
+            if self._window_count <= self.threshold:
+                return False
+
+            self.in_storm = True
+            self._storm_events = self._window_count
+
+        self._enter_storm()
+        return True
+
+    def _enter_storm(self) -> None:
+        cancel_scheduled_push()
+        log_main(f"[storm] > {self.threshold} событий/сек → режим шторма, обработка по событию приостановлена")
+        threading.Thread(target=self._wait_for_calm, name="storm-guard", daemon=True).start()
+
+    def _wait_for_calm(self) -> None:
+        started = time.monotonic()
+        exit_rate = max(1, self.threshold // 10)
+        with self._lock:
+            last = self._storm_events
+
+        while True:
+            time.sleep(self.quiet_seconds)
+            with self._lock:
+                current = self._storm_events
+                rate = (current - last) / self.quiet_seconds
+                last = current
+                if rate < exit_rate:
+                    # выход из шторма — в той же блокировке, что и последний замер
+                    self._window_count = 0
+                    self._window_start = 0.0
+                    self.in_storm = False
+                    break
+
+        log_main(
+            f"[storm] Шторм закончился: {last} событий за {time.monotonic() - started:.0f} сек "
+            f"→ одна сверка папки"
+        )
+        schedule_push()
+
+
+_storm_guard = EventStormGuard()
+
+
 class ChangeHandler(FileSystemEventHandler):
 
-    def _ignore(self, path: str) -> bool:
-        return any(p in IGNORED_DIRS for p in Path(path).parts)
+    def _ignore(self, path: str, is_directory: bool = False) -> bool:
+        rel = vault_rel(path)
+        if rel is None:
+            return True
+        if rel == ".gitignore":
+            reload_rules()
+            return False
+        rules = get_rules()
+        if is_directory:
+            return rules.dir_ignored(rel)
+        return not rules.include_file(rel)
+
+    def _ignore_event(self, event) -> bool:
+        if event.event_type == "moved":
+            dest_path = getattr(event, "dest_path", "") or ""
+            return self._ignore(event.src_path, event.is_directory) and \
+                (not dest_path or self._ignore(dest_path, event.is_directory))
+        return self._ignore(event.src_path, event.is_directory)
+
+    def dispatch(self, event):
+        # Во время шторма событие стоит одного инкремента — без vault_rel,
+        # правил, логов и Timer (флаг читается без блокировки)
+        checked = not _storm_guard.in_storm
+        # Вне шторма игнорируемые пути (.git при pull, временные файлы) не идут
+        # в счётчик: иначе их поток включает шторм и лишнюю сверку папки
+        if checked and self._ignore_event(event):
+            return
+        if _storm_guard.hit():
+            return
+        # шторм закончился между проверкой флага и hit() — правила ещё не применены
+        if not checked and self._ignore_event(event):
+            return
+        super().dispatch(event)
+
+    def on_moved(self, event):
+        # игнорируемые перемещения отсеяны в dispatch
+        dest_path = getattr(event, "dest_path", "") or ""
+
+        with _push_lock:
+            if _push_in_progress:
+                return
+
+        log_soft(f"[watchdog] Перемещение: {event.src_path} → {dest_path}")
+        record_move(event.src_path, dest_path, event.is_directory)
+
+        if SPECULATIVE_UPLOAD and not event.is_directory and dest_path:
+            from blob_store import get_speculative_uploader
+            get_speculative_uploader().note(dest_path)
+
+        schedule_push()
 
     def on_any_event(self, event):
 
-        if event.is_directory:
+        if event.event_type == "moved":
+            # обрабатывается в on_moved (dispatch вызывает оба метода)
             return
 
-        if self._ignore(event.src_path):
+        if event.is_directory:
             return
 
+        # игнорируемые пути отсеяны в dispatch
+
         with _push_lock:
             if _push_in_progress:
                 return
 
         log_soft(f"[watchdog] Изменение: {event.src_path}")
+
+        if SPECULATIVE_UPLOAD:
+            from blob_store import get_speculative_uploader
+            get_speculative_uploader().note(event.src_path)
+
         schedule_push()
 
 
@@ -195,6 +357,13 @@ class ChangeHandler(FileSystemEventHandler):
 # Debounce push
 # ─────────────────────────────────────────────
 
+def cancel_scheduled_push():
+    global debounce_timer
+    if debounce_timer:
+        debounce_timer.cancel()
+        debounce_timer = None
+
+
 def schedule_push():
     global debounce_timer
 
@@ -0,0 +1,326 @@
+"""
+ignore_rules.py
+
+Единый движок «игнорировать / включать» для всех стадий:
+watchdog-обработчик, копирование в staging, collect_changes, индекс, tree.
+
+✔ Паттерны в стиле .gitignore: config (IGNORED_DIRS + IGNORE_PATTERNS из .env)
+  + .gitignore в корне наблюдаемой папки
+✔ Паттерны компилируются в один объединённый regex
+  (если есть «!»-исключения — в упорядоченный список, «последний совпавший побеждает»)
+✔ Решения по папкам мемоизируются; при обходе игнорируемые папки отрезаются целиком
+✔ Фильтр расширений (SYNC_EXTENSIONS + вложения) и проверка «битых» путей — здесь же
+
+Изменение поведения: прежняя проверка «"temp" в пути» пропускала всё, где
+встречалось temp — в том числе папку шаблонов Obsidian Templates/ и заметки
+вроде Contemporary.md. Теперь встроенные правила — только *.tmp / *.temp / ~$*,
+и такие папки синхронизируются. Вернуть исключение: IGNORE_PATTERNS="Templates/"
+в .env или строка Templates/ в .gitignore хранилища.
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from app_logger import log_main, log_soft
+import config
+
+
+# Символы, недопустимые в пути внутри git-tree (Windows + управляющие)
+_MALFORMED_CHARS_RE = re.compile(r'[\x00-\x1f\x7f<>:"\\|?*]')
+_FORBIDDEN_PARTS = {'.git', '.obsidian', '__MACOSX'}
+
+
+def is_malformed_path(rel_path: str) -> bool:
+    if rel_path.startswith('/'): return True
+    if rel_path.endswith('/'): return True
+    if '//' in rel_path: return True
+    parts = rel_path.split('/')
+    if '..' in parts: return True
+    if _MALFORMED_CHARS_RE.search(rel_path): return True
+    if any(part in _FORBIDDEN_PARTS for part in parts): return True
+    return False
+
+
+# ────────────────────────────────────────────────
+# Компиляция .gitignore-паттернов
+# ────────────────────────────────────────────────
+
+def _glob_to_regex(glob: str) -> str:
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == '*':
+            if glob.startswith('**', i):
+                at_start = i == 0 or glob[i - 1] == '/'
+                if at_start and glob.startswith('**/', i):
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+                if at_start and i + 2 == n:
+                    out.append('.*')
+                    i += 2
+                    continue
+                out.append('[^/]*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = glob.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def compile_pattern(line: str) -> Optional[tuple[str, bool, bool]]:
+    """
+    Одна строка .gitignore → (regex, negate, dir_only) или None.
+    Regex сопоставляется с полным относительным posix-путём.
+    """
+    line = line.rstrip('\n').rstrip('\r')
+    if not line.strip() or line.startswith('#'):
+        return None
+    line = line.rstrip(' ')
+
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    elif line.startswith('\\'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    anchored = '/' in line
+    line = line.lstrip('/')
+
+    body = _glob_to_regex(line)
+    regex = f"^{body}$" if anchored else f"^(?:.*/)?{body}$"
+    return regex, negate, dir_only
+
+
+def default_patterns() -> list[str]:
+    """Встроенные правила приложения (раньше были разбросаны по модулям)"""
+    patterns = [f"{d}/" for d in sorted(config.IGNORED_DIRS)]
+    patterns += [
+        "__MACOSX/",
+        # временные файлы редакторов/ОС; не «*temp*» — он задевал Templates/,
+        # Contemporary.md и т.п. (deleted_temp/ — в IGNORED_DIRS)
+        "*.tmp",
+        "*.temp",
+        "~$*",
+        "*.lock",
+    ]
+    patterns += list(config.IGNORE_PATTERNS)
+    return patterns
+
+
+# ────────────────────────────────────────────────
+# Движок
+# ────────────────────────────────────────────────
+
+class IgnoreRules:
+    def __init__(
+        self,
+        patterns: Iterable[str],
+        extensions: Optional[Iterable[str]] = None,
+        ignorecase: bool = True,
+    ):
+        flags = re.IGNORECASE if ignorecase else 0
+        compiled = [p for p in (compile_pattern(line) for line in patterns) if p]
+
+        self.extensions = tuple(e.lower() for e in extensions) if extensions is not None else None
+        self._has_negation = any(neg for _, neg, _ in compiled)
+
+        if self._has_negation:
+            # порядок важен → проверяем по очереди, последний совпавший побеждает
+            self._ordered = [(re.compile(rx, flags), neg, dir_only) for rx, neg, dir_only in compiled]
+            self._any_re = self._dir_re = None
+        else:
+            self._ordered = []
+            any_rx = [rx for rx, _, dir_only in compiled if not dir_only]
+            dir_rx = [rx for rx, _, dir_only in compiled if dir_only]
+            self._any_re = re.compile('|'.join(f"(?:{rx})" for rx in any_rx), flags) if any_rx else None
+            self._dir_re = re.compile('|'.join(f"(?:{rx})" for rx in dir_rx), flags) if dir_rx else None
+
+        self._dir_cache: dict[str, bool] = {}
+
+    # ─── базовое сопоставление ───
+
+    def _match(self, rel: str, is_dir: bool) -> bool:
+        if not self._has_negation:
+            if self._any_re is not None and self._any_re.match(rel):
+                return True
+            return is_dir and self._dir_re is not None and self._dir_re.match(rel) is not None
+
+        ignored = False
+        for regex, negate, dir_only in self._ordered:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel):
+                ignored = not negate
+        return ignored
+
+    # ─── публичный API ───
+
+    def dir_ignored(self, rel_dir: str) -> bool:
+        """Игнорируется ли папка (с учётом родителей). Мемоизируется."""
+        cached = self._dir_cache.get(rel_dir)
+        if cached is not None:
+            return cached
+        parent = rel_dir.rpartition('/')[0]
+        result = (bool(parent) and self.dir_ignored(parent)) or self._match(rel_dir, True)
+        self._dir_cache[rel_dir] = result
+        return result
+
+    def path_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        if is_dir:
+            return self.dir_ignored(rel_path)
+        parent = rel_path.rpartition('/')[0]
+        if parent and self.dir_ignored(parent):
+            return True
+        return self._match(rel_path, False)
+
+    def extension_ok(self, rel_path: str) -> bool:
+        return self.extensions is None or rel_path.lower().endswith(self.extensions)
+
+    def include_file(self, rel_path: str) -> bool:
+        """Попадает ли файл в бэкап: расширение, «битый» путь, игнор-правила"""
+        if not self.extension_ok(rel_path):
+            return False
+        if is_malformed_path(rel_path):
+            return False
+        return not self.path_ignored(rel_path)
+
+    def walk(self, root: Path, include_all_files: bool = False) -> Iterator[tuple[str, os.DirEntry]]:
+        """
+        Обход os.scandir с отрезанием игнорируемых папок.
+        Отдаёт (rel_posix_path, DirEntry) для файлов, прошедших include_file
+        (или всех неигнорируемых файлов при include_all_files=True).
+        """
+        stack = [("", str(root))]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            try:
+                it = os.scandir(abs_dir)
+            except OSError as e:
+                log_soft(f"[IGNORE-WALK] Нет доступа к {abs_dir}: {e}")
+                continue
+            with it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.dir_ignored(rel):
+                                _report_pruned(rel)
+                            else:
+                                stack.append((rel, entry.path))
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if include_all_files:
+                        if not self.path_ignored(rel):
+                            yield rel, entry
+                    elif self.include_file(rel):
+                        yield rel, entry
+
+
+# ────────────────────────────────────────────────
+# Правила для наблюдаемой папки (синглтон)
+# ────────────────────────────────────────────────
+
+_rules: Optional[IgnoreRules] = None
+_rules_lock = threading.Lock()
+_reported_dirs: set[str] = set()    # папки, об отрезании которых уже написали в лог
+
+
+def _report_pruned(rel_dir: str) -> None:
+    """Пишет в лог об отрезанной при обходе папке — один раз за запуск"""
+    if rel_dir in _reported_dirs:
+        return
+    _reported_dirs.add(rel_dir)
+    if rel_dir.rpartition('/')[2] in config.IGNORED_DIRS:
+        log_soft(f"[IGNORE] Папка пропущена: {rel_dir}")
+    else:
+        log_main(f"[IGNORE] Папка пропущена правилами игнорирования: {rel_dir}")
+
+
+def _read_vault_gitignore(root: Path) -> list[str]:
+    path = root / ".gitignore"
+    try:
+        return path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        log_main(f"[IGNORE] Не удалось прочитать {path}: {e}")
+        return []
+
+
+def synced_extensions() -> tuple[str, ...]:
+    """Текстовые расширения + вложения (если включены)"""
+    if config.SYNC_ATTACHMENTS:
+        return config.SYNC_EXTENSIONS + config.ATTACHMENT_EXTENSIONS
+    return config.SYNC_EXTENSIONS
+
+
+def is_text_file(rel_path: str) -> bool:
+    """Текстовый файл (diff в описании) или вложение (бинарный blob)"""
+    return rel_path.lower().endswith(config.SYNC_EXTENSIONS)
+
+
+def build_rules(root: Optional[Path] = None) -> IgnoreRules:
+    root = Path(root or config.WATCHED_FOLDER)
+    patterns = default_patterns() + _read_vault_gitignore(root)
+    return IgnoreRules(patterns, extensions=synced_extensions())
+
+
+def get_rules() -> IgnoreRules:
+    global _rules
+    rules = _rules
+    if rules is not None:
+        return rules
+    with _rules_lock:
+        if _rules is None:
+            _rules = build_rules()
+        return _rules
+
+
+def reload_rules() -> IgnoreRules:
+    """Пересобрать правила (изменился .gitignore / config) — сбрасывает мемо папок"""
+    global _rules
+    with _rules_lock:
+        _rules = build_rules()
+        log_soft("[IGNORE] Правила игнорирования пересобраны")
+        return _rules
+
+
+def vault_rel(path: str, root: Optional[Path] = None) -> Optional[str]:
+    """Абсолютный путь события → rel posix-путь внутри папки (без Path-объектов)"""
+    root_str = str(root or config.WATCHED_FOLDER).rstrip("\\/")
+    if not path.startswith(root_str) or len(path) <= len(root_str) or path[len(root_str)] not in "\\/":
+        return None
+    rel = path[len(root_str) + 1:]
+    if os.sep != '/':
+        rel = rel.replace(os.sep, '/')
+    return rel
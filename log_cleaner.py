@@ -0,0 +1,259 @@
+"""
+log_cleaner.py
+
+Очистка logger.txt от шума push-комментариев → logger_clean.txt.
+
+✔ Потоково, строка за строкой (filters.should_skip_push_comment_line)
+✔ Обрабатываются только новые строки: смещение и идентичность файла (dev, inode)
+  хранятся в log_cleaner_state.json
+✔ Ротация логгера (logger.txt → logger.txt.1) не теряет строк: старый сегмент
+  дочитывается по сохранённому смещению, новый — с начала
+✔ Перезапись файла (os.replace или усечение на месте) не дублирует строк:
+  по последним TAIL_BYTES перед смещением место находится в новом файле
+✔ Незавершённая последняя строка ждёт следующего запуска
+✔ logger_clean.txt и состояние пишутся атомарно (tmp + os.replace);
+  чистый лог ограничен CLEAN_MAX_KB (хвост через seek)
+✔ Отдельный фоновый поток: schedule() не блокирует пуш, запросы склеиваются
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app_logger import log_main, log_soft
+from config import LOG_FILE, SCRIPT_DIR
+from filters import should_skip_push_comment_line
+from mem import read_tail
+
+
+CLEAN_LOG_FILE = SCRIPT_DIR / "logger_clean.txt"
+STATE_FILE = SCRIPT_DIR / "log_cleaner_state.json"
+CLEAN_MAX_KB = 1024          # сколько чистого лога хранить
+MAX_BYTES_PER_RUN = 16 * 1024 * 1024
+MAX_ROTATED_SEGMENTS = 10
+TAIL_BYTES = 256             # сколько байт перед смещением хранить для сверки
+SEARCH_CHUNK = 1024 * 1024
+
+
+def _identity(st: os.stat_result) -> Tuple[int, int]:
+    return st.st_dev, st.st_ino
+
+
+def _read_before(path: Path, offset: int) -> bytes:
+    """До TAIL_BYTES байт, предшествующих offset"""
+    start = max(0, offset - TAIL_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(offset - start)
+
+
+def _find_after(path: Path, tail: bytes) -> int:
+    """
+    Смещение сразу за первым вхождением tail в файл. Если начало файла
+    срезали внутри tail — за его уцелевшими целыми строками. 0 — не найден.
+    """
+    position = 0
+    carry = b""
+    with open(path, "rb") as f:
+        head = f.read(len(tail))
+        for start in range(1, len(tail)):
+            if tail[start - 1:start] == b"\n" and head.startswith(tail[start:]):
+                leftover = len(tail) - start
+                break
+        else:
+            leftover = 0
+        f.seek(0)
+        while True:
+            chunk = f.read(SEARCH_CHUNK)
+            if not chunk:
+                return leftover
+            data = carry + chunk
+            found = data.find(tail)
+            if found >= 0:
+                return position - len(carry) + found + len(tail)
+            carry = data[-(len(tail) - 1):] if len(tail) > 1 else b""
+            position += len(chunk)
+
+
+class LogCleaner:
+    def __init__(
+        self,
+        source: Path = LOG_FILE,
+        target: Path = CLEAN_LOG_FILE,
+        state_file: Path = STATE_FILE,
+    ):
+        self.source = Path(source)
+        self.target = Path(target)
+        self.state_file = Path(state_file)
+
+        self._wake = threading.Event()
+        self._lock = threading.Lock()          # один проход за раз
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # ─── состояние ───
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("source") == str(self.source):
+                return state
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log_main(f"[LOG-CLEAN] Состояние повреждено ({e}) — начинаем с начала файла")
+        return {"source": str(self.source), "offset": 0, "identity": None}
+
+    def _save_state(self, state: Dict) -> None:
+        tmp = self.state_file.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_file)
+
+    # ─── обработка ───
+
+    def _segments(self, state: Dict):
+        """[(путь, идентичность, смещение)] — что дочитать, с учётом ротации"""
+        try:
+            current = _identity(os.stat(self.source))
+        except FileNotFoundError:
+            return []
+        known = tuple(state["identity"]) if state.get("identity") else None
+        offset = state.get("offset", 0)
+        tail = bytes.fromhex(state.get("tail", ""))
+
+        if known == current:
+            if os.path.getsize(self.source) < offset or (
+                tail and _read_before(self.source, offset) != tail
+            ):
+                # файл переписан на месте: прочитанное ищем по хвосту
+                offset = _find_after(self.source, tail) if tail else 0
+                log_soft("[LOG-CLEAN] %s переписан на месте → продолжаем с %d", self.source.name, offset)
+            return [(self.source, current, offset)]
+
+        # между проходами логгер мог ротировать несколько раз: ищем прежний файл
+        # среди logger.txt.1..N и дочитываем его и все более новые сегменты
+        segments = []
+        if known is not None:
+            for i in range(1, MAX_ROTATED_SEGMENTS + 1):
+                rotated = Path(f"{self.source}.{i}")
+                try:
+                    rotated_id = _identity(os.stat(rotated))
+                except FileNotFoundError:
+                    break
+                if rotated_id == known:
+                    segments.append((rotated, known, offset))
+                    for j in range(i - 1, 0, -1):
+                        newer = Path(f"{self.source}.{j}")
+                        segments.append((newer, _identity(os.stat(newer)), 0))
+                    break
+        if not segments and tail:
+            # прежнего файла нет среди ротированных: logger.txt мог быть
+            # переписан через os.replace (новый inode, то же содержимое)
+            offset = _find_after(self.source, tail)
+            if offset:
+                log_soft("[LOG-CLEAN] %s переписан (новый inode) → продолжаем с %d", self.source.name, offset)
+            return [(self.source, current, offset)]
+        segments.append((self.source, current, 0))
+        return segments
+
+    def run_once(self) -> int:
+        """Один проход. Возвращает число отброшенных строк."""
+        with self._lock:
+            state = self._load_state()
+            segments = self._segments(state)
+            if not segments:
+                return 0
+
+            budget = MAX_BYTES_PER_RUN
+            kept = dropped = 0
+            # идентичность и смещение меняются только вместе — после сегмента,
+            # который действительно читали (иначе смещение старого сегмента
+            # досталось бы следующему)
+            path, identity, new_offset = segments[0]
+            tmp = self.target.with_suffix(".tmp")
+
+            with open(tmp, "wb") as out:
+                if self.target.exists():
+                    out.write(read_tail(self.target, CLEAN_MAX_KB * 1024))
+
+                for segment_path, segment_identity, offset in segments:
+                    if budget <= 0:
+                        break  # остаток старого сегмента — в следующий проход
+                    with open(segment_path, "rb") as src:
+                        src.seek(offset)
+                        position = offset
+                        for raw in src:
+                            if not raw.endswith(b"\n") or budget <= 0:
+                                break  # недописанная строка или лимит прохода
+                            position += len(raw)
+                            budget -= len(raw)
+                            line = raw.decode("utf-8", "replace")
+                            if should_skip_push_comment_line(line):
+                                dropped += 1
+                                continue
+                            out.write(raw)
+                            kept += 1
+                    path, identity, new_offset = segment_path, segment_identity, position
+
+            os.replace(tmp, self.target)
+            # смещение — в последнем обработанном сегменте; хвост перед ним —
+            # чтобы узнать то же место, если файл перепишут
+            self._save_state({
+                "source": str(self.source),
+                "offset": new_offset,
+                "identity": list(identity),
+                "tail": _read_before(path, new_offset).hex(),
+            })
+
+        if kept or dropped:
+            log_soft("[LOG-CLEAN] Строк: %d оставлено, %d отброшено (push-комментарии)", kept, dropped)
+        if budget <= 0:
+            self.schedule()  # остаток — следующим проходом
+        return dropped
+
+    # ─── фоновый поток ───
+
+    def schedule(self) -> None:
+        """Запросить проход. Не блокирует; несколько запросов подряд — один проход."""
+        with self._thread_lock:
+            self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-cleaner", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=30)
+            with self._thread_lock:
+                if not self._wake.is_set():
+                    self._thread = None  # простой — поток завершается
+                    return
+                self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                log_main(f"[LOG-CLEAN] Ошибка: {type(e).__name__}: {e}")
+
+
+_cleaner: Optional[LogCleaner] = None
+_cleaner_lock = threading.Lock()
+
+
+def get_log_cleaner() -> LogCleaner:
+    global _cleaner
+    with _cleaner_lock:
+        if _cleaner is None:
+            _cleaner = LogCleaner()
+        return _cleaner
+
+
+def schedule_log_clean() -> None:
+    get_log_cleaner().schedule()
+
+
+if __name__ == "__main__":
+    print(f"Отброшено строк: {get_log_cleaner().run_once()}")
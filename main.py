@@ -7,6 +7,7 @@ Git Autosync & Version Restore — основной скрипт приложе
 ✔ Автоочистка логов через mem.py при каждом запуске
 """
 
+import multiprocessing
 import sys
 import threading
 import time
@@ -14,25 +15,10 @@ import traceback
 import tkinter as tk
 from pathlib import Path
 
-# Подготовка структуры файлов и папок (самое первое действие)
-import require_utils
-
-import config
-from app_logger import init_logger, log_both, log_main
-from gui_watcher import start_watcher, stop_watcher, initial_check_loop
-from observer_manager import stop_observer
-from gui_func_adds import show_duplicate_warning
-
-
-# Single-instance защита
-from defense import SingleInstance
-
-# GUI импорт
-try:
-    from gui import GitVersionRestoreApp
-except ImportError as e:
-    print(f"[GUI] GUI модуль не найден: {e}")
-    GitVersionRestoreApp = None
+# Модули проекта импортируются внутри main(), а не здесь: на Windows процессы
+# пула CommitAnalyzer (spawn) заново импортируют этот файл как __mp_main__,
+# и побочные эффекты импорта (require_utils, config, логгер, watcher, outbox)
+# не должны повторяться в каждом из них.
 
 
 # ==============================
@@ -93,9 +79,14 @@ def ensure_env_file():
 
 def start_observation():
     """Фоновый запуск watcher и периодических проверок"""
+    from app_logger import log_main
+    from gui_watcher import start_watcher, initial_check_loop
+    from comment_outbox import start_outbox
+
     log_main("[observation] Запуск фоновых процессов...")
 
     start_watcher()
+    start_outbox()
     threading.Thread(target=initial_check_loop, daemon=True).start()
 
     log_main("[observation] Фоновые процессы запущены")
@@ -106,7 +97,25 @@ def start_observation():
 # ==============================
 
 def main():
-    # 1. Подготовка структуры уже выполнена через import require_util
+    # 1. Подготовка структуры файлов и папок (самое первое действие)
+    import require_utils
+
+    import config
+    from app_logger import init_logger, log_both, log_main
+    from gui_watcher import stop_watcher
+    from observer_manager import stop_observer
+    from gui_func_adds import show_duplicate_warning
+    from comment_outbox import stop_outbox
+
+    # Single-instance защита
+    from defense import SingleInstance
+
+    # GUI импорт
+    try:
+        from gui import GitVersionRestoreApp
+    except ImportError as e:
+        print(f"[GUI] GUI модуль не найден: {e}")
+        GitVersionRestoreApp = None
 
     # 2. Создаём/дополняем .env
     ensure_env_file()
@@ -176,6 +185,7 @@ def main():
 
         stop_watcher()
         stop_observer()
+        stop_outbox()
 
         log_both("===== ПРИЛОЖЕНИЕ ЗАВЕРШЕНО =====")
 
@@ -185,4 +195,5 @@ def main():
 # ==============================
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # сборка в exe + пул процессов
     main()
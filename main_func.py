@@ -18,6 +18,9 @@ import pygit2
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+from ignore_rules import get_rules, vault_rel
+from fast_copy import fast_copy, is_current
+
 
 # ────────────────────────────────────────────────
 # Импорты констант из config
@@ -27,7 +30,6 @@ from config import (
     FAKE_PUSH_GIT,
     DELETED_TEMP,
     DEBOUNCE_SECONDS,
-    IGNORED_DIRS,
     PUSH_COMMENTS_DIR
 )
 
@@ -190,26 +192,17 @@ def sync_files_to_fake(target_dir: Path | None = None):
     errors = 0  # Добавлено отслеживание ошибок
 
     try:
-        for src in WATCHED_FOLDER.rglob("*"):
+        rules = get_rules()
+        for rel_posix, entry in rules.walk(WATCHED_FOLDER, include_all_files=True):
             total += 1
-            if src.is_dir():
-                skipped += 1
-                continue
-            if any(p in IGNORED_DIRS for p in src.parts):
-                log_soft(f"[SKIP] Игнор по IGNORED_DIRS: {src}")
-                skipped += 1
-                continue
-            rel = src.relative_to(WATCHED_FOLDER)
+            src = Path(entry.path)
+            rel = Path(rel_posix)
             dst = target_dir / rel
-            if '.git' in rel.parts or 'deleted_temp' in rel.parts:
-                log_soft(f"[SKIP] .git или deleted_temp: {rel}")
-                skipped += 1
-                continue
 
             dst.parent.mkdir(parents=True, exist_ok=True)
-            if not dst.exists() or src.stat().st_mtime > dst.stat().st_mtime:
+            if not is_current(src, dst):
                 try:
-                    shutil.copy2(src, dst)
+                    fast_copy(src, dst)
                     copied += 1
                     log_both(f"[COPY] {rel}")
                 except Exception as e:
@@ -222,12 +215,9 @@ def sync_files_to_fake(target_dir: Path | None = None):
         log_both(f"[DEBUG-SYNC] ИТОГО: файлов просмотрено {total}, скопировано {copied}, пропущено {skipped}, ошибок {errors}")
 
         deleted_count = 0
-        for dst in target_dir.rglob("*"):
-            if dst.is_dir() or any(p in config.IGNORED_DIRS for p in dst.parts):
-                continue
-            rel = dst.relative_to(target_dir)
-            if '.git' in rel.parts or 'deleted_temp' in rel.parts:
-                continue
+        for rel_posix, entry in rules.walk(target_dir, include_all_files=True):
+            dst = Path(entry.path)
+            rel = Path(rel_posix)
             src = config.WATCHED_FOLDER / rel
             if not src.exists():
                 temp_dst = config.DELETED_TEMP / rel
@@ -332,7 +322,8 @@ def schedule_push():
 class ChangeHandler(FileSystemEventHandler):
     """Обработчик событий файловой системы"""
     def _ignore(self, path: str) -> bool:
-        return any(p in config.IGNORED_DIRS for p in Path(path).parts)
+        rel = vault_rel(path)
+        return rel is None or get_rules().path_ignored(rel)
 
     def on_any_event(self, event):
         if not self._ignore(event.src_path):
@@ -5,28 +5,43 @@ make_description.py
 Показывает ТОЛЬКО файлы с реальными строковыми изменениями.
 """
 
+import multiprocessing
 import sys
 import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 import requests
 import base64
-import difflib
 import os
 
 from app_logger import log_both, log_soft, log_main, init_logger
 
-from config import GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN
+from config import (
+    GITHUB_USERNAME,
+    GITHUB_REPO,
+    GITHUB_TOKEN,
+    DESCRIPTION_POOL_THRESHOLD,
+    DESCRIPTION_POOL_WORKERS,
+    SYNC_EXTENSIONS,
+)
+
+from ignore_rules import is_text_file
+from blob_store import STREAM_UPLOAD_THRESHOLD
+from rate_governor import governor, rate_limit_delay
+from diff_worker import run_diff_job, DiffJob
 
 # Константы
-SUPPORTED_EXTENSIONS = (".md", ".json")
+SUPPORTED_EXTENSIONS = SYNC_EXTENSIONS
 MAX_BLOCK_LENGTH = 1300
-MAX_LINE_LENGTH = 200
-MAX_LINES_PER_FILE = 10
+MAX_ATTACHMENTS_LISTED = 20
 
 
 def github_api_get_file_content(rel_path: str) -> Optional[str]:
-    """Получает содержимое файла из GitHub API"""
+    """
+    Содержимое файла remote через /contents. Один вызов governor'а:
+    повторы при сетевых ошибках, 5xx и лимитах — уже внутри него.
+    """
     log_soft(f"[API-FILE] Запрос {rel_path}")
 
     headers = {
@@ -35,28 +50,29 @@ def github_api_get_file_content(rel_path: str) -> Optional[str]:
     }
     url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/contents/{rel_path}"
 
-    for attempt in range(1, 4):
-        try:
-            r = requests.get(url, headers=headers, timeout=100)
-            if r.status_code == 404:
-                return None
-            r.raise_for_status()
-            data = r.json()
-            if data.get('encoding') == 'base64':
-                return base64.b64decode(data['content']).decode('utf-8', errors='replace')
+    try:
+        r = governor.request("GET", url, content=False, headers=headers, timeout=100)
+        if r.status_code == 404:
+            log_soft(f"[API-FILE] Файл не найден на remote: {rel_path}")
             return None
-        except Exception as e:
-            log_main(f"[API-FILE] Ошибка (попытка {attempt}): {e}")
-            if attempt < 3:
-                time.sleep(1.3)
-
-    return None
-
+        r.raise_for_status()
+        data = r.json()
+        if data.get('encoding') == 'base64':
+            return base64.b64decode(data['content']).decode('utf-8', errors='replace')
+        log_main(f"[API-FILE] Неизвестный формат кодировки для {rel_path}")
+        return None
+    except Exception as e:
+        log_main(f"[API-FILE] Не удалось получить {rel_path}: {e}")
+        return None
 
 
 def read_local_file(file_path: Path) -> Optional[str]:
-    """Читает локальный файл"""
-    if not file_path.exists():
+    """Читает локальный файл; None — нет файла или он не меньше STREAM_UPLOAD_THRESHOLD"""
+    try:
+        if file_path.stat().st_size >= STREAM_UPLOAD_THRESHOLD:
+            log_soft("[LOCAL-FILE] Большой файл — без diff: %s", file_path)
+            return None
+    except OSError:
         return None
     try:
         return file_path.read_text(encoding='utf-8', errors='replace')
@@ -65,88 +81,138 @@ def read_local_file(file_path: Path) -> Optional[str]:
         return None
 
 
-def generate_diff(old_content: Optional[str], new_content: Optional[str], rel_path: str,
-                  is_added: bool = False, is_deleted: bool = False) -> List[str]:
-    """Генерирует diff-строки. Возвращает ТОЛЬКО значимые + и - строки"""
-    if is_added and new_content:
-        lines = new_content.splitlines()
-        diff_lines = [f"* {line[:MAX_LINE_LENGTH]}" for line in lines if line.strip()]
-    elif is_deleted and old_content:
-        lines = old_content.splitlines()
-        diff_lines = [f"- {line[:MAX_LINE_LENGTH]}" for line in lines if line.strip()]
-    else:
-        # modified
-        old_lines = old_content.splitlines() if old_content else []
-        new_lines = new_content.splitlines() if new_content else []
-        diff = difflib.unified_diff(old_lines, new_lines, n=0)
-        diff_lines = []
-        for line in diff:
-            if line.startswith('+') and not line.startswith('+++'):
-                cleaned = line[1:].strip()
-                if cleaned:
-                    diff_lines.append(f"* {cleaned[:MAX_LINE_LENGTH]}")
-            elif line.startswith('-') and not line.startswith('---'):
-                cleaned = line[1:].strip()
-                if cleaned:
-                    diff_lines.append(f"- {cleaned[:MAX_LINE_LENGTH]}")
-
-    # Ограничение количества строк
-    if len(diff_lines) > MAX_LINES_PER_FILE:
-        diff_lines = diff_lines[:MAX_LINES_PER_FILE // 2] + ['... (ещё строки опущены)'] + diff_lines[-MAX_LINES_PER_FILE // 2:]
-
-    return diff_lines
-
-
 class CommitAnalyzer:
-    def __init__(self):
+    def __init__(
+        self,
+        pool_threshold: int = DESCRIPTION_POOL_THRESHOLD,
+        pool_workers: int = DESCRIPTION_POOL_WORKERS,
+    ):
         init_logger()
+        self.pool_threshold = pool_threshold
+        self.pool_workers = pool_workers or (os.cpu_count() or 1)
         log_both("CommitAnalyzer инициализирован")
+
+    def _run_diff_jobs(self, jobs: List[DiffJob]) -> List[Tuple[str, str, List[str]]]:
+        """
+        Считает diff для всех задач.
+        Маленькие пуши — inline (без затрат на запуск пула),
+        большие — в ProcessPoolExecutor. Порядок результатов = порядок задач.
+        """
+        if len(jobs) < self.pool_threshold or self.pool_workers < 2:
+            return [run_diff_job(job) for job in jobs]
+
+        workers = min(self.pool_workers, len(jobs))
+        chunksize = max(1, len(jobs) // (workers * 4))
+        log_both(f"[GENERATE] {len(jobs)} файлов → пул из {workers} процессов (chunksize={chunksize})")
+
+        try:
+            # spawn, не fork: в процессе работают потоки watchdog, логгера, outbox и Tk —
+            # fork мог бы унести в ребёнка захваченную ими блокировку
+            spawn = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=spawn) as pool:
+                return list(pool.map(run_diff_job, jobs, chunksize=chunksize))
+        except Exception as e:
+            log_main(f"[GENERATE] Пул процессов недоступен ({type(e).__name__}: {e}) → inline")
+            return [run_diff_job(job) for job in jobs]
+
+    @staticmethod
+    def _attachments_section(added: List[str], modified: List[str], deleted: List[str]) -> List[str]:
+        """Вложения (картинки, PDF, аудио) — без diff, только пути"""
+        if not (added or modified or deleted):
+            return []
+        section = ["=== Вложения ===", ""]
+        for status, paths in (("Добавлено", added), ("Изменено", modified), ("Удалено", deleted)):
+            if not paths:
+                continue
+            section.append(f"{status}: {len(paths)}")
+            section.extend(f"  {rel}" for rel in paths[:MAX_ATTACHMENTS_LISTED])
+            if len(paths) > MAX_ATTACHMENTS_LISTED:
+                section.append(f"  ... (ещё {len(paths) - MAX_ATTACHMENTS_LISTED})")
+        section.append("")
+        return section
+
+    @staticmethod
+    def _renamed_section(renamed: List[Tuple[str, str]]) -> List[str]:
+        section = ["=== Перемещённые файлы ===", ""]
+        for old, new in renamed:
+            section.append(f"{old} → {new}")
+        section.append("")
+        return section
+
     def generate_commit_description(
             self,
             commit_sha: str,
             repo_path: Path,
             added: List[str],
             modified: List[str],
-            deleted: List[str]
+            deleted: List[str],
+            renamed: Optional[List[Tuple[str, str]]] = None,
+            read_new: Optional[Callable[[str], Optional[str]]] = None,
+            read_deleted: Optional[Callable[[str], Optional[str]]] = None
     ) -> str:
-        """Генерирует ТОЛЬКО осмысленный комментарий с реальными изменениями"""
+        """
+        Генерирует ТОЛЬКО осмысленный комментарий с реальными изменениями.
+        read_new / read_deleted — источники содержимого по rel-пути
+        (по умолчанию: файл в repo_path и в repo_path/deleted_files).
+        """
         log_both(f"[GENERATE] Генерация описания для {commit_sha[:10]}...")
 
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         lines = [f"PUSH - [{timestamp}]"]
 
-        # Собираем ВСЕ файлы с реальными diff
-        meaningful_added = []
-        meaningful_modified = []
-        meaningful_deleted = []
+        # Вложения не читаются вовсе: текстовый diff для бинарных файлов бессмыслен
+        attachments = self._attachments_section(
+            [rel for rel in added if not is_text_file(rel)],
+            [rel for rel in modified if not is_text_file(rel)],
+            [rel for rel in deleted if not is_text_file(rel)],
+        )
+        added = [rel for rel in added if is_text_file(rel)]
+        modified = [rel for rel in modified if is_text_file(rel)]
+        deleted = [rel for rel in deleted if is_text_file(rel)]
+
+        # ─── Сбор содержимого (I/O остаётся в текущем потоке) ─────
+        jobs: List[DiffJob] = []
+
+        deleted_root = repo_path / "deleted_files"
+        if read_new is None:
+            read_new = lambda rel: read_local_file(repo_path / rel)
+        if read_deleted is None:
+            # do_push кладёт удалённые файлы в deleted_files/ плоскими именами
+            read_deleted = lambda rel: read_local_file(deleted_root / rel.replace('/', '_').replace('\\', '_'))
 
-        # ─── Обработка added ───────────────────────────────────────
         for rel in added:
-            new_content = read_local_file(repo_path / rel)
+            new_content = read_new(rel)
             if not new_content:
                 continue
-            diff_lines = generate_diff(None, new_content, rel, is_added=True)
-            if diff_lines:  # только если есть непустые строки
-                meaningful_added.append((rel, diff_lines))
+            jobs.append((rel, None, new_content, "added"))
 
-        # ─── Обработка modified ────────────────────────────────────
         for rel in modified:
-            new_content = read_local_file(repo_path / rel)
+            new_content = read_new(rel)
+            if new_content is None:
+                # не прочитан (большой файл) — не «удалён целиком», и прежняя версия не нужна
+                continue
             old_content = github_api_get_file_content(rel)
-            diff_lines = generate_diff(old_content, new_content, rel)
-            if diff_lines:
-                meaningful_modified.append((rel, diff_lines))
+            jobs.append((rel, old_content, new_content, "modified"))
 
-        # ─── Обработка deleted ─────────────────────────────────────
-        deleted_root = repo_path / "deleted_files"
         for rel in deleted:
-            deleted_path = deleted_root / rel.replace("/", os.sep)
-            old_content = read_local_file(deleted_path)
+            old_content = read_deleted(rel)
             if not old_content:
                 continue
-            diff_lines = generate_diff(old_content, None, rel, is_deleted=True)
-            if diff_lines:
-                meaningful_deleted.append((rel, diff_lines))
+            jobs.append((rel, old_content, None, "deleted"))
+
+        # ─── Построение diff (CPU) — inline или в пуле процессов ──
+        meaningful_added = []
+        meaningful_modified = []
+        meaningful_deleted = []
+
+        buckets = {
+            "added": meaningful_added,
+            "modified": meaningful_modified,
+            "deleted": meaningful_deleted,
+        }
+        for rel, kind, diff_lines in self._run_diff_jobs(jobs):
+            if diff_lines:  # только если есть непустые строки
+                buckets[kind].append((rel, diff_lines))
 
         # Подсчёт реальных изменений
         real_added = len(meaningful_added)
@@ -155,9 +221,21 @@ class CommitAnalyzer:
         total_real = real_added + real_modified + real_deleted
 
         total_files_scanned = len(added) + len(modified) + len(deleted)
+        renamed = renamed or []
 
         lines.append(f"Всего реальных изменений: {total_real} (из {total_files_scanned} файлов)")
 
+        if renamed:
+            lines.append(f"Перемещено/переименовано: {len(renamed)}")
+
+        if total_real == 0 and (renamed or attachments):
+            lines.append("")
+            lines.extend(attachments)
+            if renamed:
+                lines.extend(self._renamed_section(renamed))
+            lines.append("END")
+            return "\n".join(lines)
+
         if total_real == 0:
             lines.append("")
             lines.append("Нет файлов с реальными строковыми изменениями.")
@@ -199,6 +277,11 @@ class CommitAnalyzer:
                 lines.append("────────────────────────────────────────────────────────────")
                 lines.append("")
 
+        lines.extend(attachments)
+
+        if renamed:
+            lines.extend(self._renamed_section(renamed))
+
         if total_files_scanned > total_real:
             lines.append("=== Файлы без значимых изменений ===")
             lines.append(f"(остальные {total_files_scanned - total_real} файлов либо пустые, либо ложные срабатывания)")
@@ -213,34 +296,42 @@ class CommitAnalyzer:
 
 class GitHubCommenter:
     @staticmethod
-    def post_to_commit(commit_sha: str, comment_text: str) -> bool:
-        if not comment_text.strip():
-            log_main("[COMMENTER] Пустой комментарий — пропуск")
-            return False
-
+    def post_once(commit_sha: str, comment_text: str) -> Tuple[str, float]:
+        """
+        Одна попытка отправки комментария (без sleep'ов — ими управляет outbox).
+        Возвращает (статус, задержка): "ok" / "rate_limited" / "retry" / "fatal".
+        retry — только сеть, 5xx, 408 и 429; прочие 4xx сразу fatal.
+        """
         url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/commits/{commit_sha}/comments"
         headers = {
             "Authorization": f"token {GITHUB_TOKEN}",
             "Accept": "application/vnd.github.v3+json"
         }
-        data = {"body": comment_text}
-
-        log_both(f"[COMMENTER] Отправка к {commit_sha[:12]}...")
-
-        for attempt in range(1, 6):
-            try:
-                resp = requests.post(url, headers=headers, json=data, timeout=30)
-                if resp.status_code == 201:
-                    log_both(f"[COMMENTER] Успех! Комментарий добавлен")
-                    return True
-                else:
-                    log_main(f"[COMMENTER] Ошибка {resp.status_code}: {resp.text[:200]}")
-            except Exception as e:
-                log_main(f"[COMMENTER] Ошибка (попытка {attempt}): {e}")
-            time.sleep(4)
-
-        log_main("[COMMENTER] Не удалось отправить комментарий")
-        return False
+
+        try:
+            # одна попытка: повторами и паузами outbox управляет сам
+            resp = governor.call(
+                lambda: requests.post(url, headers=headers, json={"body": comment_text}, timeout=30),
+                attempts=1
+            )
+        except Exception as e:
+            log_main(f"[COMMENTER] Сетевая ошибка для {commit_sha[:12]}: {e}")
+            return "retry", 0.0
+
+        if resp.status_code == 201:
+            log_both(f"[COMMENTER] Успех! Комментарий добавлен к {commit_sha[:12]}")
+            return "ok", 0.0
+
+        delay = rate_limit_delay(resp)
+        if delay is not None:
+            log_main(f"[COMMENTER] Rate limit ({resp.status_code}) → пауза {delay:.0f} сек")
+            return "rate_limited", delay
+
+        log_main(f"[COMMENTER] Ошибка {resp.status_code}: {resp.text[:200]}")
+        if resp.status_code >= 500 or resp.status_code in (408, 429):
+            return "retry", 0.0  # временные: сбой GitHub, таймаут, лимит без заголовков
+        # 401/403/404/422…: нет коммита, нет прав — повтор не поможет
+        return "fatal", 0.0
 
 
 if __name__ == "__main__":
@@ -1,10 +1,16 @@
 """
 mem.py — Контроль размера лог-файлов
 
-✔ Следит за logger.txt / logger_clean.txt / loggerm.txt
+✔ Следит за logger_clean.txt (вывод log_cleaner)
 ✔ Если файл > 600 KB → удаляет старые строки сверху
 ✔ Оставляет примерно 400 KB
+✔ Хвост читается через seek от конца — цена не зависит от размера файла
 ✔ Безопасная перезапись через временный файл
+
+logger.txt / loggerm.txt / syslog.txt здесь не трогаются: их ротирует сам
+логгер (LOG_SEGMENT_KB / LOG_SEGMENTS). Перезапись через os.replace дала бы
+файлу новый inode — log_cleaner принял бы его за новый сегмент и прочитал
+заново с начала.
 """
 
 import os
@@ -19,9 +25,7 @@ MAX_SIZE_KB = 600   # если файл больше → чистим
 TARGET_SIZE_KB = 400  # после чистки оставляем примерно столько
 
 LOG_FILES = [
-    "logger.txt",
     "logger_clean.txt",
-    "loggerm.txt",
 ]
 
 
@@ -29,6 +33,21 @@ LOG_FILES = [
 # Основная функция очистки
 # ============================
 
+def read_tail(path: Path, max_bytes: int) -> bytes:
+    """Последние ~max_bytes файла, начиная с целой строки"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size <= max_bytes:
+            f.seek(0)
+            return f.read()
+        f.seek(size - max_bytes)
+        tail = f.read()
+    # первая строка почти наверняка обрезана посередине
+    newline = tail.find(b"\n")
+    return tail[newline + 1:] if newline >= 0 else b""
+
+
 def trim_log_file(path: Path):
     """
     Обрезает лог сверху, если он слишком большой.
@@ -48,36 +67,13 @@ def trim_log_file(path: Path):
     print(f"[TRIM] {path.name}: {int(size_kb)} KB → чистим...")
 
     try:
-        # Читаем все строки
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-
-        # Если файл пустой
-        if not lines:
-            return
-
-        # Будем оставлять строки с конца
-        kept_lines = []
-        current_size = 0
-
-        # Идём снизу вверх
-        for line in reversed(lines):
-            line_size = len(line.encode("utf-8"))
-
-            if current_size + line_size > TARGET_SIZE_KB * 1024:
-                break
-
-            kept_lines.append(line)
-            current_size += line_size
-
-        # Возвращаем нормальный порядок строк
-        kept_lines.reverse()
+        tail = read_tail(path, TARGET_SIZE_KB * 1024)
 
         # Запись через временный файл
         temp_path = path.with_suffix(".tmp")
 
-        with open(temp_path, "w", encoding="utf-8") as f:
-            f.writelines(kept_lines)
+        with open(temp_path, "wb") as f:
+            f.write(tail)
 
         # Заменяем оригинал
         os.replace(temp_path, path)
@@ -0,0 +1,136 @@
+"""
+pack_transport.py
+
+Пуш через git smart-HTTP (pygit2) вместо REST API — для больших пушей.
+
+REST API: один POST /git/blobs на каждый новый файл, и каждый — content-запрос
+под вторичными лимитами. git push отправляет все новые объекты одним pack-файлом
+и в бюджет REST API не входит.
+
+✔ Локальный репозиторий — тот же fake_git_temp/.git (объектная база и remote origin)
+✔ fetch main перед коммитом — только вершина (depth=1), не вся история
+  автосинков: родитель и blob'ы текущего дерева берутся из локальной базы,
+  push отправляет только недостающие объекты; ход fetch — в soft-лог
+✔ Tree строится из того же списка (путь, SHA), что и tree через API, —
+  результат одинаковый, SHA корневого tree совпадает
+✔ Рабочая копия и ветка main в fake_git_temp не трогаются (отдельная ссылка)
+✔ Force-update main — как и движок REST API
+"""
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import pygit2
+
+from app_logger import log_main, log_both, log_soft
+from config import GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN
+
+
+PACK_REF = "refs/heads/autosync-pack"
+REMOTE_MAIN = "refs/remotes/origin/main"
+FETCH_DEPTH = 1     # нужен только HEAD remote и его дерево
+
+
+class _Callbacks(pygit2.RemoteCallbacks):
+    def __init__(self):
+        super().__init__(credentials=pygit2.UserPass(GITHUB_USERNAME, GITHUB_TOKEN))
+        self.rejected: Optional[str] = None
+        self._reported_pct = -1
+
+    def transfer_progress(self, stats):
+        total = stats.total_objects
+        if not total:
+            return
+        pct = stats.received_objects * 100 // total
+        if pct // 10 > self._reported_pct // 10:
+            self._reported_pct = pct
+            log_soft(f"[PACK] fetch: {stats.received_objects}/{total} объектов, "
+                     f"{stats.received_bytes // 1024} KB")
+
+    def push_update_reference(self, refname, message):
+        if message:
+            self.rejected = f"{refname}: {message}"
+
+
+def _open_repo(repo_path: Path) -> pygit2.Repository:
+    if (Path(repo_path) / ".git").exists():
+        repo = pygit2.Repository(str(repo_path))
+    else:
+        repo = pygit2.init_repository(str(repo_path), bare=False)
+        log_soft(f"[PACK] Репозиторий создан: {repo_path}")
+
+    url = f"https://github.com/{GITHUB_USERNAME}/{GITHUB_REPO}.git"
+    try:
+        origin = repo.remotes["origin"]
+        if origin.url != url:
+            repo.remotes.set_url("origin", url)
+    except KeyError:
+        repo.remotes.create("origin", url)
+        log_soft("[PACK] origin создан")
+    return repo
+
+
+def _blob_for(repo: pygit2.Repository, rel: str, known_sha: Optional[str], roots: Iterable[Path]) -> pygit2.Oid:
+    """Blob уже в локальной базе (после fetch) — берём его, иначе пишем файл с диска"""
+    if known_sha is not None and known_sha in repo:
+        return pygit2.Oid(hex=known_sha)
+    for root in roots:
+        path = Path(root) / rel
+        if path.is_file():
+            return repo.create_blob_fromdisk(str(path))
+    raise FileNotFoundError(rel)
+
+
+def push_via_pack(
+    repo_path: Path,
+    files: List[Tuple[str, Optional[str]]],
+    roots: List[Path],
+    message: str,
+) -> Optional[Tuple[str, str]]:
+    """
+    files — [(путь в tree, известный SHA или None)], roots — где искать файлы.
+    Возвращает (SHA коммита, SHA tree) или None, если pack-транспорт не сработал.
+    """
+    log_both(f"[PACK] git push: {len(files)} файлов через pack")
+    try:
+        repo = _open_repo(repo_path)
+        origin = repo.remotes["origin"]
+
+        callbacks = _Callbacks()
+        origin.fetch([f"+refs/heads/main:{REMOTE_MAIN}"], callbacks=callbacks, depth=FETCH_DEPTH)
+        try:
+            parents = [repo.references[REMOTE_MAIN].target]
+        except KeyError:
+            parents = []  # пустой репозиторий на GitHub
+
+        index = pygit2.Index()
+        written = 0
+        for rel, known_sha in files:
+            try:
+                oid = _blob_for(repo, rel, known_sha, roots)
+            except FileNotFoundError:
+                # файл исчез после сканирования — как и в tree через API, просто не попадает
+                log_soft(f"[PACK-SKIP] Нет на диске: {rel}")
+                continue
+            if known_sha is None or str(oid) != known_sha:
+                written += 1
+            index.add(pygit2.IndexEntry(rel, oid, pygit2.GIT_FILEMODE_BLOB))
+
+        tree_oid = index.write_tree(repo)
+        author = pygit2.Signature("AutoSync", "autosync@example.com")
+        commit_oid = repo.create_commit(None, author, author, message, tree_oid, parents)
+        repo.references.create(PACK_REF, commit_oid, force=True)
+
+        callbacks = _Callbacks()
+        origin.push([f"+{PACK_REF}:refs/heads/main"], callbacks=callbacks)
+        if callbacks.rejected:
+            log_main(f"[PACK] push отклонён: {callbacks.rejected}")
+            return None
+
+        repo.references.create(REMOTE_MAIN, commit_oid, force=True)
+        log_both(f"[PACK] Готово: коммит {str(commit_oid)[:10]}, tree {str(tree_oid)[:10]}, "
+                 f"записано локально blob'ов: {written}")
+        return str(commit_oid), str(tree_oid)
+    except Exception as e:
+        log_main(f"[PACK] Ошибка pack-транспорта: {type(e).__name__}: {e}")
+        return None
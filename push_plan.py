@@ -0,0 +1,215 @@
+"""
+push_plan.py
+
+План пуша без пуша: во что обойдётся текущее состояние хранилища.
+
+    python push_plan.py             # по кэшу remote (без сети, если кэш есть)
+    python push_plan.py --online    # сверить HEAD с GitHub (только GET-запросы)
+    python push_plan.py --json
+    python do_push.py --plan        # то же самое
+
+Проходит те же стадии, что и do_push: обход и отпечатки, сравнение корневого
+tree SHA, классификация по манифесту remote, — и печатает:
+  ✔ added / modified / unchanged / deleted / renamed
+  ✔ сколько blob'ов придётся загрузить и сколько это байт
+  ✔ оценку запросов для каждого транспорта (REST API и pack) и ожидание лимитов
+  ✔ какие кэши сработали: отпечатки, commit → tree, манифест remote, blob registry
+Ничего не загружает, не копирует в staging, не перезаписывает кэш отпечатков
+и не забирает подсказки перемещений watchdog.
+"""
+
+import json
+import sys
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional
+
+from app_logger import log_both
+from config import PUSH_ENGINE, WATCHED_FOLDER
+from blob_store import registry as blob_registry, STREAM_UPLOAD_THRESHOLD
+from ignore_rules import is_text_file, reload_rules
+from rate_governor import governor, PUSH_OVERHEAD_REQUESTS
+from vault_manifest import Manifest, FingerprintCache, scan_vault, remote_cache, keep_excluded
+from do_push import (
+    github_api_get_current_head,
+    github_api_get_commit_tree,
+    github_api_get_remote_manifest,
+    collect_changes,
+    deleted_blob_entries,
+    remote_text_readable,
+    tree_file_list,
+    pending_uploads,
+)
+
+
+@dataclass
+class PushReport:
+    engine: str
+    source: str                         # "cache" | "online" | "none"
+    head: Optional[str] = None
+    local_tree: str = ""
+    remote_tree: Optional[str] = None
+    noop: bool = False
+
+    files: int = 0
+    added: int = 0
+    modified: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    renamed: int = 0
+
+    uploads: int = 0
+    upload_bytes: int = 0
+    reused_blobs: int = 0
+
+    # запросы: {транспорт: {"read": GET, "content": content-запросы, "git": fetch/push}}
+    requests: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    transport: str = "api"
+    transport_reason: str = ""
+    eta_seconds: float = 0.0
+
+    # кэши: {слой: "hit"/"miss" или "N из M"}
+    caches: Dict[str, str] = field(default_factory=dict)
+
+
+def _resolve_remote(online: bool, report: PushReport):
+    """Манифест remote (или None) — из кэша, либо GET-запросами при online"""
+    if online:
+        report.head = github_api_get_current_head()
+        if report.head:
+            hits = remote_cache.hits
+            report.remote_tree = github_api_get_commit_tree(report.head)
+            report.caches["commit → tree"] = "hit" if remote_cache.hits > hits else "miss"
+        report.source = "online"
+    else:
+        last = remote_cache.last_commit()
+        if last is not None:
+            report.head, report.remote_tree = last
+            report.caches["commit → tree"] = "hit"
+        report.source = "cache" if last is not None else "none"
+
+    if not report.remote_tree:
+        return None
+
+    hits = remote_cache.hits
+    cached = remote_cache.manifest_for_tree(report.remote_tree)
+    report.caches["манифест remote"] = "hit" if remote_cache.hits > hits else "miss"
+    if cached is not None:
+        blob_registry.add_many(cached.sha_at(i) for i in range(len(cached)))
+        return cached
+    if not online:
+        return None
+    return github_api_get_remote_manifest(report.head, report.remote_tree)
+
+
+def explain_push(online: bool = False) -> PushReport:
+    reload_rules()
+    report = PushReport(engine=PUSH_ENGINE, source="none")
+
+    # кэш отпечатков с диска, но без записи: план не меняет состояние
+    fingerprints = FingerprintCache(root=WATCHED_FOLDER, persist=False)
+    manifest = scan_vault(WATCHED_FOLDER, cache=fingerprints)
+    report.caches["отпечатки файлов"] = f"{fingerprints.hits} из {fingerprints.hits + fingerprints.misses}"
+
+    remote_manifest = _resolve_remote(online, report)
+    if remote_manifest is not None:
+        manifest = keep_excluded(manifest, remote_manifest)
+    report.files = len(manifest)
+    report.local_tree = manifest.tree_sha()
+    # pre-push запросы do_push: HEAD + (commit, tree при промахе кэша)
+    pre_reads = 1 + (report.caches.get("commit → tree") == "miss") + (report.caches.get("манифест remote") == "miss")
+
+    if report.remote_tree == report.local_tree or (
+        remote_manifest is not None and len(remote_manifest)
+        and remote_manifest.tree_sha(exclude_prefix="deleted_files/") == report.local_tree
+    ):
+        report.noop = True
+        report.unchanged = len(manifest)
+        report.requests = {"noop": {"read": pre_reads, "content": 0, "git": 0}}
+        report.transport, report.transport_reason = "noop", "tree совпадает с HEAD"
+        return report
+
+    if remote_manifest is None:
+        # remote неизвестен: всё считается добавленным
+        remote_manifest = Manifest.from_sha_map({})
+
+    added, modified, deleted, renamed = collect_changes(
+        WATCHED_FOLDER, manifest, remote_manifest, use_hints=False
+    )
+    report.added, report.modified = len(added), len(modified)
+    report.deleted, report.renamed = len(deleted), len(renamed)
+    report.unchanged = sum(1 for p in manifest.paths() if not p.startswith("deleted_files/")) \
+        - report.added - report.modified - report.renamed
+
+    # для описания: прежняя версия каждого изменённого и удалённого
+    # текстового файла — GET /contents (оба движка пропускают файлы
+    # не меньше STREAM_UPLOAD_THRESHOLD — целиком они не читаются)
+    direct = PUSH_ENGINE == "direct"
+    deleted_text = [rel for rel in deleted if remote_text_readable(rel, remote_manifest)]
+    modified_text = sum(
+        1 for rel in modified
+        if is_text_file(rel) and manifest.get(rel).size < STREAM_UPLOAD_THRESHOLD
+    )
+    extra = deleted_blob_entries(deleted, remote_manifest) if direct else {}
+    all_files = tree_file_list(WATCHED_FOLDER, manifest, extra)
+    uploads, upload_bytes = pending_uploads(WATCHED_FOLDER, all_files, manifest)
+    report.reused_blobs = len(all_files) - uploads
+    report.caches["blob registry"] = f"{report.reused_blobs} из {len(all_files)}"
+    if not direct:
+        # staging: deleted_files/ пишутся заново и загружаются как новые blob'ы
+        uploads += len(deleted_text)
+        for rel in deleted_text:
+            entry = remote_manifest.get(rel)
+            upload_bytes += entry.size if entry is not None else 0
+
+    report.uploads, report.upload_bytes = uploads, upload_bytes
+
+    read = pre_reads + len(deleted_text) + modified_text
+    report.requests = {
+        # REST API: перед коммитом HEAD перечитывается ещё раз (force push)
+        "api": {"read": read + 1, "content": uploads + PUSH_OVERHEAD_REQUESTS + 1, "git": 0},
+        "pack": {"read": read, "content": 1, "git": 2},
+    }
+
+    plan = governor.plan(uploads, upload_bytes)
+    report.transport, report.transport_reason = plan.transport, plan.reason
+    report.eta_seconds = plan.eta_seconds
+    return report
+
+
+def format_report(report: PushReport) -> str:
+    source = {"cache": "кэш remote (без сети)", "online": "GitHub", "none": "remote неизвестен"}[report.source]
+    lines = [
+        f"=== План пуша (движок {report.engine}, remote: {source}) ===",
+        f"HEAD: {(report.head or '—')[:10]}   tree remote: {(report.remote_tree or '—')[:10]}   "
+        f"tree локально: {report.local_tree[:10]}",
+    ]
+    if report.noop:
+        lines.append(f"Пушить нечего: дерево совпадает с HEAD ({report.files} файлов)")
+    else:
+        lines += [
+            f"Файлов: {report.files}   added {report.added}   modified {report.modified}   "
+            f"unchanged {report.unchanged}   deleted {report.deleted}   renamed {report.renamed}",
+            f"Blob'ов к загрузке: {report.uploads} ({report.upload_bytes / 1024:.1f} KB), "
+            f"переиспользуется: {report.reused_blobs}",
+        ]
+    lines.append("Запросы (GET / content / git):")
+    for transport, counts in report.requests.items():
+        mark = " ←" if transport == report.transport else ""
+        lines.append(f"  {transport:<5} {counts['read']:>5} / {counts['content']:>5} / {counts['git']:>2}{mark}")
+    lines.append(f"Транспорт: {report.transport} ({report.transport_reason}), "
+                 f"ожидание лимитов ~{report.eta_seconds:.0f} сек")
+    lines.append("Кэши: " + ", ".join(f"{name}: {state}" for name, state in report.caches.items()))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    report = explain_push(online="--online" in argv)
+    if "--json" in argv:
+        print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+    else:
+        log_both(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+rate_governor.py
+
+Единый учёт лимитов GitHub API для пуша, загрузки blob'ов и комментариев.
+
+✔ Первичный лимит — по заголовкам X-RateLimit-Remaining / X-RateLimit-Reset
+  любого ответа API
+✔ Вторичные лимиты на content-запросы (≈80 в минуту, ≈500 в час) —
+  token bucket'ы: запросы не отклоняются, а ждут своей очереди
+✔ Необязательный потолок скорости загрузки (API_UPLOAD_KBPS)
+✔ 403/429 с Retry-After или «rate limit» → пауза для всех потоков и повтор
+  того же запроса, а не потеря файла
+✔ plan() — оценка пуша по бюджету: REST API или pack (git push через pygit2),
+  и нужно ли отложить комментарии, чтобы не конкурировать с blob'ами
+"""
+
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+import requests
+
+from app_logger import log_main, log_soft
+from config import (
+    API_CONTENT_PER_MINUTE,
+    API_CONTENT_PER_HOUR,
+    API_UPLOAD_KBPS,
+    API_RESERVE_REQUESTS,
+    PUSH_TRANSPORT,
+    PACK_TRANSPORT_MIN_BLOBS,
+    PACK_TRANSPORT_MAX_WAIT,
+)
+
+
+MAX_ATTEMPTS = 6                 # попыток одного запроса (rate limit / сеть / 5xx)
+NETWORK_BACKOFF_SECONDS = 2.0    # 2, 4, 8, ... для сетевых ошибок и 5xx
+SECONDARY_LIMIT_WAIT = 60.0      # вторичный лимит без заголовков — GitHub советует ≥ минуты
+
+# Запросов на пуш сверх blob'ов: tree + commit + ref
+PUSH_OVERHEAD_REQUESTS = 3
+
+
+def rate_limit_delay(resp: requests.Response) -> Optional[float]:
+    """
+    Если ответ GitHub — это упор в rate limit (первичный или вторичный),
+    возвращает сколько секунд ждать. Иначе None.
+    """
+    if resp.status_code not in (403, 429):
+        return None
+
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(1.0, float(retry_after))
+        except ValueError:
+            pass
+
+    if resp.headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            reset_at = float(resp.headers.get("X-RateLimit-Reset", "0"))
+            return max(1.0, reset_at - time.time() + 1)
+        except ValueError:
+            return SECONDARY_LIMIT_WAIT
+
+    if "rate limit" in resp.text.lower():
+        return SECONDARY_LIMIT_WAIT
+
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: reserve() сразу списывает токены
+    (баланс может уйти в минус) и возвращает, сколько ждать.
+    Так конкурирующие потоки встают в очередь, а не будят друг друга.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate            # токенов в секунду
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def eta(self, amount: float) -> float:
+        """Сколько ждать, чтобы amount токенов набралось (без списания)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = amount - self._tokens
+            return 0.0 if missing <= 0 else missing / self.rate
+
+
+def _window_bucket(limit: int, window_seconds: float) -> TokenBucket:
+    # capacity + rate * window ≤ limit в любом окне:
+    # четверть лимита — всплеском, остальное — равномерно
+    capacity = max(1.0, limit / 4)
+    return TokenBucket(rate=(limit - capacity) / window_seconds, capacity=capacity)
+
+
+class PushPlan(NamedTuple):
+    transport: str          # "api" | "pack"
+    uploads: int
+    upload_bytes: int
+    requests: int           # запросов REST API при transport="api"
+    eta_seconds: float      # сколько пуш простоит в ожидании лимитов (api)
+    defer_comments: bool
+    reason: str
+
+
+class RateGovernor:
+    def __init__(
+        self,
+        per_minute: int = API_CONTENT_PER_MINUTE,
+        per_hour: int = API_CONTENT_PER_HOUR,
+        upload_kbps: int = API_UPLOAD_KBPS,
+        reserve: int = API_RESERVE_REQUESTS,
+    ):
+        self._minute = _window_bucket(per_minute, 60.0)
+        self._hour = _window_bucket(per_hour, 3600.0)
+        self._bytes = TokenBucket(upload_kbps * 1024, upload_kbps * 1024) if upload_kbps > 0 else None
+        self.reserve = reserve
+
+        self._lock = threading.Lock()
+        # первичный лимит: None — ещё не видели ни одного ответа
+        self.remaining: Optional[int] = None
+        self.limit: Optional[int] = None
+        self.reset_at = 0.0
+        # общая пауза после 403/429 (time.time())
+        self._blocked_until = 0.0
+
+        self.waited_seconds = 0.0
+        self.retries = 0
+
+    # ─── учёт ответов ───
+
+    def observe(self, resp: requests.Response) -> Optional[float]:
+        """Обновляет первичный бюджет по заголовкам. Возвращает паузу при rate limit."""
+        headers = resp.headers
+        with self._lock:
+            try:
+                if "X-RateLimit-Remaining" in headers:
+                    self.remaining = int(headers["X-RateLimit-Remaining"])
+                if "X-RateLimit-Limit" in headers:
+                    self.limit = int(headers["X-RateLimit-Limit"])
+                if "X-RateLimit-Reset" in headers:
+                    self.reset_at = float(headers["X-RateLimit-Reset"])
+            except ValueError:
+                pass
+
+        delay = rate_limit_delay(resp)
+        if delay is not None:
+            self.block_for(delay)
+        return delay
+
+    def block_for(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+
+    def blocked_until(self) -> float:
+        with self._lock:
+            return self._blocked_until
+
+    # ─── ожидание ───
+
+    def _primary_wait(self, needed: int) -> float:
+        with self._lock:
+            if self.remaining is None or self.remaining - needed >= self.reserve:
+                return 0.0
+            return max(0.0, self.reset_at - time.time() + 1)
+
+    def acquire(self, content: bool = True, nbytes: int = 0) -> float:
+        """Блокирует до момента, когда запрос можно отправить. Возвращает время ожидания."""
+        wait = max(0.0, self.blocked_until() - time.time())
+        if content:
+            wait = max(wait, self._primary_wait(1))
+            wait = max(wait, self._minute.reserve(), self._hour.reserve())
+        elif self.remaining == 0:
+            wait = max(wait, self.reset_at - time.time() + 1)
+        if nbytes and self._bytes is not None:
+            wait = max(wait, self._bytes.reserve(nbytes))
+
+        if wait > 0:
+            if wait >= 5:
+                log_main(f"[GOVERNOR] Лимит GitHub API → ожидание {wait:.0f} сек")
+            else:
+                log_soft(f"[GOVERNOR] Пауза {wait:.2f} сек")
+            self.waited_seconds += wait
+            time.sleep(wait)
+        return wait
+
+    def call(
+        self,
+        send: Callable[[], requests.Response],
+        content: bool = True,
+        nbytes: int = 0,
+        attempts: int = MAX_ATTEMPTS,
+    ) -> requests.Response:
+        """
+        Отправка с соблюдением лимитов. Rate limit, сетевые ошибки и 5xx —
+        повтор с паузой; последний ответ (или исключение) отдаётся вызывающему.
+        send вызывается заново на каждую попытку (потоковое тело пересоздаётся).
+        """
+        for attempt in range(1, attempts + 1):
+            self.acquire(content=content, nbytes=nbytes)
+            try:
+                resp = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == attempts:
+                    raise
+                self._backoff(attempt, f"сетевая ошибка: {e}")
+                continue
+
+            delay = self.observe(resp)
+            if delay is not None and attempt < attempts:
+                self.retries += 1
+                log_main(f"[GOVERNOR] Rate limit ({resp.status_code}) → повтор через {delay:.0f} сек")
+                continue
+            if resp.status_code >= 500 and attempt < attempts:
+                self._backoff(attempt, f"HTTP {resp.status_code}")
+                continue
+            return resp
+        return resp
+
+    def request(self, method: str, url: str, content: bool = True, nbytes: int = 0, **kwargs) -> requests.Response:
+        return self.call(lambda: requests.request(method, url, **kwargs), content=content, nbytes=nbytes)
+
+    def _backoff(self, attempt: int, reason: str) -> None:
+        delay = NETWORK_BACKOFF_SECONDS * 2 ** (attempt - 1)
+        self.retries += 1
+        log_soft(f"[GOVERNOR] {reason} → повтор через {delay:.0f} сек")
+        time.sleep(delay)
+
+    # ─── планирование пуша ───
+
+    def estimate(self, requests_needed: int, upload_bytes: int = 0) -> float:
+        """Сколько секунд уйдёт на ожидание лимитов при requests_needed content-запросах"""
+        wait = max(0.0, self.blocked_until() - time.time())
+        wait = max(wait, self._primary_wait(requests_needed))
+        wait = max(wait, self._minute.eta(requests_needed), self._hour.eta(requests_needed))
+        if upload_bytes and self._bytes is not None:
+            wait = max(wait, self._bytes.eta(upload_bytes))
+        return wait
+
+    def plan(self, uploads: int, upload_bytes: int, pack_available: bool = True) -> PushPlan:
+        requests_needed = uploads + PUSH_OVERHEAD_REQUESTS
+        eta = self.estimate(requests_needed, upload_bytes)
+
+        if PUSH_TRANSPORT == "pack" and pack_available:
+            transport, reason = "pack", "PUSH_TRANSPORT=pack"
+        elif PUSH_TRANSPORT == "api" or not pack_available:
+            transport, reason = "api", "PUSH_TRANSPORT=api" if PUSH_TRANSPORT == "api" else "pack недоступен"
+        elif uploads >= PACK_TRANSPORT_MIN_BLOBS:
+            transport, reason = "pack", f"{uploads} blob'ов ≥ {PACK_TRANSPORT_MIN_BLOBS}"
+        elif eta > PACK_TRANSPORT_MAX_WAIT:
+            transport, reason = "pack", f"ожидание лимитов ~{eta:.0f} сек"
+        else:
+            transport, reason = "api", "в пределах бюджета"
+
+        # Комментарий — тоже content-запрос: пока идут blob'ы, он только отнимает квоту
+        defer = transport == "api" and eta > 0
+
+        return PushPlan(transport, uploads, upload_bytes, requests_needed, eta, defer, reason)
+
+    def describe(self) -> str:
+        primary = "неизвестно" if self.remaining is None else f"{self.remaining}/{self.limit or '?'}"
+        return f"первичный лимит {primary}, ожидание {self.waited_seconds:.0f} сек, повторов {self.retries}"
+
+
+governor = RateGovernor()
@@ -0,0 +1,19 @@
+"""
+test_deep_heuristics.py
+
+Быстрая эвристика push-комментариев (filters.deep_heuristics) совпадает
+с эталоном на корпусе filters.differential_check — поштучно и пакетом.
+
+    python -m pytest -q test_deep_heuristics.py
+"""
+
+import pytest
+
+from filters import differential_check
+
+
+# ast.literal_eval на мусоре из корпуса: на новых Python — DeprecationWarning
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_fast_heuristics_match_reference(seed):
+    assert differential_check.check(2000, seed) == 0
@@ -0,0 +1,86 @@
+"""
+test_log_cleaner.py
+
+Проход LogCleaner через ротацию logger.txt при исчерпанном бюджете байт:
+ни одна строка не теряется и не дублируется.
+
+    python -m pytest -q test_log_cleaner.py
+"""
+
+import os
+
+import pytest
+
+import log_cleaner
+from log_cleaner import LogCleaner
+
+
+LINE_BYTES = len(b"line 000\n")
+
+
+def _write_lines(path, start, count):
+    with open(path, "ab") as f:
+        for i in range(start, start + count):
+            f.write(f"line {i:03d}\n".encode())
+
+
+def _drain(cleaner, max_passes=100):
+    for _ in range(max_passes):
+        state_before = cleaner._load_state()
+        cleaner.run_once()
+        if cleaner._load_state() == state_before:
+            return
+    raise AssertionError("проходы не сходятся")
+
+
+@pytest.mark.parametrize("budget_lines", [1, 3, 5, 7, 10, 20])
+def test_pass_spanning_rotation_with_exhausted_budget(tmp_path, monkeypatch, budget_lines):
+    monkeypatch.setattr(log_cleaner, "MAX_BYTES_PER_RUN", budget_lines * LINE_BYTES)
+    monkeypatch.setattr(LogCleaner, "schedule", lambda self: None)  # проходы — вручную
+
+    source = tmp_path / "logger.txt"
+    cleaner = LogCleaner(source, tmp_path / "logger_clean.txt", tmp_path / "state.json")
+
+    _write_lines(source, 0, 4)
+    cleaner.run_once()  # состояние указывает на текущий файл
+
+    # дописали, затем логгер ротировал: остаток старого сегмента ещё не прочитан
+    _write_lines(source, 4, 6)
+    os.replace(source, f"{source}.1")
+    _write_lines(source, 10, 6)
+
+    _drain(cleaner)
+
+    lines = (tmp_path / "logger_clean.txt").read_text().splitlines()
+    assert lines == [f"line {i:03d}" for i in range(16)]
+
+
+def _rewrite_keeping(path, keep_from_line, in_place):
+    """Как mem.trim_log_file: срезать старые строки сверху"""
+    data = path.read_bytes()[keep_from_line * LINE_BYTES:]
+    if in_place:
+        with open(path, "r+b") as f:
+            f.truncate(0)
+            f.write(data)
+    else:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+
+@pytest.mark.parametrize("in_place", [False, True])
+def test_rewritten_source_is_not_reread(tmp_path, monkeypatch, in_place):
+    monkeypatch.setattr(LogCleaner, "schedule", lambda self: None)
+
+    source = tmp_path / "logger.txt"
+    cleaner = LogCleaner(source, tmp_path / "logger_clean.txt", tmp_path / "state.json")
+
+    _write_lines(source, 0, 40)
+    cleaner.run_once()
+
+    _rewrite_keeping(source, 30, in_place)
+    _write_lines(source, 40, 5)
+    _drain(cleaner)
+
+    lines = (tmp_path / "logger_clean.txt").read_text().splitlines()
+    assert lines == [f"line {i:03d}" for i in range(45)]
@@ -0,0 +1,38 @@
+"""
+test_make_description.py
+
+CommitAnalyzer._run_diff_jobs: результаты идут в порядке задач —
+и inline, и через пул процессов (spawn).
+
+    python -m pytest -q test_make_description.py
+"""
+
+import pytest
+
+import make_description
+from diff_worker import run_diff_job
+from make_description import CommitAnalyzer
+
+
+def _jobs(count):
+    jobs = []
+    for i in range(count):
+        kind = ("added", "modified", "deleted")[i % 3]
+        old = None if kind == "added" else f"old {i}\nshared\n"
+        new = None if kind == "deleted" else f"new {i}\nshared\n"
+        jobs.append((f"note_{i:03d}.md", old, new, kind))
+    return jobs
+
+
+@pytest.mark.parametrize("pool_threshold", [1000, 1])  # inline / пул
+def test_run_diff_jobs_keeps_job_order(monkeypatch, pool_threshold):
+    failures = []
+    monkeypatch.setattr(make_description, "log_main", failures.append)
+
+    jobs = _jobs(40)
+    analyzer = CommitAnalyzer(pool_threshold=pool_threshold, pool_workers=2)
+    results = analyzer._run_diff_jobs(jobs)
+
+    assert results == [run_diff_job(job) for job in jobs]
+    assert [rel for rel, _, _ in results] == [job[0] for job in jobs]
+    assert failures == []  # пул не откатился на inline
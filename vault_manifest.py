@@ -0,0 +1,679 @@
+"""
+vault_manifest.py
+
+Один обход наблюдаемой папки на пуш → неизменяемый манифест,
+который потребляют все стадии: копирование в staging, collect_changes,
+детект перемещений, индекс и построение tree.
+
+✔ Обход через ignore_rules.walk (os.scandir, игнорируемые папки отрезаются)
+✔ Один stat на файл (на Windows — ноль: данные приходят из scandir)
+✔ Blob SHA считается только для новых/изменённых файлов:
+  кэш отпечатков (size, mtime_ns, inode) → SHA хранится на диске между пусками
+✔ Компактное хранение для хранилищ на 100k+ файлов:
+  папки интернированы, имена — одна строка + смещения,
+  size / mtime / inode — колонки array, SHA — 20 байт в общем bytes.
+  Поиск — бинарный по отсортированным путям, сравнение двух манифестов — merge join.
+✔ SHA корневого git-tree считается локально (tree_sha) — пуш без изменений
+  распознаётся до любых загрузок; манифест remote кэшируется по tree SHA
+✔ Вложения сверх ATTACHMENT_MAX_MB — в manifest.excluded, а не «удалены»:
+  keep_excluded оставляет в дереве их версию с remote
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from app_logger import log_main, log_soft, log_both
+import config
+from ignore_rules import IgnoreRules, get_rules, is_text_file
+
+
+FINGERPRINT_CACHE_FILE = config.SCRIPT_DIR / "manifest_cache.bin"
+
+# Файлы, изменённые менее N секунд назад, не кэшируются
+# (та же проблема «racy git»: правка в пределах одного тика mtime)
+RACY_WINDOW_NS = 2_000_000_000
+
+HASH_CHUNK_SIZE = 1 << 20
+HASH_ATTEMPTS = 3               # файл меняется во время хэширования → новый проход
+
+SHA_LEN = 20
+_NO_MTIME = -(2 ** 63)          # mtime «racy»-записи в кэше — никогда не совпадёт
+_INODE_MASK = (1 << 64) - 1
+
+_CACHE_MAGIC = b"VMF1"
+_NAME_ERRORS = "surrogatepass"  # имена из scandir могут содержать суррогаты
+
+
+class ManifestEntry(NamedTuple):
+    path: str        # rel posix-путь
+    size: int
+    mtime_ns: int
+    inode: int
+    sha: str         # git blob SHA-1 (hex)
+
+
+# ────────────────────────────────────────────────
+# Манифест
+# ────────────────────────────────────────────────
+
+class _PathView:
+    """Ленивая последовательность путей — для bisect без materialize всего списка"""
+    __slots__ = ("_m",)
+
+    def __init__(self, manifest: "Manifest"):
+        self._m = manifest
+
+    def __len__(self) -> int:
+        return len(self._m)
+
+    def __getitem__(self, i: int) -> str:
+        return self._m.path_at(i)
+
+
+class Manifest:
+    """
+    Неизменяемый снимок папки. Записи отсортированы по полному пути.
+    Строится через ManifestBuilder / from_entries / from_sha_map.
+    excluded — пути, которые есть в папке, но в манифест не вошли
+    (вложения больше ATTACHMENT_MAX_MB): это не удаление, см. keep_excluded.
+    """
+
+    __slots__ = ("root", "_dirs", "_dir_ids", "_names", "_name_offsets",
+                 "_sizes", "_mtimes", "_inodes", "_shas", "excluded")
+
+    def __init__(
+        self,
+        root: Optional[Path],
+        dirs: List[str],
+        dir_ids: array,
+        names: str,
+        name_offsets: array,
+        sizes: array,
+        mtimes: array,
+        inodes: array,
+        shas: bytes,
+    ):
+        self.root = Path(root) if root is not None else None
+        self._dirs = dirs
+        self._dir_ids = dir_ids
+        self._names = names
+        self._name_offsets = name_offsets
+        self._sizes = sizes
+        self._mtimes = mtimes
+        self._inodes = inodes
+        self._shas = shas
+        self.excluded: Tuple[str, ...] = ()
+
+    # ─── конструкторы ───
+
+    @classmethod
+    def from_entries(cls, root: Optional[Path], entries: Iterable[ManifestEntry]) -> "Manifest":
+        builder = ManifestBuilder(root)
+        for entry in entries:
+            builder.add(*entry)
+        return builder.build()
+
+    @classmethod
+    def from_sha_map(cls, mapping: Mapping[str, str], root: Optional[Path] = None) -> "Manifest":
+        """{путь: hex SHA} (например, дерево remote) → манифест без stat-данных"""
+        builder = ManifestBuilder(root)
+        for path, sha in mapping.items():
+            builder.add(path, 0, 0, 0, sha)
+        return builder.build()
+
+    # ─── доступ по индексу ───
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def path_at(self, i: int) -> str:
+        offsets = self._name_offsets
+        name = self._names[offsets[i]:offsets[i + 1]]
+        d = self._dirs[self._dir_ids[i]]
+        return f"{d}/{name}" if d else name
+
+    def sha_bytes_at(self, i: int) -> bytes:
+        return self._shas[i * SHA_LEN:(i + 1) * SHA_LEN]
+
+    def sha_at(self, i: int) -> str:
+        return self.sha_bytes_at(i).hex()
+
+    def entry_at(self, i: int) -> ManifestEntry:
+        return ManifestEntry(self.path_at(i), self._sizes[i], self._mtimes[i], self._inodes[i], self.sha_at(i))
+
+    def index_of(self, path: str) -> int:
+        """Индекс пути или -1 (бинарный поиск)"""
+        i = bisect_left(_PathView(self), path)
+        if i < len(self) and self.path_at(i) == path:
+            return i
+        return -1
+
+    # ─── API как у коллекции ───
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        for i in range(len(self)):
+            yield self.entry_at(i)
+
+    def __contains__(self, path: str) -> bool:
+        return self.index_of(path) >= 0
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        i = self.index_of(path)
+        return self.entry_at(i) if i >= 0 else None
+
+    def paths(self) -> List[str]:
+        return [self.path_at(i) for i in range(len(self))]
+
+    def sha_map(self) -> Dict[str, str]:
+        return {self.path_at(i): self.sha_at(i) for i in range(len(self))}
+
+    @property
+    def total_size(self) -> int:
+        return sum(self._sizes)
+
+    # ─── сравнение ───
+
+    def merge(self, other: "Manifest") -> Iterator[Tuple[str, int, int]]:
+        """
+        Merge join двух отсортированных манифестов.
+        Отдаёт (path, индекс в self или -1, индекс в other или -1).
+        """
+        i, j = 0, 0
+        n, m = len(self), len(other)
+        left = self.path_at(0) if n else None
+        right = other.path_at(0) if m else None
+        while i < n or j < m:
+            if j >= m or (i < n and left < right):
+                yield left, i, -1
+                i += 1
+                left = self.path_at(i) if i < n else None
+            elif i >= n or right < left:
+                yield right, -1, j
+                j += 1
+                right = other.path_at(j) if j < m else None
+            else:
+                yield left, i, j
+                i += 1
+                j += 1
+                left = self.path_at(i) if i < n else None
+                right = other.path_at(j) if j < m else None
+
+    def diff(self, other: "Manifest") -> Tuple[List[str], List[str], List[str]]:
+        """(только в self, есть в обоих с разным SHA, только в other)"""
+        only_self, changed, only_other = [], [], []
+        for path, i, j in self.merge(other):
+            if j < 0:
+                only_self.append(path)
+            elif i < 0:
+                only_other.append(path)
+            elif self.sha_bytes_at(i) != other.sha_bytes_at(j):
+                changed.append(path)
+        return only_self, changed, only_other
+
+    # ─── git tree ───
+
+    def tree_sha(self, exclude_prefix: Optional[str] = None) -> str:
+        """
+        SHA корневого tree, который получится из этих файлов (все blob'ы — 100644,
+        как их создаёт do_push). exclude_prefix — пропустить поддерево (например, deleted_files/).
+        """
+        root: dict = {}
+        for i in range(len(self)):
+            path = self.path_at(i)
+            if exclude_prefix and path.startswith(exclude_prefix):
+                continue
+            node = root
+            *dirs, name = path.split("/")
+            for d in dirs:
+                node = node.setdefault(d, {})
+            node[name] = self.sha_bytes_at(i)
+        return _hash_tree(root).hex()
+
+    # ─── хранение на диске (кэш отпечатков) ───
+
+    def with_racy(self, volatile: Iterable[int]) -> "Manifest":
+        """Копия, где у индексов volatile mtime — «не совпадёт никогда» (колонки общие, кроме mtime)"""
+        volatile = list(volatile)
+        if not volatile:
+            return self
+        mtimes = array("q", self._mtimes)
+        for i in volatile:
+            mtimes[i] = _NO_MTIME
+        copy = Manifest(self.root, self._dirs, self._dir_ids, self._names, self._name_offsets,
+                        self._sizes, mtimes, self._inodes, self._shas)
+        copy.excluded = self.excluded
+        return copy
+
+    def save(self, path: Path, root_key: str, volatile: Iterable[int] = ()) -> None:
+        """Атомарная запись. Для индексов volatile mtime сохраняется как «не совпадёт никогда»."""
+        mtimes = self.with_racy(volatile)._mtimes
+
+        header = json.dumps({"root": root_key, "count": len(self), "dirs": self._dirs}).encode("utf-8")
+        names = self._names.encode("utf-8", _NAME_ERRORS)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_CACHE_MAGIC)
+            f.write(struct.pack("<II", len(header), len(names)))
+            f.write(header)
+            f.write(names)
+            for column in (self._dir_ids, self._name_offsets, self._sizes, mtimes, self._inodes):
+                f.write(column.tobytes())
+            f.write(self._shas)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, root_key: str) -> Optional["Manifest"]:
+        """None — если файла нет или он от другой папки. Повреждение → ValueError."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        if data[:4] != _CACHE_MAGIC:
+            raise ValueError("неизвестный формат")
+        header_len, names_len = struct.unpack_from("<II", data, 4)
+        pos = 12
+        header = json.loads(data[pos:pos + header_len])
+        pos += header_len
+        if header.get("root") != root_key:
+            return None
+        names = data[pos:pos + names_len].decode("utf-8", _NAME_ERRORS)
+        pos += names_len
+
+        count = header["count"]
+        columns = []
+        for typecode, length in (("I", count), ("I", count + 1), ("q", count), ("q", count), ("Q", count)):
+            column = array(typecode)
+            size = column.itemsize * length
+            column.frombytes(data[pos:pos + size])
+            if len(column) != length:
+                raise ValueError("файл обрезан")
+            pos += size
+            columns.append(column)
+        shas = data[pos:pos + count * SHA_LEN]
+        if len(shas) != count * SHA_LEN:
+            raise ValueError("файл обрезан")
+
+        dir_ids, name_offsets, sizes, mtimes, inodes = columns
+        return cls(None, header["dirs"], dir_ids, names, name_offsets, sizes, mtimes, inodes, shas)
+
+
+def _hash_tree(node: dict) -> bytes:
+    """git tree-объект: записи «mode name\0sha», сортировка побайтно (у папок — с «/» в конце)"""
+    entries = []
+    for name, value in node.items():
+        raw = name.encode("utf-8", _NAME_ERRORS)
+        if isinstance(value, dict):
+            entries.append((raw + b"/", b"40000 " + raw + b"\0" + _hash_tree(value)))
+        else:
+            entries.append((raw, b"100644 " + raw + b"\0" + value))
+    entries.sort(key=lambda e: e[0])
+    body = b"".join(e[1] for e in entries)
+    return hashlib.sha1(b"tree %d\0" % len(body) + body).digest()
+
+
+class ManifestBuilder:
+    """Накопление записей сразу в колонки (без объекта на файл)"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root
+        self._dir_index: Dict[str, int] = {}
+        self._dirs: List[str] = []
+        self._dir_ids = array("I")
+        self._names: List[str] = []
+        self._sizes = array("q")
+        self._mtimes = array("q")
+        self._inodes = array("Q")
+        self._shas = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def add(self, path: str, size: int, mtime_ns: int, inode: int, sha: Union[str, bytes]) -> None:
+        d, _, name = path.rpartition("/")
+        dir_id = self._dir_index.get(d)
+        if dir_id is None:
+            dir_id = self._dir_index[d] = len(self._dirs)
+            self._dirs.append(d)
+        self._dir_ids.append(dir_id)
+        self._names.append(name)
+        self._sizes.append(size)
+        self._mtimes.append(mtime_ns)
+        self._inodes.append(inode & _INODE_MASK)
+        self._shas += bytes.fromhex(sha) if isinstance(sha, str) else sha
+
+    def build(self) -> Manifest:
+        n = len(self)
+        dirs, dir_ids, names = self._dirs, self._dir_ids, self._names
+
+        def full_path(i: int) -> str:
+            d = dirs[dir_ids[i]]
+            return f"{d}/{names[i]}" if d else names[i]
+
+        order = sorted(range(n), key=full_path)
+        shas = self._shas
+        if order != list(range(n)):
+            dir_ids = array("I", (dir_ids[i] for i in order))
+            names = [names[i] for i in order]
+            sizes = array("q", (self._sizes[i] for i in order))
+            mtimes = array("q", (self._mtimes[i] for i in order))
+            inodes = array("Q", (self._inodes[i] for i in order))
+            shas = b"".join(shas[i * SHA_LEN:(i + 1) * SHA_LEN] for i in order)
+        else:
+            sizes, mtimes, inodes = self._sizes, self._mtimes, self._inodes
+
+        name_offsets = array("I", [0])
+        total = 0
+        for name in names:
+            total += len(name)
+            name_offsets.append(total)
+
+        return Manifest(self.root, dirs, dir_ids, "".join(names), name_offsets,
+                        sizes, mtimes, inodes, bytes(shas))
+
+
+# ────────────────────────────────────────────────
+# Хэширование
+# ────────────────────────────────────────────────
+
+def file_blob_sha(path: str, expected_size: int) -> tuple[str, int]:
+    """
+    Потоковый git blob SHA файла. Размер из stat идёт в заголовок blob'а;
+    если файл успел измениться (прочитано другое число байт) — новый проход
+    с фактическим размером. В памяти всегда одна часть, а не весь файл.
+    """
+    for _ in range(HASH_ATTEMPTS):
+        hasher = hashlib.sha1(b"blob %d\0" % expected_size)
+        read = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                hasher.update(chunk)
+                read += len(chunk)
+        if read == expected_size:
+            break
+        expected_size = read
+    else:
+        # файл всё ещё дописывается: SHA неточен, но mtime свежий → в кэш не попадёт
+        log_soft(f"[MANIFEST] Файл меняется во время хэширования: {path}")
+    return hasher.hexdigest(), read
+
+
+# ────────────────────────────────────────────────
+# Кэш отпечатков
+# ────────────────────────────────────────────────
+
+class FingerprintCache:
+    """
+    Предыдущий манифест как кэш: (size, mtime_ns, inode) совпали → SHA известен.
+    Хранится в том же компактном бинарном виде. path=None → только в памяти;
+    persist=False → читается с диска, но не перезаписывается (план пуша).
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = FINGERPRINT_CACHE_FILE,
+        root: Optional[Path] = None,
+        persist: bool = True,
+    ):
+        self.path = path
+        self.persist = persist
+        self.root = str(root or config.WATCHED_FOLDER)
+        self._previous: Optional[Manifest] = None
+        self._loaded = path is None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            self._previous = Manifest.load(self.path, self.root)
+        except Exception as e:
+            log_main(f"[MANIFEST] Кэш отпечатков повреждён ({e}) — сброс")
+
+    def lookup(self, rel: str, size: int, mtime_ns: int, inode: int) -> Optional[bytes]:
+        if not self._loaded:
+            self._load()
+        prev = self._previous
+        if prev is not None:
+            i = prev.index_of(rel)
+            if i >= 0 and prev._sizes[i] == size and prev._mtimes[i] == mtime_ns \
+                    and prev._inodes[i] == inode & _INODE_MASK:
+                self.hits += 1
+                return prev.sha_bytes_at(i)
+        self.misses += 1
+        return None
+
+    def update(self, manifest: Manifest, volatile_paths: Iterable[str] = ()) -> None:
+        """Новый манифест становится кэшем; volatile_paths («racy») не кэшируются"""
+        prev = self._previous
+        volatile = [i for i in (manifest.index_of(p) for p in volatile_paths) if i >= 0]
+        changed = self.misses or volatile or prev is None or len(prev) != len(manifest)
+        # racy-записи не должны совпасть и в памяти — иначе правка того же размера
+        # в ту же mtime_ns на следующем обходе получит старый SHA
+        cached = manifest.with_racy(volatile)
+        self._previous = cached
+        if self.path is None or not self.persist or not changed:
+            return
+        with self._lock:
+            try:
+                cached.save(self.path, self.root)
+            except Exception as e:
+                log_main(f"[MANIFEST] Не удалось сохранить кэш отпечатков: {e}")
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+
+_cache: Optional[FingerprintCache] = None
+
+
+def get_fingerprint_cache() -> FingerprintCache:
+    global _cache
+    if _cache is None or _cache.root != str(config.WATCHED_FOLDER):
+        _cache = FingerprintCache()
+    return _cache
+
+
+# ────────────────────────────────────────────────
+# Кэш remote: commit → tree, tree → манифест
+# ────────────────────────────────────────────────
+
+REMOTE_MANIFEST_FILE = config.SCRIPT_DIR / "remote_manifest.bin"
+REMOTE_COMMITS_FILE = config.SCRIPT_DIR / "remote_commits.json"
+MAX_REMEMBERED_COMMITS = 200
+
+
+class RemoteManifestCache:
+    """
+    Commit и tree в git неизменяемы, поэтому кэш не устаревает:
+    commit SHA → tree SHA (без GET /git/commits) и манифест последнего
+    дерева remote (без GET /git/trees?recursive=1).
+    """
+
+    def __init__(self, manifest_file: Path = REMOTE_MANIFEST_FILE, commits_file: Path = REMOTE_COMMITS_FILE):
+        self.manifest_file = manifest_file
+        self.commits_file = commits_file
+        self.repo_key = f"{config.GITHUB_USERNAME}/{config.GITHUB_REPO}"
+        self._lock = threading.Lock()
+        self._commits: Optional[Dict[str, str]] = None
+        self._manifest: Optional[Manifest] = None
+        self._manifest_tree: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load_commits(self) -> Dict[str, str]:
+        if self._commits is None:
+            try:
+                with open(self.commits_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._commits = data.get("commits", {}) if data.get("repo") == self.repo_key else {}
+            except FileNotFoundError:
+                self._commits = {}
+            except Exception as e:
+                log_main(f"[REMOTE-CACHE] Кэш коммитов повреждён ({e}) — сброс")
+                self._commits = {}
+        return self._commits
+
+    def tree_for_commit(self, commit_sha: str) -> Optional[str]:
+        with self._lock:
+            tree = self._load_commits().get(commit_sha)
+        if tree:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return tree
+
+    def remember_commit(self, commit_sha: str, tree_sha: str) -> None:
+        with self._lock:
+            commits = self._load_commits()
+            commits.pop(commit_sha, None)  # последний запомненный — в конце
+            commits[commit_sha] = tree_sha
+            while len(commits) > MAX_REMEMBERED_COMMITS:
+                del commits[next(iter(commits))]
+            tmp = self.commits_file.with_suffix(".tmp")
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"repo": self.repo_key, "commits": commits}, f)
+                os.replace(tmp, self.commits_file)
+            except Exception as e:
+                log_main(f"[REMOTE-CACHE] Не удалось сохранить кэш коммитов: {e}")
+
+    def last_commit(self) -> Optional[Tuple[str, str]]:
+        """(commit, tree) последнего запомненного пуша — для оценок без сети"""
+        with self._lock:
+            commits = self._load_commits()
+            if not commits:
+                return None
+            commit_sha = next(reversed(commits))
+            return commit_sha, commits[commit_sha]
+
+    def manifest_for_tree(self, tree_sha: str) -> Optional[Manifest]:
+        key = f"{self.repo_key}@{tree_sha}"
+        with self._lock:
+            if self._manifest_tree != tree_sha:
+                try:
+                    manifest = Manifest.load(self.manifest_file, key)
+                except Exception as e:
+                    log_main(f"[REMOTE-CACHE] Манифест remote повреждён ({e}) — сброс")
+                    manifest = None
+                if manifest is not None:
+                    self._manifest, self._manifest_tree = manifest, tree_sha
+            manifest = self._manifest if self._manifest_tree == tree_sha else None
+        if manifest is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return manifest
+
+    def store_manifest(self, tree_sha: str, manifest: Manifest) -> None:
+        with self._lock:
+            self._manifest, self._manifest_tree = manifest, tree_sha
+            try:
+                manifest.save(self.manifest_file, f"{self.repo_key}@{tree_sha}")
+            except Exception as e:
+                log_main(f"[REMOTE-CACHE] Не удалось сохранить манифест remote: {e}")
+
+
+remote_cache = RemoteManifestCache()
+
+
+def keep_excluded(manifest: Manifest, remote: Manifest) -> Manifest:
+    """
+    Исключённые из манифеста файлы, уже лежащие на remote, остаются в дереве
+    со своим blob'ом remote — иначе merge join посчитал бы их удалёнными.
+    """
+    kept = []
+    for path in manifest.excluded:
+        j = remote.index_of(path)
+        if j >= 0:
+            kept.append(remote.entry_at(j))
+    if not kept:
+        return manifest
+    merged = Manifest.from_entries(manifest.root, list(manifest) + kept)
+    merged.excluded = manifest.excluded
+    log_soft(f"[MANIFEST] Вложений сверх лимита оставлено как на remote: {len(kept)}")
+    return merged
+
+
+# ────────────────────────────────────────────────
+# Обход
+# ────────────────────────────────────────────────
+
+_reported_oversized: set[str] = set()   # о каких вложениях сверх лимита уже написали в лог
+
+
+def scan_vault(
+    root: Optional[Path] = None,
+    rules: Optional[IgnoreRules] = None,
+    cache: Optional[FingerprintCache] = None,
+) -> Manifest:
+    """Строит манифест папки (по умолчанию WATCHED_FOLDER) за один проход"""
+    root = Path(root or config.WATCHED_FOLDER)
+    rules = rules or get_rules()
+    if cache is None:
+        is_vault = root == Path(config.WATCHED_FOLDER)
+        cache = get_fingerprint_cache() if is_vault else FingerprintCache(path=None, root=root)
+    cache.reset_stats()
+
+    started = time.perf_counter()
+    now_ns = time.time_ns()
+    builder = ManifestBuilder(root)
+    volatile = []
+    max_attachment = config.ATTACHMENT_MAX_MB * 1024 * 1024
+    oversized = []
+
+    for rel, entry in rules.walk(root):
+        try:
+            st = entry.stat()
+            inode = entry.inode()
+        except OSError as e:
+            log_soft(f"[MANIFEST] stat не удался {rel}: {e}")
+            continue
+
+        size, mtime_ns = st.st_size, st.st_mtime_ns
+        if size > max_attachment and not is_text_file(rel):
+            log_soft(f"[MANIFEST] Вложение больше {config.ATTACHMENT_MAX_MB} MB — пропуск: {rel}")
+            oversized.append(rel)
+            continue
+
+        sha = cache.lookup(rel, size, mtime_ns, inode)
+        if sha is None:
+            try:
+                sha, size = file_blob_sha(entry.path, size)
+            except OSError as e:
+                log_main(f"[MANIFEST] Не удалось прочитать {rel}: {e}")
+                continue
+            if now_ns - mtime_ns < RACY_WINDOW_NS:
+                volatile.append(rel)
+
+        builder.add(rel, size, mtime_ns, inode, sha)
+
+    manifest = builder.build()
+    manifest.excluded = tuple(sorted(oversized))
+    cache.update(manifest, volatile)
+
+    # в основной лог — только о новых, а не на каждом пуше
+    new_oversized = [rel for rel in oversized if rel not in _reported_oversized]
+    if new_oversized:
+        _reported_oversized.update(new_oversized)
+        log_main(f"[MANIFEST] Вложения больше {config.ATTACHMENT_MAX_MB} MB не загружаются "
+                 f"(на remote остаётся прежняя версия): {', '.join(new_oversized[:5])}"
+                 + (f" и ещё {len(new_oversized) - 5}" if len(new_oversized) > 5 else ""))
+
+    log_both(
+        f"[MANIFEST] {len(manifest)} файлов, {manifest.total_size // 1024} KB, "
+        f"из кэша: {cache.hits}, прочитано: {cache.misses}, "
+        f"{time.perf_counter() - started:.2f} сек"
+    )
+    return manifest